@@ -0,0 +1,48 @@
+import timeit
+from hippopytamus.core.annotation import Controller, GetMapping, ResponseStatus
+from hippopytamus.core.container import HippoContainer
+from hippopytamus.core.extractor import get_type_name
+from hippopytamus.logger.logger import LoggerFactory
+
+
+@Controller
+class BenchController:
+    @GetMapping("/plain")
+    def plain(self) -> str:
+        return "ok"
+
+    @ResponseStatus(code=200)
+    @GetMapping("/stacked")
+    @GetMapping("/stacked2")
+    def stacked(self) -> str:
+        return "ok"
+
+
+def request(uri: str) -> dict:
+    return {"method": "GET", "uri": uri, "version": "HTTP/1.0", "headers": {}}
+
+
+def bench(stmt, number: int) -> float:
+    best = min(timeit.repeat(stmt, number=number, repeat=5))
+    return best / number * 1e9
+
+
+def main() -> None:
+    LoggerFactory.get_factory().disable_all()
+    container = HippoContainer()
+    container.register(BenchController)
+    component = container.getComponent(get_type_name(BenchController))
+    number = 100000
+
+    for uri in ["/plain", "/stacked"]:
+        route, _ = container.router.get_route(uri, request(uri))
+        assert route is not None
+        handler = route.method
+        req = request(uri)
+        call = bench(lambda: handler(component), number)
+        dispatch = bench(lambda: container.process_request(req), number // 10)
+        print(f"{uri:10} handler call {call:8.1f} ns  process_request {dispatch:8.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
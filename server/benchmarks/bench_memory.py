@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from hippopytamus.data.repo_creator import HippoRepositoryCreator
+from hippopytamus.data.repository import HippoRepository
+from hippopytamus.data.storage import LogStorage
+from hippopytamus.logger.logger import LoggerFactory
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    email: str
+    posts: int
+    active: bool
+
+
+class UserRepository(HippoRepository[User, int]):
+    def find_all_by_name(self, name: str) -> list[User]:
+        pass
+
+
+class CompactUserRepository(HippoRepository[User, int]):
+    _compact = True
+
+    def find_all_by_name(self, name: str) -> list[User]:
+        pass
+
+
+def users(count: int) -> list[User]:
+    return [User(i, f"user{i % 1000}", f"user{i}@example.com", i % 50, i % 2 == 0) for i in range(count)]
+
+
+def object_size(stored: object) -> int:
+    """Size of a stored entity or record without its field values."""
+    size = sys.getsizeof(stored)
+    if hasattr(stored, "__dict__"):
+        size += sys.getsizeof(stored.__dict__)
+    return size
+
+
+def measure(repo_cls: type, count: int, path: str) -> tuple[float, float, int, float]:
+    """Bytes per entity kept by a repository after saving new entities
+    and after loading them back from its log, the size of one loaded
+    entity object and the time to find the 200 entities with a name."""
+    repo_cls._storage = LogStorage(path, fsync_interval=None)
+    HippoRepositoryCreator().create_repo_impl(repo_cls)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    repo = repo_cls()
+    repo.save_all(users(count))
+    saved = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+    repo_cls._storage.close()
+    del repo
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    repo = repo_cls()
+    loaded = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+    size = object_size(repo._store.entities[0])
+    find = min(timeit.repeat(lambda: repo.find_all_by_name("user1"), number=20, repeat=5)) / 20
+    repo_cls._storage.close()
+    return saved, loaded, size, find * 1e3
+
+
+def main() -> None:
+    LoggerFactory.get_factory().disable_all()
+    with tempfile.TemporaryDirectory() as tmp:
+        for repo_cls in (UserRepository, CompactUserRepository):
+            path = os.path.join(tmp, f"{repo_cls.__name__}.log")
+            saved, loaded, size, find = measure(repo_cls, 200000, path)
+            print(
+                    f"{repo_cls.__name__:22} saved {saved:6.1f} B/entity  "
+                    f"loaded {loaded:6.1f} B/entity  object {size:4d} B  "
+                    f"find_all_by_name {find:6.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
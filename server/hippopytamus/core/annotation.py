@@ -4,7 +4,6 @@ from typing import Protocol, Union, Annotated
 from typing import Callable, _SpecialForm
 from typing import TypeVar
 import inspect
-import functools
 from hippopytamus.core.filter import HippoFilter
 
 
@@ -35,10 +34,14 @@ Repository = Component
 
 
 class HippoDecoratorFunc(Protocol):
-    __hippo_decorator: Dict[str, Any]
+    __hippo_method_decorators: List[Dict[str, Any]]
     def __call__(self, *args: Any, **kwargs: Any) -> Any: ...
 
 
+def get_method_decorators(func: Callable) -> List[Dict[str, Any]]:
+    return cast(List[Dict[str, Any]], getattr(func, "__hippo_method_decorators", []))
+
+
 strList = Union[List[str], str]
 
 
@@ -72,13 +75,13 @@ def get_wrapper_for_annotation(
             if not applicable_to_method:
                 raise Exception(f"@{name} cannot be applied to method")
 
-            @functools.wraps(func)
-            def wrapper(*args: Any, **kwargs: Any) -> Any:
-                return func(*args, **kwargs)
-            hippo_wrapper = cast(HippoDecoratorFunc, wrapper)
+            # metadata is attached to the function itself instead of
+            # a wrapper, so annotations don't add frames to dispatch
+            hippo_func = cast(HippoDecoratorFunc, func)
             if argdecorator is not None:
-                hippo_wrapper.__hippo_decorator = argdecorator
-            return hippo_wrapper
+                existing = get_method_decorators(func)
+                hippo_func.__hippo_method_decorators = [argdecorator, *existing]
+            return hippo_func
     return decorator
 
 
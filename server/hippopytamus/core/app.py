@@ -4,12 +4,13 @@ import os
 import importlib
 from hippopytamus.server.nonblocking import SelectTCPServer
 from hippopytamus.protocol.http import HttpProtocol10
-from typing import List, Any
+from typing import List, Any, Optional
 from types import ModuleType
 from hippopytamus.core.container import HippoContainer
-from hippopytamus.core.extractor import get_class_decorators
+from hippopytamus.core.extractor import get_class_decorators, get_type_name
 from hippopytamus.logger.logger import LoggerFactory
 from hippopytamus.core.lazy_import_utils import module_is_loaded, module_exists
+from hippopytamus.core.boot_profiler import BootProfiler
 from dataclasses import dataclass
 
 
@@ -18,6 +19,19 @@ from dataclasses import dataclass
 class ServerOptions:
     host: str = "127.0.0.1"
     port: int = 8000
+    manifest: Optional[str] = None
+    boot_profile: bool = False
+    boot_profile_json: Optional[str] = None
+    access_log: bool = False
+    access_log_capacity: int = 4096
+    access_log_sample_every: int = 1
+    access_log_slow_threshold: float = 0.5
+    metrics: bool = False
+    tracing: bool = False
+    profiler: bool = False
+    admin_token: Optional[str] = None
+    watchdog: bool = False
+    watchdog_threshold: float = 1.0
 
 
 class HippoApp:
@@ -27,20 +41,99 @@ class HippoApp:
             opt: ServerOptions = ServerOptions()
             ) -> None:
         self.logger = LoggerFactory.get_logger()
-        all_classes = self.get_module_classes(module_name)
+        self.profiler = BootProfiler.from_env(opt.boot_profile, opt.boot_profile_json)
+        self.profiler.start()
+        self.create_container()
+        self.exceptions: List[Any] = []
+        if not opt.manifest or not self.load_manifest(module_name, opt.manifest):
+            self.scan(module_name)
+        self.server = SelectTCPServer(
+                HttpProtocol10(),
+                self.container, host=opt.host, port=opt.port)
+        self.enable_monitoring(opt)
+        self.profiler.finish()
+
+    def enable_monitoring(self, opt: ServerOptions) -> None:
+        if opt.admin_token is None and (opt.access_log or opt.tracing or opt.profiler):
+            self.logger.warn("No admin_token set, admin endpoints refuse all calls")
+        if opt.access_log:
+            from hippopytamus.monitoring.access_log import AccessLog, AccessLogController
+            factory = LoggerFactory.get_factory()
+            self.access_log = AccessLog(
+                    capacity=opt.access_log_capacity,
+                    sample_every=opt.access_log_sample_every,
+                    slow_threshold=opt.access_log_slow_threshold,
+                    printer=factory._get_printer(),
+            )
+            self.container.add_request_listener(self.access_log)
+            self.container.register_instance(AccessLogController(self.access_log, opt.admin_token))
+        if opt.metrics:
+            from hippopytamus.monitoring.metrics import MetricsRegistry, HttpMetrics
+            from hippopytamus.monitoring.metrics import LoopMetrics, MetricsController
+            self.metrics = MetricsRegistry()
+            http_metrics = HttpMetrics(self.metrics)
+            self.container.add_request_listener(http_metrics)
+            self.server.add_observer(http_metrics)
+            self.server.add_observer(LoopMetrics(self.metrics))
+            self.container.register_instance(MetricsController(self.metrics))
+        if opt.tracing:
+            from hippopytamus.monitoring import tracing
+            self.tracer = tracing.PhaseAggregator()
+            tracing.add_tracer(self.tracer)
+            self.container.register_instance(tracing.TracingController(self.tracer, opt.admin_token))
+        if opt.profiler:
+            from hippopytamus.monitoring.profiler import RequestProfiler, ProfilerController
+            self.profiler_session = RequestProfiler()
+            self.container.register_instance(
+                    ProfilerController(self.profiler_session, opt.admin_token))
+        if opt.watchdog:
+            from hippopytamus.monitoring.watchdog import Watchdog
+            self.watchdog = Watchdog(opt.watchdog_threshold)
+            self.container.add_request_listener(self.watchdog)
+            self.server.add_observer(self.watchdog)
+
+    def create_container(self) -> None:
         self.container = HippoContainer()
+        self.container.profiler = self.profiler
+
+    def scan(self, module_name: str) -> None:
+        with self.profiler.measure("scan", module_name):
+            all_classes = self.get_module_classes(module_name)
         self.hippo_self_inspect()
         components = self.get_components(all_classes)
         self.logger.debug(components)
         for cls in components:
             self.container.register(cls)
-        exceptions = self.get_status_exceptions(all_classes)
-        self.logger.debug(f"Loaded exceptions: {exceptions}")
-        for cls in exceptions:
-            self.container.exceptionManager.register_exception(cls)
-        self.server = SelectTCPServer(
-                HttpProtocol10(),
-                self.container, host=opt.host, port=opt.port)
+        self.exceptions = self.get_status_exceptions(all_classes)
+        self.logger.debug(f"Loaded exceptions: {self.exceptions}")
+        self.register_exceptions()
+
+    def register_exceptions(self) -> None:
+        for cls in self.exceptions:
+            with self.profiler.measure("exceptions", get_type_name(cls)):
+                self.container.exceptionManager.register_exception(cls)
+
+    def load_manifest(self, module_name: str, path: str) -> bool:
+        from hippopytamus.core.manifest import HippoManifest, ManifestError
+        try:
+            with self.profiler.measure("manifest", path):
+                manifest = HippoManifest.load(path)
+                fresh = manifest.is_fresh(module_name)
+                components = manifest.components() if fresh else []
+            if not fresh:
+                self.logger.warn(f"Manifest {path} is stale, scanning {module_name}")
+                return False
+            self.hippo_self_inspect()
+            for cls, class_data in components:
+                self.container.register(cls, class_data)
+            self.exceptions = manifest.exceptions()
+        except (OSError, ManifestError) as e:
+            self.logger.warn(f"Couldn't load manifest {path}: {e}")
+            self.create_container()
+            return False
+        self.register_exceptions()
+        self.logger.info(f"Loaded {module_name} from manifest {path}")
+        return True
 
     def inspect_module(self, module: ModuleType) -> Any:
         return inspect.getmembers(module, inspect.isclass)
@@ -63,8 +156,9 @@ class HippoApp:
                 walk_packages([package_dir], prefix=package_name + "."):
             try:
                 # Dynamically import the module or package
-                module = importlib.import_module(module_name)
-                all_classes.extend(self.inspect_module(module))
+                with self.profiler.measure("import", module_name):
+                    module = importlib.import_module(module_name)
+                    all_classes.extend(self.inspect_module(module))
             except ImportError as e:
                 self.logger.warn(f"Failed to import module {module_name}: {e}")
 
@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterator, List, Optional, TextIO
+
+
+@dataclass
+class BootRecord:
+    phase: str
+    name: str
+    seconds: float
+    allocated: int
+    depth: int
+
+
+class BootProfiler:
+    """Records wall time and allocated memory of boot phases."""
+
+    def __init__(
+            self,
+            enabled: bool = False,
+            json_path: Optional[str] = None,
+            stream: Optional[TextIO] = None
+    ) -> None:
+        self.enabled = enabled
+        self.json_path = json_path
+        self.stream = stream
+        self.records: List[BootRecord] = []
+        self.depth = 0
+        self.started: Optional[float] = None
+        self.total = 0.0
+        self.own_tracing = False
+
+    @classmethod
+    def from_env(cls, enabled: bool = False, json_path: Optional[str] = None) -> "BootProfiler":
+        env_json = os.environ.get("HIPPO_BOOT_PROFILE_JSON")
+        json_path = json_path or env_json
+        env_enabled = os.environ.get("HIPPO_BOOT_PROFILE", "") not in ("", "0")
+        return cls(enabled=enabled or env_enabled or json_path is not None, json_path=json_path)
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.own_tracing = True
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def measure(self, phase: str, name: str = "") -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        mem_before = tracemalloc.get_traced_memory()[0]
+        self.depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.depth -= 1
+            mem_after = tracemalloc.get_traced_memory()[0]
+            self.records.append(BootRecord(
+                phase=phase,
+                name=name,
+                seconds=elapsed,
+                allocated=mem_after - mem_before,
+                depth=self.depth,
+            ))
+
+    def finish(self) -> None:
+        if not self.enabled or self.started is None:
+            return
+        self.total = time.perf_counter() - self.started
+        if self.own_tracing:
+            tracemalloc.stop()
+            self.own_tracing = False
+        print(self.report(), file=self.stream or sys.stdout)
+        if self.json_path:
+            self.write_json(self.json_path)
+
+    def phase_totals(self) -> Dict[str, BootRecord]:
+        totals: Dict[str, BootRecord] = {}
+        for record in self.records:
+            total = totals.get(record.phase)
+            if total is None:
+                total = BootRecord(record.phase, "", 0.0, 0, record.depth)
+                totals[record.phase] = total
+            total.seconds += record.seconds
+            total.allocated += record.allocated
+            total.depth = min(total.depth, record.depth)
+        return totals
+
+    def report(self, limit: int = 20) -> str:
+        lines = [f"Boot finished in {self.total * 1000:.1f} ms"]
+        lines.append("Phases:")
+        phases = sorted(self.phase_totals().values(), key=lambda r: -r.seconds)
+        for record in phases:
+            lines.append(self._format(record, record.phase))
+        lines.append(f"Slowest entries (top {limit}):")
+        entries = sorted(self.records, key=lambda r: -r.seconds)[:limit]
+        for record in entries:
+            lines.append(self._format(record, f"{record.phase} {record.name}"))
+        return "\n".join(lines)
+
+    def _format(self, record: BootRecord, label: str) -> str:
+        ms = record.seconds * 1000
+        kib = record.allocated / 1024
+        return f"  {ms:9.2f} ms {kib:10.1f} KiB  {label}"
+
+    def to_dict(self) -> Dict:
+        return {
+            "total_seconds": self.total,
+            "phases": {name: asdict(r) for name, r in self.phase_totals().items()},
+            "records": [asdict(r) for r in self.records],
+        }
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=1)
@@ -1,19 +1,22 @@
 from hippopytamus.protocol.interface import Servlet, Response, Request
 from typing import List, get_origin, Union
-from typing import Dict, Any, cast, Type, Optional
+from typing import Dict, Any, cast, Type, Optional, Iterator
 from hippopytamus.core.extractor import get_type_name
 from hippopytamus.core.exception import HippoExceptionManager
 from hippopytamus.core.exception import HippoInternalForbiddenException
 from hippopytamus.core.exception import HippoInternalNotFoundException
 from urllib.parse import urlparse, parse_qs
 import json
+import time
 from hippopytamus.core.method_parser import RouteData, MethodData, DependencyData
 from hippopytamus.core.method_parser import HippoMethodProcessor
-from hippopytamus.core.class_parser import HippoClassProcessor
+from hippopytamus.core.class_parser import HippoClassProcessor, ClassData
 from hippopytamus.core.router import HippoRouter
 from hippopytamus.logger.logger import LoggerFactory
 from hippopytamus.core.filter import HippoFilter
-from dataclasses import dataclass, field, is_dataclass
+from hippopytamus.core.boot_profiler import BootProfiler
+from hippopytamus.monitoring import tracing
+from dataclasses import dataclass, field, is_dataclass, asdict
 from abc import ABC, abstractmethod
 
 
@@ -52,9 +55,21 @@ class ComponentProcessor(ABC):
         pass
 
 
+class RequestListener:
+    def request_started(self, request: Request) -> None:
+        """Called before a request is processed, on the processing thread."""
+        pass
+
+    def request_finished(self, request: Request, response: Response, elapsed: float, size: int) -> None:
+        """Called after a request is processed, with processing time in
+        seconds and the size of the response body in bytes."""
+        pass
+
+
 class HippoContainer(Servlet):
     def __init__(self) -> None:
         self.components: Dict[str, ComponentData] = {}
+        self.class_data: Dict[str, ClassData] = {}
         self.exceptionManager = HippoExceptionManager()
         self.method_processor = HippoMethodProcessor()
         self.router = HippoRouter()
@@ -62,12 +77,20 @@ class HippoContainer(Servlet):
         self.filter_chain: List[FilterData] = []
         self.class_processor = HippoClassProcessor()
         self.component_processors: List[ComponentProcessor] = []
+        self.profiler = BootProfiler()
+        self.request_listeners: List[RequestListener] = []
 
-    def register(self, cls: Type) -> None:
-        class_data = self.class_processor.parse_class(cls)
+    def register(self, cls: Type, class_data: Optional[ClassData] = None) -> None:
+        with self.profiler.measure("register", get_type_name(cls)):
+            self.do_register(cls, class_data)
+
+    def do_register(self, cls: Type, class_data: Optional[ClassData]) -> None:
+        if class_data is None:
+            class_data = self.class_processor.parse_class(cls)
         if self.components.get(class_data.name) is not None:
-            self.logger.warn(f"Component {class_data.name} already registered!")
+            self.logger.warn("Component %s already registered!", class_data.name)
             return
+        self.class_data[class_data.name] = class_data
 
         self.method_processor.process_constructor(
                 class_data.constructor.get('signature', []),
@@ -76,7 +99,7 @@ class HippoContainer(Servlet):
 
         for method in class_data.methods:
             method_name = method.get('name', 'unknown')
-            self.logger.debug(f"{len(method.get('signature', []))} params in {method_name}")
+            self.logger.debug("%d params in %s", len(method.get('signature', [])), method_name)
             signature = method.get('signature', [])
             params_len = len(signature)
 
@@ -89,7 +112,7 @@ class HippoContainer(Servlet):
 
             self.method_processor.process_method(signature, method_data)
 
-            self.logger.debug(f"Found decorators for method {method_name}", decorators=method['decorators'])
+            self.logger.debug("Found decorators for method %s", method_name, decorators=method['decorators'])
             for annotation in method['decorators']:
                 if annotation['__decorator__'] == "RequestMapping":
                     self.router.register_route(
@@ -98,7 +121,7 @@ class HippoContainer(Servlet):
                             class_data.url_prepend
                     )
                 elif annotation['__decorator__'] == "ExceptionHandler":
-                    self.logger.debug(f"Found @ExceptionHandler in {method_name}")
+                    self.logger.debug("Found @ExceptionHandler in %s", method_name)
                     self.exceptionManager.create_handler(
                             cast(Dict, annotation),
                             method,
@@ -132,11 +155,36 @@ class HippoContainer(Servlet):
 
         for processor in self.component_processors:
             if processor.should_process(comp):
-                processor.process(comp)
+                with self.profiler.measure(type(processor).__name__, class_data.name):
+                    processor.process(comp)
 
         self.components[class_data.name] = comp
 
     def process_request(self, request: Request) -> Response:
+        if not self.request_listeners:
+            return self.handle_request(request)
+        for listener in self.request_listeners:
+            listener.request_started(request)
+        start = time.perf_counter()
+        response = self.handle_request(request)
+        elapsed = time.perf_counter() - start
+        size = body_size(response)
+        for listener in self.request_listeners:
+            listener.request_finished(request, response, elapsed, size)
+        return response
+
+    def handle_request(self, request: Request) -> Response:
+        if tracing.enabled() and tracing.current_span() is None:
+            span = tracing.start_span()
+            tracing.activate(span)
+            try:
+                return self.do_handle_request(request)
+            finally:
+                if span is not None:
+                    tracing.finish_span(span)
+        return self.do_handle_request(request)
+
+    def do_handle_request(self, request: Request) -> Response:
         try:
             return self.do_process_request(request)
         except Exception as e:
@@ -150,8 +198,11 @@ class HippoContainer(Servlet):
         parsed = urlparse(uri)
         query_params = parse_qs(parsed.query)
         uri = parsed.path
+        span = tracing.current_span()
         route, pathvars = self.router.get_route(uri, request)
-        self.logger.debug(f"PROCESSED: {pathvars}")
+        self.logger.debug("PROCESSED: %s", pathvars)
+        if span is not None:
+            span.mark("routing")
 
         request_context = {
                 "path": uri,
@@ -159,24 +210,36 @@ class HippoContainer(Servlet):
                 "pathvars": pathvars,
         }
         filtered = self.filter_request(request, request_context)
+        if span is not None:
+            span.mark("filters")
 
         if filtered:
             raise HippoInternalForbiddenException()
 
         if not route:
             raise HippoInternalNotFoundException()
+        request['route'] = route.path
+        if span is not None:
+            span.route = route.path
 
         params: List[Any] = [None] * route.paramLen
         self.set_body_param(params, request, route)
         self.set_request_params(params, query_params, route)
         self.set_path_variables(params, pathvars, route)
         self.set_header_params(params, request, route)
+        if span is not None:
+            span.mark("binding")
 
         try:
             component_name = route.component
             component = self.getComponent(component_name)
             resp = route.method(component, *params)
-            return self.transform_response(resp)
+            if span is not None:
+                span.mark("handler")
+            transformed = encode_body(self.transform_response(resp))
+            if span is not None:
+                span.mark("transform_response")
+            return transformed
         except Exception as e:
             return self.process_exception(e, component_name)
 
@@ -316,12 +379,24 @@ class HippoContainer(Servlet):
                     "body": bytes(json.dumps(resp), "utf-8"),
                     "headers": headers,
                     }
+        if isinstance(resp, Iterator):
+            return {
+                    "code": 200,
+                    "body": json_stream(resp),
+                    "headers": headers,
+                    }
+        if is_dataclass(resp) and not isinstance(resp, type):
+            return {
+                    "code": 200,
+                    "body": bytes(json.dumps(resp, default=json_default), "utf-8"),
+                    "headers": headers,
+                    }
         return cast(Dict, resp)
 
     def process_exception(self, e: Union[Exception, str], cls: Optional[str]) -> Dict:
-        self.logger.debug(f"Error in handler: {repr(e)}")
+        self.logger.debug("Error in handler: %r", e)
         ex_type = get_type_name(type(e)) if type(e) is not str else e
-        self.logger.debug(f"Exception type: {ex_type}")
+        self.logger.debug("Exception type: %s", ex_type)
         handler = self.exceptionManager.get_exception_handler(ex_type, cls)
         if handler is None:
             return {"code": 500, "body": None}
@@ -331,7 +406,7 @@ class HippoContainer(Servlet):
                 handler.set_component(self.getComponent(neededComponent))
             except Exception:
                 self.logger.error("Couldn't create component needed for exception handler")
-        self.logger.debug(f"Handler: {handler}")
+        self.logger.debug("Handler: %s", handler)
         # TODO: create dummy exception if needed
         transformed = handler.transform(e)  # type: ignore
         if type(transformed['body']) is str:
@@ -349,3 +424,52 @@ class HippoContainer(Servlet):
 
     def add_component_processor(self, processor: ComponentProcessor) -> None:
         self.component_processors.append(processor)
+
+    def add_request_listener(self, listener: RequestListener) -> None:
+        self.request_listeners.append(listener)
+
+    def register_instance(self, instance: Any) -> None:
+        """Registers an already constructed component."""
+        cls = type(instance)
+        self.register(cls)
+        self.components[get_type_name(cls)].component = instance
+
+
+def json_default(obj: Any) -> Any:
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def encode_body(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Joins a body of chunks, like the JSON of a repository stream,
+    into bytes while the request is handled, so errors raised by lazy
+    queries reach the exception handlers and their time counts in the
+    request timings."""
+    body = response.get('body') if isinstance(response, dict) else None
+    if body is not None and not isinstance(body, (bytes, bytearray, str)):
+        response['body'] = b"".join(body)
+    return response
+
+
+def body_size(response: Response) -> int:
+    """Size in bytes of the body of a processed response."""
+    body = response.get('body') if isinstance(response, dict) else response
+    if not body:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    return len(body)
+
+
+def json_stream(items: Iterator[Any]) -> Iterator[bytes]:
+    """Encodes items as a JSON array one element at a time, so results
+    of repository streams are never collected into a list."""
+    yield b"["
+    first = True
+    for item in items:
+        if not first:
+            yield b","
+        first = False
+        yield bytes(json.dumps(item, default=json_default), "utf-8")
+    yield b"]"
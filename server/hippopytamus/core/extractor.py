@@ -6,6 +6,7 @@ from inspect import Signature, Parameter
 import inspect
 from hippopytamus.core.annotation import HippoDecoratorClass
 from hippopytamus.core.annotation import AnnotationMetadata
+from hippopytamus.core.annotation import get_method_decorators
 from hippopytamus.logger.logger import LoggerFactory
 
 
@@ -66,12 +67,7 @@ def get_class_methods(cls: Type) -> List[Any]:
         type_hints = get_type_hints(method, globals(), locals())
         current_method['arguments'] = type_hints
 
-        decorators = []
-        met = method
-        while hasattr(met, "__wrapped__"):
-            if hasattr(met, "__hippo_decorator"):
-                decorators.append(met.__hippo_decorator)
-            met = met.__wrapped__
+        decorators = list(get_method_decorators(method))
 
         if decorators:
             current_method['decorators'] = decorators
@@ -0,0 +1,226 @@
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple, Type
+from hippopytamus.core.class_parser import ClassData
+from hippopytamus.core.extractor import get_type_name
+
+
+MANIFEST_VERSION = 1
+# raised by reading a manifest whose structure was truncated or edited
+MALFORMED = (KeyError, IndexError, TypeError, AttributeError, ValueError)
+
+
+class ManifestError(Exception):
+    pass
+
+
+def type_ref(cls: Any) -> str:
+    module = getattr(cls, "__module__", None)
+    qualname = getattr(cls, "__qualname__", None)
+    if not isinstance(module, str) or not isinstance(qualname, str):
+        raise ManifestError(f"Cannot reference {cls!r}")
+    ref = f"{module}:{qualname}"
+    try:
+        resolved = resolve_ref(ref)
+    except ManifestError:
+        resolved = None
+    if resolved is not cls:
+        raise ManifestError(f"Cannot reference {cls!r}")
+    return ref
+
+
+def resolve_ref(ref: str) -> Any:
+    module_name, _, qualname = ref.partition(":")
+    try:
+        obj: Any = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+    except (ImportError, AttributeError) as e:
+        raise ManifestError(f"Cannot resolve {ref}: {e}")
+    return obj
+
+
+def encode(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    if isinstance(value, dict):
+        if not all(isinstance(k, str) for k in value):
+            raise ManifestError(f"Cannot encode keys of {value!r}")
+        return {k: encode(v) for k, v in value.items()}
+    return {"__type__": type_ref(value)}
+
+
+def decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if isinstance(value, dict):
+        if "__type__" in value:
+            return resolve_ref(value["__type__"])
+        return {k: decode(v) for k, v in value.items()}
+    return value
+
+
+def encode_method(method: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+            "name": method['name'],
+            "signature": encode(method.get('signature', [])),
+            "decorators": encode(method.get('decorators', [])),
+    }
+
+
+def decode_method(cls: Type, data: Dict[str, Any]) -> Dict[str, Any]:
+    name = data['name']
+    try:
+        handle = getattr(cls, name)
+    except AttributeError:
+        raise ManifestError(f"{get_type_name(cls)} has no method {name}")
+    return {
+            "name": name,
+            "method_handle": handle,
+            "signature": decode(data['signature']),
+            "decorators": decode(data['decorators']),
+    }
+
+
+def encode_class_data(class_data: ClassData) -> Dict[str, Any]:
+    # dependencies are resolved from the constructor signature at registration
+    return {
+            "name": class_data.name,
+            "advice": class_data.advice,
+            "filter": class_data.filter,
+            "filter_priority": class_data.filter_priority,
+            "constructor": encode_method(class_data.constructor),
+            "methods": [encode_method(m) for m in class_data.methods],
+            "markers": encode(class_data.markers),
+            "decorators": encode(class_data.decorators),
+            "url_prepend": class_data.url_prepend,
+    }
+
+
+def decode_class_data(cls: Type, data: Dict[str, Any]) -> ClassData:
+    return ClassData(
+            name=data['name'],
+            advice=data['advice'],
+            filter=data['filter'],
+            filter_priority=data['filter_priority'],
+            constructor=decode_method(cls, data['constructor']),
+            methods=[decode_method(cls, m) for m in data['methods']],
+            markers=decode(data['markers']),
+            decorators=decode(data['decorators']),
+            url_prepend=data['url_prepend'],
+    )
+
+
+def package_fingerprint(package_name: str) -> Dict[str, List[int]]:
+    """Returns size and mtime of every source file of the package."""
+    spec = importlib.util.find_spec(package_name)
+    if spec is None or not spec.submodule_search_locations:
+        raise ManifestError(f"{package_name} is not a package")
+    fingerprint: Dict[str, List[int]] = {}
+    for location in spec.submodule_search_locations:
+        for root, _, files in os.walk(location):
+            for name in files:
+                if not name.endswith(".py"):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                rel = os.path.relpath(path, location)
+                fingerprint[rel] = [stat.st_mtime_ns, stat.st_size]
+    return fingerprint
+
+
+class HippoManifest:
+    def __init__(self, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ManifestError("Malformed manifest: not a JSON object")
+        if data.get("version") != MANIFEST_VERSION:
+            raise ManifestError(f"Unsupported manifest version {data.get('version')}")
+        self.data = data
+
+    @classmethod
+    def load(cls, path: str) -> "HippoManifest":
+        with open(path) as f:
+            try:
+                return cls(json.load(f))
+            except ValueError as e:
+                raise ManifestError(f"Malformed manifest: {e}")
+
+    @classmethod
+    def build(cls, package_name: str) -> "HippoManifest":
+        from hippopytamus.core.app import HippoApp, ServerOptions
+        app = HippoApp(package_name, ServerOptions())
+        container = app.container
+        components: List[Dict[str, Any]] = []
+        for name, component in container.components.items():
+            entry: Dict[str, Any] = {"class": None}
+            try:
+                entry["class"] = type_ref(component.componentClass)
+                entry["data"] = encode_class_data(container.class_data[name])
+            except ManifestError as e:
+                if entry["class"] is None:
+                    raise
+                # registered by reflection at boot
+                app.logger.warn(f"{name} will be scanned at boot: {e}")
+                entry.pop("data", None)
+            components.append(entry)
+        return cls({
+            "version": MANIFEST_VERSION,
+            "package": package_name,
+            "fingerprint": package_fingerprint(package_name),
+            "components": components,
+            "exceptions": [type_ref(exc) for exc in app.exceptions],
+        })
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.data, f, indent=1)
+
+    def is_fresh(self, package_name: str) -> bool:
+        if self.data.get("package") != package_name:
+            return False
+        try:
+            return bool(self.data.get("fingerprint") == package_fingerprint(package_name))
+        except ManifestError:
+            return False
+
+    def components(self) -> List[Tuple[Type, Optional[ClassData]]]:
+        result: List[Tuple[Type, Optional[ClassData]]] = []
+        try:
+            for entry in self.data["components"]:
+                cls = resolve_ref(entry["class"])
+                data = entry.get("data")
+                result.append((cls, decode_class_data(cls, data) if data else None))
+        except MALFORMED as e:
+            raise ManifestError(f"Malformed manifest components: {e!r}")
+        return result
+
+    def exceptions(self) -> List[Type]:
+        try:
+            return [resolve_ref(ref) for ref in self.data["exceptions"]]
+        except MALFORMED as e:
+            raise ManifestError(f"Malformed manifest exceptions: {e!r}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m hippopytamus.core.manifest")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build manifest for a package")
+    build.add_argument("package")
+    build.add_argument("-o", "--output", default="hippo-manifest.json")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        manifest = HippoManifest.build(args.package)
+        manifest.save(args.output)
+        print(f"Manifest for {args.package} written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
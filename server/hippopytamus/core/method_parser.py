@@ -23,6 +23,7 @@ class RouteData:
     pathVariables: List = field(default_factory=list)
     requestParams: List = field(default_factory=list)
     headers: List = field(default_factory=list)
+    path: str = ""
 
 
 @dataclass
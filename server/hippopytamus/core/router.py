@@ -1,6 +1,7 @@
 from typing import Tuple
 from typing import Dict, Any, Optional
 import re
+from dataclasses import replace
 from hippopytamus.core.method_parser import RouteData
 from hippopytamus.logger.logger import LoggerFactory
 
@@ -33,7 +34,7 @@ class HippoRouter:
             routes = self.routes_by_method(meth)
             for path in annotation['path']:
                 p = f"{url_prepend}{path}" if url_prepend else path
-                routes[p] = method_data
+                routes[p] = replace(method_data, path=p)
 
     def get_route(
             self,
@@ -47,7 +48,7 @@ class HippoRouter:
         pathvars: Dict[str, Any] = {}
         if not route:
             route, pathvars = self.try_find_varroute(routes, uri)
-            self.logger.debug(f"{route} {pathvars}")
+            self.logger.debug("%s %s", route, pathvars)
         return route, pathvars
 
     # TODO: this is rather primitive temporary solution
@@ -0,0 +1,406 @@
+import threading
+from array import array
+from dataclasses import fields, is_dataclass
+from functools import partial
+from heapq import nlargest, nsmallest
+from itertools import compress, islice
+from operator import and_, eq, ge, gt, le, lt
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, cast, get_type_hints
+from hippopytamus.data.page import Page, make_page
+from hippopytamus.data.repo_creator import aggregate, bind_args, unique
+from hippopytamus.data.repo_parser import RepoMethodDefinition
+from hippopytamus.data.repo_predicate import Node, RepoPredicate, as_set
+from hippopytamus.data.storage import QueryBackend, StorageError
+from hippopytamus.data.transaction import current_transaction
+from hippopytamus.data.store import consistent
+from hippopytamus.logger.logger import LoggerFactory
+
+TYPECODES = {int: "q", float: "d", bool: "b"}
+
+
+class Column:
+    """Values of one field for every row: a typed array for int, float
+    and bool fields, a list for anything else."""
+
+    def __init__(self, name: str, hint: Any) -> None:
+        self.name = name
+        self.typecode = TYPECODES.get(hint)
+        self.values: Any = array(self.typecode) if self.typecode else []
+        self.read: Optional[Callable[[Any], Any]] = bool if hint is bool else None
+
+    @property
+    def typed(self) -> bool:
+        return self.typecode is not None
+
+
+def evaluate_column(values: Any, typed: bool, operator: str, arg: Any) -> bytes:
+    """Evaluates a condition for a batch of column values, one byte
+    per row. Typed columns hold no None, so they are compared with
+    operator functions mapped in C."""
+    if operator == "eq":
+        return bytes(map(partial(eq, arg), values))
+    if operator == "in":
+        return bytes(map(as_set(arg).__contains__, values))
+    if typed:
+        if operator == "greater_than":
+            return bytes(map(partial(lt, arg), values))
+        if operator == "less_than":
+            return bytes(map(partial(gt, arg), values))
+        if operator == "between":
+            return bytes(map(and_, map(partial(le, arg[0]), values), map(partial(ge, arg[1]), values)))
+        if operator == "starting_with":
+            return bytes(len(values))
+    if operator == "greater_than":
+        return bytes(v is not None and v > arg for v in values)
+    if operator == "less_than":
+        return bytes(v is not None and v < arg for v in values)
+    if operator == "between":
+        return bytes(v is not None and arg[0] <= v <= arg[1] for v in values)
+    if operator == "starting_with":
+        return bytes(isinstance(v, str) and v.startswith(arg) for v in values)
+    raise Exception(f"Unknown operator {operator}")
+
+
+def row_key(column: Column, descending: bool) -> Callable[[int], Any]:
+    """Orders rows by a column, with None values last."""
+    get: Callable[[int], Any] = column.values.__getitem__
+    if column.typed:
+        return get
+    if descending:
+        return lambda row: (get(row) is not None, get(row))
+    return lambda row: (get(row) is None, get(row))
+
+
+class ColumnarStorage(QueryBackend):
+    """Keeps the entities of a repository column by column in memory.
+
+    Each field is a typed array.array for int, float and bool fields or
+    a list for any other type, and an id index maps each entity to its
+    row. Deleted rows are reused by later saves. Conditions are
+    evaluated a batch of rows at a time, column by column, into masks
+    combined with big-int bitwise operations; entities are only built
+    for the rows a method returns, so counts and aggregates never
+    build any.
+
+    Writes are serialized by a lock; readers don't take it but check
+    a version counter, so they never block writers. Writes can't be
+    buffered, so writing inside a @Transactional call is an error.
+
+    A field declared as int, float or bool can't hold None or values
+    outside the array type's range in this mode; use Optional to keep
+    it in a list."""
+
+    def __init__(self, batch_size: int = 65536) -> None:
+        self.batch_size = batch_size
+        self.logger = LoggerFactory.get_logger()
+        self.entity_cls: Optional[type] = None
+        self.columns: List[Column] = []
+        self.by_name: Dict[str, Column] = {}
+        self.rows: Dict[Any, int] = {}
+        self.alive = bytearray()
+        self.free: List[int] = []
+        self.lock = threading.Lock()
+        # odd while a write is in progress; readers retry a batch if
+        # it changed while they read it
+        self.version = 0
+
+    def prepare(self, entity_cls: Optional[type], definitions: Iterable[RepoMethodDefinition]) -> None:
+        if entity_cls is None or not is_dataclass(entity_cls):
+            raise StorageError(
+                    "ColumnarStorage needs a dataclass entity, "
+                    "declare the repository as HippoRepository[Entity, ID]"
+            )
+        hints = get_type_hints(entity_cls)
+        self.entity_cls = entity_cls
+        self.columns = [Column(f.name, hints.get(f.name, Any)) for f in fields(entity_cls)]
+        self.by_name = {column.name: column for column in self.columns}
+        if "id" not in self.by_name:
+            raise StorageError(f"Entity {entity_cls.__name__} has no id field")
+        for definition in definitions:
+            names = [f for f, _ in definition.fields] + [f for f, _ in definition.order] + definition.projection
+            if definition.aggregate is not None:
+                names.append(definition.aggregate)
+            for name in names:
+                if name not in self.by_name:
+                    raise StorageError(f"Entity {entity_cls.__name__} has no field {name}")
+        self.rows = {}
+        self.alive = bytearray()
+        self.free = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def put(self, entity: Any) -> None:
+        self.check_writable()
+        with self.lock:
+            self.version += 1
+            try:
+                self.write(entity)
+            finally:
+                self.version += 1
+
+    def put_all(self, entities: Iterable[Any]) -> None:
+        """Saves a batch under one lock and version change. Entities up
+        to one with a rejected value are kept."""
+        self.check_writable()
+        with self.lock:
+            self.version += 1
+            try:
+                for entity in entities:
+                    self.write(entity)
+            finally:
+                self.version += 1
+
+    def check_writable(self) -> None:
+        if current_transaction() is not None:
+            raise StorageError("ColumnarStorage doesn't support transactions")
+
+    def write(self, entity: Any) -> None:
+        key = getattr(entity, "id")
+        row = self.rows.get(key)
+        if row is None and self.free:
+            row = self.free[-1]
+        values = [getattr(entity, column.name) for column in self.columns]
+        if row is None:
+            row = len(self.alive)
+            written = 0
+            try:
+                for column, value in zip(self.columns, values):
+                    column.values.append(value)
+                    written += 1
+            except (TypeError, OverflowError):
+                for column in self.columns[:written]:
+                    column.values.pop()
+                raise
+            self.alive.append(1)
+        else:
+            old = [column.values[row] for column in self.columns]
+            try:
+                for column, value in zip(self.columns, values):
+                    column.values[row] = value
+            except (TypeError, OverflowError):
+                for column, value in zip(self.columns, old):
+                    column.values[row] = value
+                raise
+            if not self.alive[row]:
+                self.free.pop()
+                self.alive[row] = 1
+        self.rows[key] = row
+
+    def delete(self, key: Any) -> None:
+        self.delete_all((key,))
+
+    def delete_all(self, keys: Iterable[Any]) -> None:
+        self.check_writable()
+        with self.lock:
+            self.version += 1
+            try:
+                for key in keys:
+                    row = self.rows.pop(key, None)
+                    if row is None:
+                        continue
+                    self.alive[row] = 0
+                    for column in self.columns:
+                        if not column.typed:
+                            column.values[row] = None
+                    self.free.append(row)
+            finally:
+                self.version += 1
+
+    def read(self, row: int) -> Any:
+        """Builds the entity of a row as of a single version, or
+        returns None if the row was deleted."""
+        return consistent(self, self.lock, lambda: self.entity(row) if self.alive[row] else None)
+
+    def materialize(
+            self,
+            rows: Iterable[int],
+            predicate: Optional[Callable],
+            arg: dict,
+            version: int
+    ) -> Iterator[Any]:
+        """Entities of the selected rows. After a concurrent write a row
+        may hold another version or a reused row another entity, so
+        they are checked with the predicate again."""
+        for row in rows:
+            entity = self.read(row)
+            if entity is None:
+                continue
+            if self.version != version and predicate is not None and not predicate(entity, arg):
+                continue
+            yield entity
+
+    def project(
+            self,
+            rows: Iterable[int],
+            columns: List[Column],
+            predicate: Optional[Callable],
+            arg: dict,
+            version: int
+    ) -> Iterator[Any]:
+        """Values of the projected columns of the selected rows, read
+        from the columns without building entities unless a write
+        happened meanwhile and the row has to be checked again."""
+        single = len(columns) == 1
+        for row in rows:
+            if self.version == version:
+                values = consistent(self, self.lock, partial(self.row_values, row, columns))
+                if self.version == version:
+                    if values is not None:
+                        yield values[0] if single else tuple(values)
+                    continue
+            entity = self.read(row)
+            if entity is None or (predicate is not None and not predicate(entity, arg)):
+                continue
+            yield getattr(entity, columns[0].name) if single else tuple(getattr(entity, c.name) for c in columns)
+
+    def row_values(self, row: int, columns: List[Column]) -> Optional[List[Any]]:
+        if not self.alive[row]:
+            return None
+        values = []
+        for column in columns:
+            value = column.values[row]
+            if column.read is not None:
+                value = column.read(value)
+            values.append(value)
+        return values
+
+    def entity(self, row: int) -> Any:
+        return self.entity_cls(*self.row_values(row, self.columns))  # type: ignore[misc]
+
+    def mask(self, node: Node, arg: dict, start: int, end: int) -> int:
+        if node.field_name:
+            column = self.by_name[node.field_name]
+            tested = evaluate_column(column.values[start:end], column.typed, node.operator, arg.get(node.index))
+            return int.from_bytes(tested, "little")
+        left = self.mask(node.left, arg, start, end)  # type: ignore[arg-type]
+        if node.op == "and":
+            return left & self.mask(node.right, arg, start, end) if left else 0  # type: ignore[arg-type]
+        return left | self.mask(node.right, arg, start, end)  # type: ignore[arg-type]
+
+    def batch(self, head: Optional[Node], arg: dict, start: int, end: int) -> int:
+        """Mask of the matching rows of a batch. It's evaluated again if a
+        write happened meanwhile, so it matches a single version of the
+        rows; only when writes keep interleaving is the lock taken."""
+        def read() -> int:
+            selected = int.from_bytes(self.alive[start:end], "little")
+            if head is not None and selected:
+                selected &= self.mask(head, arg, start, end)
+            return selected
+        return consistent(self, self.lock, read)
+
+    def select(self, head: Optional[Node], arg: dict) -> Iterator[int]:
+        """Yields the matching rows in row order, batch by batch."""
+        if head is not None and head.field_name == "id" and head.operator in ("eq", "in"):
+            value = arg.get(head.index)
+            found: Optional[List[int]]
+            try:
+                keys = [value] if head.operator == "eq" else as_set(value)
+                found = sorted(row for row in map(self.rows.get, keys) if row is not None)
+            except TypeError:
+                found = None  # unhashable ids are left to the scan
+            if found is not None:
+                yield from found
+                return
+        size = len(self.alive)
+        for start in range(0, size, self.batch_size):
+            end = min(start + self.batch_size, size)
+            selected = self.batch(head, arg, start, end)
+            if selected:
+                yield from compress(range(start, end), selected.to_bytes(end - start, "little"))
+
+    def count(self, head: Optional[Node], arg: dict) -> int:
+        """Counts matches from the masks, one bit per row."""
+        if head is None:
+            return len(self.rows)
+        total = 0
+        size = len(self.alive)
+        for start in range(0, size, self.batch_size):
+            end = min(start + self.batch_size, size)
+            total += self.batch(head, arg, start, end).bit_count()
+        return total
+
+    def ordered(self, rows: Iterator[int], order: List[tuple[str, str]], limit: Optional[int]) -> List[int]:
+        if len(order) == 1 and limit is not None:
+            name, direction = order[0]
+            key = row_key(self.by_name[name], direction == "desc")
+            if direction == "desc":
+                return nlargest(limit, rows, key=key)
+            return nsmallest(limit, rows, key=key)
+        result = list(rows)
+        for name, direction in reversed(order):
+            descending = direction == "desc"
+            result.sort(key=row_key(self.by_name[name], descending), reverse=descending)
+        return result[:limit] if limit is not None else result
+
+    def generate_method(self, definition: RepoMethodDefinition) -> Callable:
+        storage = self
+        if definition.action == "save" and definition.all:
+            def save_all(self, entities):  # type: ignore
+                entities = list(entities)
+                storage.put_all(entities)
+                return entities
+            return save_all
+        if definition.action == "save":
+            def save(self, entity):  # type: ignore
+                storage.put(entity)
+                return entity
+            return save
+
+        pred = RepoPredicate()
+        pred.build_tree(definition.fields, definition.operators)
+        head = pred.head
+        predicate = pred.make_predicate()
+        order = definition.order
+        action = definition.action
+        projection = [self.by_name[name] for name in definition.projection]
+
+        def rows(arg: dict, limit: Optional[int]) -> Iterator[int]:
+            selected = storage.select(head, arg)
+            if order:
+                return iter(storage.ordered(selected, order, limit))
+            return islice(selected, limit)
+
+        def query(self, *args, **kwargs):  # type: ignore
+            arg, limit, pageable = bind_args(definition, args, kwargs)
+            if action == "count" and not projection and limit is None and pageable is None:
+                return storage.count(head, arg)
+            version = storage.version
+            if projection:
+                # limits apply to the distinct values, not the rows
+                distinct = islice(unique(storage.project(rows(arg, None), projection, predicate, arg, version)), limit)
+                if pageable is not None:
+                    return make_page(distinct, pageable)
+                if action == "count":
+                    return sum(1 for _ in distinct)
+                if action == "stream":
+                    return distinct
+                return list(distinct) if definition.all else next(distinct, None)
+            found = rows(arg, limit)
+            if pageable is not None:
+                matched = list(found)
+                page = matched[pageable.offset:pageable.offset + pageable.size]
+                content = list(storage.materialize(page, predicate, arg, version))
+                return Page(content, pageable.page, pageable.size, len(matched))
+            if action == "count":
+                return sum(1 for _ in found)
+            if action == "exists":
+                return next(storage.materialize(found, predicate, arg, version), None) is not None
+            if definition.aggregate is not None:
+                column = storage.by_name[definition.aggregate]
+                values = map(column.values.__getitem__, found)
+                return aggregate(cast(str, action), map(column.read, values) if column.read else values)
+            entities = storage.materialize(found, predicate, arg, version)
+            if action == "stream":
+                return entities
+            if not definition.all:
+                entity = next(entities, None)
+                if entity is not None and action == "delete":
+                    storage.delete(entity.id)
+                return entity
+
+            result = list(entities)
+            if action == "delete":
+                storage.delete_all(entity.id for entity in result)
+            return result
+        return query
@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field
+from typing import Generic, Iterator, List, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class Pageable:
+    """Requested page of a repository query; pages are counted from 0."""
+    page: int = 0
+    size: int = 20
+
+    @property
+    def offset(self) -> int:
+        return self.page * self.size
+
+
+@dataclass
+class Page(Generic[T]):
+    content: List[T] = field(default_factory=list)
+    page: int = 0
+    size: int = 20
+    total: int = 0
+
+    @property
+    def total_pages(self) -> int:
+        if self.size <= 0:
+            return 0
+        return (self.total + self.size - 1) // self.size
+
+
+def make_page(entities: Iterator[T], pageable: Pageable) -> Page[T]:
+    """Collects the requested page while counting all matches, so only
+    the entities on the page are kept."""
+    start = pageable.offset
+    end = start + pageable.size
+    content: List[T] = []
+    total = 0
+    for entity in entities:
+        if start <= total < end:
+            content.append(entity)
+        total += 1
+    return Page(content, pageable.page, pageable.size, total)
@@ -0,0 +1,50 @@
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, Optional
+from hippopytamus.data.storage import StorageError
+
+
+class RecordType:
+    """Slotted record class generated from the fields of an entity
+    dataclass, for keeping entities without an instance __dict__ each.
+
+    Records have the fields of the entity as attributes, so indexes,
+    scans and ordering read them like entities. pack makes the record
+    of an entity and unpack rebuilds a new entity from a record, like
+    copy and pickle do, without calling __init__ or __post_init__."""
+
+    def __init__(self, entity_cls: Optional[type]) -> None:
+        if entity_cls is None or not is_dataclass(entity_cls):
+            raise StorageError(
+                    "Compact entities need a dataclass entity, "
+                    "declare the repository as HippoRepository[Entity, ID]"
+            )
+        self.entity_cls = entity_cls
+        self.names = tuple(f.name for f in fields(entity_cls))
+        # frozen dataclasses refuse assignment, so their fields are set
+        # the way their __init__ does it
+        self.frozen = entity_cls.__setattr__ is not object.__setattr__
+        self.record_cls = type(f"{entity_cls.__name__}Record", (), {"__slots__": self.names})
+        self.source = (
+                "def pack(entity):\n"
+                "    record = new(Record)\n"
+                + "".join(f"    record.{name} = entity.{name}\n" for name in self.names)
+                + "    return record\n"
+                "def unpack(record):\n"
+                "    entity = new(Entity)\n"
+                + "".join(self.assign(name) for name in self.names)
+                + "    return entity\n"
+        )
+        names: Dict[str, Any] = {
+            "Record": self.record_cls,
+            "Entity": entity_cls,
+            "new": object.__new__,
+            "set": object.__setattr__,
+        }
+        exec(compile(self.source, "<entity record>", "exec"), names)
+        self.pack: Callable[[Any], Any] = names["pack"]
+        self.unpack: Callable[[Any], Any] = names["unpack"]
+
+    def assign(self, name: str) -> str:
+        if self.frozen:
+            return f"    set(entity, {name!r}, record.{name})\n"
+        return f"    entity.{name} = record.{name}\n"
@@ -1,8 +1,17 @@
-from typing import Type, Callable, Any
-from hippopytamus.data.repository import HippoRepository
+from typing import Type, Callable, Any, Dict, Iterable, Iterator, List, Optional, cast
+from heapq import nlargest, nsmallest
+from functools import partial
+from itertools import chain, islice
+from operator import attrgetter
+from hippopytamus.data.page import Pageable, make_page
+from hippopytamus.data.records import RecordType
+from hippopytamus.data.repository import HippoRepository, entity_type
 from hippopytamus.data.repo_parser import tokenize_method, TokenParser
 from hippopytamus.data.repo_parser import RepoMethodDefinition
 from hippopytamus.data.repo_predicate import RepoPredicate
+from hippopytamus.data.storage import QueryBackend
+from hippopytamus.data.store import IndexedStore
+from hippopytamus.data.transaction import DELETED, current_transaction
 from hippopytamus.logger.logger import LoggerFactory
 import inspect
 
@@ -12,88 +21,283 @@ class HippoRepositoryCreator:
         self.logger = LoggerFactory.get_logger()
         self.logger.debug("HippoRepositoryCreator crated")
 
-    # naive in-memory storage
+    # in-memory storage, persisted by the repository's _storage backend,
+    # unless the backend runs the queries itself
     # TODO: generating methods based on parsed method
-    # TODO: arbitrary data backend
     def create_repo_impl(self, repo_cls: Type[HippoRepository]) -> None:
         self.logger.debug(f"Creating repository {repo_cls.__name__}")
 
+        definitions = {}
+        for method_name, _ in inspect.getmembers(repo_cls, predicate=inspect.isfunction):
+            if method_name.startswith("_"):
+                continue
+            self.logger.debug(f"Parsing repository method: {method_name}")
+            definitions[method_name] = self.parse_definition(method_name)
+
+        storage = getattr(repo_cls, "_storage", None)
+        if isinstance(storage, QueryBackend):
+            self.logger.debug(f"Generating methods for {type(storage).__name__}")
+            storage.prepare(entity_type(repo_cls), definitions.values())
+            for method_name, definition in definitions.items():
+                setattr(repo_cls, method_name, storage.generate_method(definition))
+            return
+
+        indexed_fields: List[str] = []
+        sorted_fields: List[str] = []
+        for definition in definitions.values():
+            for i, (field_name, _) in enumerate(definition.fields):
+                if definition.operator(i) in ("eq", "in"):
+                    fields = indexed_fields
+                else:
+                    fields = sorted_fields
+                if field_name not in fields:
+                    fields.append(field_name)
+            for field_name, _ in definition.order:
+                if field_name not in sorted_fields:
+                    sorted_fields.append(field_name)
+        self.logger.debug(f"Indexing fields {indexed_fields}, sorted {sorted_fields}")
+        records = RecordType(entity_type(repo_cls)) if getattr(repo_cls, "_compact", False) else None
+
         self.logger.debug("Patching constructor")
         original_init = getattr(repo_cls, "__init__", lambda self: None)
 
         def new_init(self, *args, **kwargs):  # type: ignore
             original_init(self, *args, **kwargs)
-            self._store = {}
+            self._store = IndexedStore(indexed_fields, sorted_fields, backend=storage, records=records)
         repo_cls.__init__ = new_init  # type: ignore
 
-        for method_name, _ in inspect.getmembers(repo_cls, predicate=inspect.isfunction):
-            if method_name.startswith("_"):
-                continue
-            self.logger.debug(f"Parsing repository method: {method_name}")
-            parsed_func = self.parse_method(method_name)
+        for method_name, definition in definitions.items():
             self.logger.debug(f"Patching repository method: {method_name}")
-            setattr(repo_cls, method_name, parsed_func)
+            setattr(repo_cls, method_name, self.generate_method(definition))
 
-    def parse_method(self, method_name: str) -> Callable | None:
+    def parse_definition(self, method_name: str) -> RepoMethodDefinition:
         tokens = tokenize_method(method_name)
         parser = TokenParser(tokens)
-        parsed = parser.parse()
-        return self.generate_method(parsed)
+        return parser.parse()
+
+    def parse_method(self, method_name: str) -> Callable | None:
+        return self.generate_method(self.parse_definition(method_name))
 
     def generate_method(self, definition: RepoMethodDefinition) -> Callable | None:
+        if definition.action == "save" and definition.all:
+            def save_all(self, entities):  # type: ignore
+                entities = list(entities)
+                transaction = current_transaction()
+                if transaction is not None:
+                    for entity in entities:
+                        transaction.save(self._store, getattr(entity, "id"), entity)
+                    return entities
+                self._store.put_all({getattr(entity, "id"): entity for entity in entities})
+                return entities
+            return save_all
         if definition.action == "save":
             def save(self, entity):  # type: ignore
+                transaction = current_transaction()
+                if transaction is not None:
+                    transaction.save(self._store, getattr(entity, "id"), entity)
+                    return entity
                 self._store[getattr(entity, "id")] = entity
                 return entity
             return save
 
         self.logger.debug(definition.fields)
         pred = RepoPredicate()
-        pred.build_tree(definition.fields)
-        predicate = pred.make_predicate()
-
-        ret = self.get_return(definition)
+        pred.build_tree(definition.fields, definition.operators)
+        scan = pred.make_filter()
+        index_lookup = pred.make_index_lookup()
 
         # TODO: define associations btwn args/kwargs and fields
         # TODO: use return type for definiton.all if any
 
-        def query(self, *args, **kwargs):  # type: ignore
-            # TODO: correctly map args and kwargs
-            arg = {}
-            for i, (field, _) in enumerate(definition.fields):
-                if i < len(args):
-                    arg[field] = args[i]
-
-            all = list(self._store.values())
-            if predicate is not None:
-                candidates = [e for e in all if predicate(e, arg)]
+        order = definition.order
+        action = definition.action
+        head = pred.head
+        project = attrgetter(*definition.projection) if definition.projection else None
+
+        def select(store: Any, arg: dict, limit: Optional[int]) -> Iterator[Any]:
+            indexed = isinstance(store, IndexedStore)
+            ids = None
+            if index_lookup is not None and indexed:
+                ids = index_lookup(store, arg)
+            if ids is None and len(order) == 1 and indexed:
+                # walking the sorted index yields matches already ordered,
+                # so the first ones can be returned without a full scan
+                ordered_ids = store.ordered_ids(order[0][0], order[0][1] == "desc")
+                if ordered_ids is not None:
+                    return islice(matching(store, ordered_ids, scan, arg), limit)
+
+            if ids is not None:
+                found = matching(store, ids, scan, arg)
             else:
-                candidates = all
+                entities = store.snapshot() if indexed else tuple(store.values())
+                found = scan(entities, arg) if scan is not None else iter(entities)
+            if order:
+                return iter(order_entities(list(found), order, limit))
+            return islice(found, limit)
 
-            if len(candidates) == 0:
-                return [] if definition.all else None
-            if not definition.all and definition.action != "count":
-                candidates = [candidates[0]]
+        def overlay(store: IndexedStore, arg: dict, limit: Optional[int], pending: Dict[Any, Any]) -> Iterator[Any]:
+            """Matches with the writes pending in a transaction in place
+            of the stored entities they replace or delete."""
+            found: Iterator[Any] = (
+                    entity for entity in select(store, arg, None)
+                    if getattr(entity, "id") not in pending
+            )
+            saved = [entity for entity in pending.values() if entity is not DELETED]
+            found = chain(found, scan(saved, arg) if scan is not None else saved)
+            if order:
+                return iter(order_entities(list(found), order, limit))
+            return islice(found, limit)
 
-            if definition.action == "delete":
-                for entity in candidates:
-                    self._store.pop(entity.id)
-            return ret(candidates)
-        return query
+        def count(store: IndexedStore, arg: dict) -> int:
+            if head is None:
+                return len(store)
+            if head.field_name:
+                counted = store.count_op(head.field_name, head.operator, arg.get(head.index))
+                if counted is not None:
+                    return counted
+            return sum(1 for _ in select(store, arg, None))
 
-    def get_return(self, definition: RepoMethodDefinition) -> Callable:
-        def find_del_return(candidates: list) -> Any:
-            if definition.all:
-                return candidates
-            elif len(candidates) > 0:
-                return candidates[0]
+        def query(self, *args, **kwargs):  # type: ignore
+            arg, limit, pageable = bind_args(definition, args, kwargs)
+            store = self._store
+            transaction = current_transaction()
+            pending = transaction.pending(store) if transaction is not None else None
+            if action == "count" and project is None and limit is None and pageable is None and not pending:
+                return count(store, arg)
+            find = select if not pending else partial(overlay, pending=pending)
+            found: Iterator[Any]
+            if project is not None:
+                # limits apply to the distinct values, not the entities
+                found = islice(unique(map(project, find(store, arg, None))), limit)
             else:
-                return None
-        if definition.action in ["find", "delete"]:
-            return find_del_return
-
-        def count_return(candidates: list) -> int:
-            return len(candidates)
-        if definition.action == "count":
-            return count_return
-        return find_del_return
+                found = find(store, arg, limit)
+            # records kept by a compact store are only unpacked into
+            # entities when they are returned
+            unpack = store.unpack if project is None else None
+            if pageable is not None:
+                page = make_page(found, pageable)
+                if unpack is not None:
+                    page.content = [unpack(record) for record in page.content]
+                return page
+            if action == "count":
+                return sum(1 for _ in found)
+            if action == "exists":
+                return next(found, None) is not None
+            if definition.aggregate is not None:
+                getter = attrgetter(definition.aggregate)
+                return aggregate(cast(str, action), (getter(entity) for entity in found))
+            if unpack is not None:
+                found = map(unpack, found)
+            if action == "stream":
+                return found
+            if not definition.all:
+                first = next(found, None)
+                if first is not None and action == "delete":
+                    if transaction is not None:
+                        transaction.delete(store, first.id)
+                    else:
+                        store.pop(first.id, None)
+                return first
+
+            candidates = list(found)
+            if action == "delete":
+                if transaction is not None:
+                    for entity in candidates:
+                        transaction.delete(store, entity.id)
+                    return candidates
+                return store.remove_all(entity.id for entity in candidates)
+            return candidates
+        return query
+
+
+def bind_args(
+        definition: RepoMethodDefinition,
+        args: tuple,
+        kwargs: dict
+) -> tuple[dict, Optional[int], Optional[Pageable]]:
+    """Splits the arguments of a repository method into the condition
+    arguments keyed by position, the limit and the requested page."""
+    pageable = kwargs.get("pageable")
+    if pageable is None and args and isinstance(args[-1], Pageable):
+        pageable = args[-1]
+        args = args[:-1]
+    # TODO: correctly map kwargs
+    fields_len = len(definition.fields)
+    arg = {i: args[i] for i in range(min(fields_len, len(args)))}
+    limit = definition.limit
+    if definition.limit_arg:
+        limit = args[fields_len] if fields_len < len(args) else kwargs.get("limit")
+    return arg, limit, pageable
+
+
+def matching(
+        store: IndexedStore,
+        ids: Iterable[Any],
+        scan: Optional[Callable[..., Iterator[Any]]],
+        arg: dict
+) -> Iterator[Any]:
+    """Entities for the given ids that pass the scan. Index lookups
+    may be stale for entities changed in place or by a concurrent
+    write, so matches are always checked again."""
+    entities = store.fetch(ids)
+    if scan is None:
+        return entities
+    return scan(entities, arg)
+
+
+def unique(values: Iterable[Any]) -> Iterator[Any]:
+    """Yields each value once, in the order first seen. Values are
+    deduplicated with a set; unhashable ones, like lists, by comparing
+    them with the unhashable values seen before."""
+    seen = set()
+    unhashable: List[Any] = []
+    for value in values:
+        try:
+            if value in seen:
+                continue
+            seen.add(value)
+        except TypeError:
+            if value in unhashable:
+                continue
+            unhashable.append(value)
+        yield value
+
+
+def aggregate(action: str, values: Iterable[Any]) -> Any:
+    """Sum, average, minimum or maximum of the values, skipping None
+    like SQL does; only sum has a value, 0, when there are none."""
+    present = (value for value in values if value is not None)
+    if action == "sum":
+        return sum(present)
+    if action == "avg":
+        total = 0
+        count = 0
+        for value in present:
+            total += value
+            count += 1
+        return total / count if count else None
+    if action == "min":
+        return min(present, default=None)
+    if action == "max":
+        return max(present, default=None)
+    raise Exception(f"Unknown aggregate {action}")
+
+
+def sort_key(name: str, descending: bool) -> Callable[[Any], Any]:
+    """Orders entities by a field, with None values last."""
+    getter = attrgetter(name)
+    if descending:
+        return lambda entity: (getter(entity) is not None, getter(entity))
+    return lambda entity: (getter(entity) is None, getter(entity))
+
+
+def order_entities(entities: list, order: List[tuple[str, str]], limit: Optional[int]) -> list:
+    if len(order) == 1 and limit is not None:
+        name, direction = order[0]
+        if direction == "desc":
+            return nlargest(limit, entities, key=sort_key(name, True))
+        return nsmallest(limit, entities, key=sort_key(name, False))
+    for name, direction in reversed(order):
+        descending = direction == "desc"
+        entities.sort(key=sort_key(name, descending), reverse=descending)
+    return entities[:limit] if limit is not None else entities
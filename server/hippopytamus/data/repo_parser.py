@@ -9,6 +9,21 @@ class RepoMethodDefinition:
     all: bool = False
     distinct: bool = False
     fields: list[tuple[str, str]] = field(default_factory=list)
+    # comparison for each entry of fields: eq, greater_than, less_than,
+    # between, in or starting_with
+    operators: list[str] = field(default_factory=list)
+    # (field, 'asc' | 'desc') pairs from order_by
+    order: list[tuple[str, str]] = field(default_factory=list)
+    limit: int | None = None
+    # limit passed as the argument after the field arguments
+    limit_arg: bool = False
+    # field summed, averaged or compared by the sum, avg, min and max actions
+    aggregate: str | None = None
+    # fields returned instead of entities, from find_distinct_<fields>_by
+    projection: list[str] = field(default_factory=list)
+
+    def operator(self, i: int) -> str:
+        return self.operators[i] if i < len(self.operators) else "eq"
 
 
 class Token(Enum):
@@ -16,8 +31,13 @@ class Token(Enum):
     DELETE = auto()
     COUNT = auto()
     SAVE = auto()
+    STREAM = auto()
+    EXISTS = auto()
+    AGGREGATE = auto()
 
     DISTINCT = auto()
+    FIRST = auto()
+    TOP = auto()
 
     BY = auto()
     ALL = auto()
@@ -26,14 +46,41 @@ class Token(Enum):
     OR = auto()
     FIELD = auto()
 
+    GREATER_THAN = auto()
+    LESS_THAN = auto()
+    BETWEEN = auto()
+    IN = auto()
+    STARTING_WITH = auto()
+
+    ORDER_BY = auto()
+    ASC = auto()
+    DESC = auto()
+    LIMIT = auto()
+
 
 Tok = tuple[Token, str] | Token
 
+TWO_WORD_OPERATORS = {
+    ("greater", "than"): Token.GREATER_THAN,
+    ("less", "than"): Token.LESS_THAN,
+    ("starting", "with"): Token.STARTING_WITH,
+}
+OPERATORS = {
+    Token.GREATER_THAN: "greater_than",
+    Token.LESS_THAN: "less_than",
+    Token.BETWEEN: "between",
+    Token.IN: "in",
+    Token.STARTING_WITH: "starting_with",
+}
+CONDITION_END = (None, 'and', 'or', 'order', 'limit')
+AGGREGATES = ('sum', 'avg', 'min', 'max')
+
 
 def tokenize_method(name: str) -> list[Tok]:
     parts = name.split('_')
     tokens: list[Tok] = []
     i = 0
+    ordering = False
 
     curr_field: list[str] = []
 
@@ -42,20 +89,56 @@ def tokenize_method(name: str) -> list[Tok]:
             tokens.append((Token.FIELD, "_".join(curr_field)))
             curr_field.clear()
 
+    def after_field() -> bool:
+        if curr_field:
+            return True
+        return len(tokens) > 0 and tokens[-1] not in (Token.BY, Token.AND, Token.OR, Token.ORDER_BY)
+
     while i < len(parts):
         part = parts[i]
-        if part == 'find':
+        nxt = parts[i + 1] if i + 1 < len(parts) else None
+        last = tokens[-1] if tokens else None
+        if curr_field and (part, nxt) in TWO_WORD_OPERATORS:
             append_field()
-            tokens.append(Token.FIND)
-        elif part == 'delete':
+            tokens.append(TWO_WORD_OPERATORS[(part, cast(str, nxt))])
+            i += 1
+        elif curr_field and part in ('between', 'in') and nxt in CONDITION_END:
             append_field()
-            tokens.append(Token.DELETE)
-        elif part == 'count':
+            tokens.append(Token.BETWEEN if part == 'between' else Token.IN)
+        elif curr_field and ordering and part in ('asc', 'desc') and nxt in (None, 'and', 'limit'):
             append_field()
-            tokens.append(Token.COUNT)
-        elif part == 'save':
+            tokens.append(Token.ASC if part == 'asc' else Token.DESC)
+        elif part == 'order' and nxt == 'by':
+            append_field()
+            tokens.append(Token.ORDER_BY)
+            ordering = True
+            i += 1
+        elif part == 'first' and last in (Token.FIND, Token.DELETE, Token.STREAM) and not curr_field:
+            tokens.append(Token.FIRST)
+        elif part == 'top' and last in (Token.FIND, Token.DELETE, Token.STREAM) and nxt and nxt.isdigit():
+            tokens.append((Token.TOP, nxt))
+            i += 1
+        elif part == 'limit' and after_field() and (nxt is None or (nxt.isdigit() and i + 2 == len(parts))):
             append_field()
+            if nxt is None:
+                tokens.append(Token.LIMIT)
+            else:
+                tokens.append((Token.LIMIT, nxt))
+                i += 1
+        elif part == 'find' and not tokens and not curr_field:
+            tokens.append(Token.FIND)
+        elif part == 'delete' and not tokens and not curr_field:
+            tokens.append(Token.DELETE)
+        elif part == 'count' and not tokens and not curr_field:
+            tokens.append(Token.COUNT)
+        elif part == 'save' and not tokens and not curr_field:
             tokens.append(Token.SAVE)
+        elif part == 'stream' and not tokens and not curr_field:
+            tokens.append(Token.STREAM)
+        elif part == 'exists' and not tokens and not curr_field:
+            tokens.append(Token.EXISTS)
+        elif part in AGGREGATES and not tokens and not curr_field:
+            tokens.append((Token.AGGREGATE, part))
         elif part == 'distinct':
             append_field()
             tokens.append(Token.DISTINCT)
@@ -91,6 +174,12 @@ class TokenParser:
     def current(self) -> Tok | None:
         return self.tokens[self.pos] if self.pos < self.length else None
 
+    def current_is(self, token: Token) -> bool:
+        cur = self.current()
+        if isinstance(cur, tuple):
+            return cur[0] == token
+        return cur == token
+
     def consume(self, expected: Tok | None = None) -> Tok | None:
         cur = self.current()
         if expected:
@@ -107,11 +196,29 @@ class TokenParser:
         result = RepoMethodDefinition()
 
         cur = self.current()
-        if cur not in (Token.FIND, Token.DELETE, Token.COUNT, Token.SAVE):
+        if self.current_is(Token.AGGREGATE):
+            result.action = cast(tuple[Token, str], self.consume())[1]
+            aggregated = self.current()
+            if not (isinstance(aggregated, tuple) and aggregated[0] == Token.FIELD):
+                raise MethodParseError(f"Expected field to {result.action}, got {aggregated}")
+            result.aggregate = aggregated[1]
+            self.consume()
+        elif cur not in (Token.FIND, Token.DELETE, Token.COUNT, Token.SAVE, Token.STREAM, Token.EXISTS):
             raise MethodParseError(f"Method must start with action, got {cur}")
-        cur = cast(Token, cur)
-        result.action = cur.name.lower()
-        self.consume()
+        else:
+            cur = cast(Token, cur)
+            result.action = cur.name.lower()
+            # streams yield every match, like find_all
+            result.all = cur == Token.STREAM
+            self.consume()
+
+        if self.current() == Token.FIRST:
+            result.limit = 1
+            self.consume()
+        elif self.current_is(Token.TOP):
+            top = cast(tuple[Token, str], self.consume())
+            result.limit = int(top[1])
+            result.all = True
 
         if self.current() == Token.ALL:
             result.all = True
@@ -120,31 +227,87 @@ class TokenParser:
         if self.current() == Token.DISTINCT:
             result.distinct = True
             self.consume()
+            if self.current_is(Token.FIELD):
+                if result.action not in ("find", "stream", "count"):
+                    raise MethodParseError(f"Can't project fields in {result.action}")
+                result.projection = self.parse_projection()
+                # a projection lists every distinct value unless first is given
+                result.all = result.all or result.limit != 1
 
         if self.current() == Token.BY:
             self.consume()
-            result.fields = self.parse_fields()
-        elif self.current():
+            result.fields, result.operators = self.parse_fields()
+
+        if self.current() == Token.ORDER_BY:
+            self.consume()
+            result.order = self.parse_order()
+
+        if self.current() == Token.LIMIT:
+            self.consume()
+            result.limit_arg = True
+            result.all = True
+        elif self.current_is(Token.LIMIT):
+            limit = cast(tuple[Token, str], self.consume())
+            result.limit = int(limit[1])
+            result.all = True
+
+        if self.current_is(Token.FIELD):
             raise MethodParseError("Fields must be preceded by 'by'")
+        elif self.current():
+            raise MethodParseError(f"Unexpected token {self.current()}")
 
         return result
 
-    def parse_fields(self) -> list[tuple[str, str]]:
+    def parse_fields(self) -> tuple[list[tuple[str, str]], list[str]]:
         fields = []
+        operators = []
         while self.pos < self.length:
             cur = self.current()
+            if cur == Token.ORDER_BY or self.current_is(Token.LIMIT):
+                break
             if isinstance(cur, tuple) and cur[0] == Token.FIELD:
                 field_name = cur[1]
                 self.consume()
+                operator = "eq"
+                if self.current() in OPERATORS:
+                    operator = OPERATORS[cast(Token, self.consume())]
                 connector = ''
                 if self.current() in (Token.AND, Token.OR):
                     consumed = cast(Token, self.consume())
                     connector = consumed.name.lower()
                 fields.append((field_name, connector))
+                operators.append(operator)
             else:
                 raise MethodParseError(f"Unexpected token {cur} in fields")
-        if len(fields) > 0:
-            last = fields[len(fields) - 1]
-            if last[1] != '':
-                raise MethodParseError("Unfinished method")
-        return fields
+        if len(fields) == 0:
+            raise MethodParseError("Expected fields after 'by'")
+        last = fields[len(fields) - 1]
+        if last[1] != '':
+            raise MethodParseError("Unfinished method")
+        return fields, operators
+
+    def parse_projection(self) -> list[str]:
+        projection = []
+        while True:
+            cur = cast(tuple[Token, str], self.consume())
+            projection.append(cur[1])
+            if self.current() != Token.AND:
+                return projection
+            self.consume()
+            if not self.current_is(Token.FIELD):
+                raise MethodParseError(f"Expected field to project, got {self.current()}")
+
+    def parse_order(self) -> list[tuple[str, str]]:
+        order = []
+        while True:
+            cur = self.current()
+            if not (isinstance(cur, tuple) and cur[0] == Token.FIELD):
+                raise MethodParseError(f"Expected field to order by, got {cur}")
+            self.consume()
+            direction = 'asc'
+            if self.current() in (Token.ASC, Token.DESC):
+                direction = cast(Token, self.consume()).name.lower()
+            order.append((cur[1], direction))
+            if self.current() != Token.AND:
+                return order
+            self.consume()
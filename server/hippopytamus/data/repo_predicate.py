@@ -1,4 +1,55 @@
-from typing import Callable
+import json
+import keyword
+from operator import attrgetter
+from typing import Any, Callable
+from hippopytamus.data.store import intersect, union
+
+
+# Python expressions for each comparison operator; {var} is a local
+# holding the field value when it's used more than once
+CONDITIONS = {
+    "eq": "{value} == {arg}",
+    "greater_than": "(({var} := {value}) is not None and {var} > {arg})",
+    "less_than": "(({var} := {value}) is not None and {var} < {arg})",
+    "between": "(({var} := {value}) is not None and {arg}[0] <= {var} <= {arg}[1])",
+    "in": "{value} in {arg}",
+    "starting_with": "(isinstance({var} := {value}, str) and {var}.startswith({arg}))",
+}
+
+
+def as_set(values: Any) -> Any:
+    """Turns the argument of an 'in' condition into a set for scans."""
+    try:
+        return frozenset(values)
+    except TypeError:
+        return values
+
+
+SQL_CONDITIONS = {
+    "eq": "{} IS ?",
+    "greater_than": "{} > ?",
+    "less_than": "{} < ?",
+    "between": "{} BETWEEN ? AND ?",
+    "in": "{} IN (SELECT value FROM json_each(?))",
+    "starting_with": "({0} >= ? AND {0} < ?)",
+}
+
+
+def sql_params(operator: str, arg: Any) -> list:
+    """Returns the SQL parameters for an argument of a condition."""
+    if operator == "between":
+        return [arg[0], arg[1]]
+    if operator == "in":
+        return [json.dumps(list(arg))]
+    if operator == "starting_with":
+        # SQLite orders every text value before any blob
+        upper = arg[:-1] + chr(ord(arg[-1]) + 1) if arg else b""
+        return [arg, upper]
+    return [arg]
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
 
 
 class Node:
@@ -7,25 +58,34 @@ class Node:
             field_name: str | None = None,
             left: "Node | None" = None,
             right: "Node | None" = None,
-            op: str | None = None
+            op: str | None = None,
+            index: int = 0,
+            operator: str = "eq"
     ):
         self.field_name = field_name
         self.left = left
         self.right = right
         self.op = op
+        # position of the condition in the method name; arguments
+        # are passed to predicates in a dict keyed by it
+        self.index = index
+        self.operator = operator
 
 
 class RepoPredicate:
     def __init__(self) -> None:
         self.head: Node | None = None
+        self.source = ""
+        self.compiled: dict | None = None
 
-    def build_tree(self, fields: list) -> None:
+    def build_tree(self, fields: list, operators: list[str] | None = None) -> None:
         stack = []
         and_group = []
         node = None
 
-        for fld, op in fields:
-            node = Node(field_name=fld)
+        for i, (fld, op) in enumerate(fields):
+            operator = operators[i] if operators and i < len(operators) else "eq"
+            node = Node(field_name=fld, index=i, operator=operator)
             and_group.append(node)
 
             if op == 'or' or op == '':
@@ -43,6 +103,7 @@ class RepoPredicate:
             node = Node(left=node, right=stack.pop(0), op='or')
 
         self.head = node
+        self.compiled = None
 
     def print(self, node: Node | None = None, indent: int = 0) -> None:
         if node is None:
@@ -59,20 +120,124 @@ class RepoPredicate:
             if node.right:
                 self.print(node.right, indent + 1)
 
-    def make_predicate(self, node: Node | None = None) -> Callable:
+    def make_predicate(self) -> Callable:
+        """Returns a function (entity, args) telling if the entity
+        matches, or None if there are no conditions."""
+        compiled = self.compile()
+        return compiled["predicate"] if compiled else None  # type: ignore
+
+    def make_filter(self) -> Callable:
+        """Returns a generator function (entities, args) yielding the
+        matching entities, or None if there are no conditions."""
+        compiled = self.compile()
+        return compiled["scan"] if compiled else None  # type: ignore
+
+    def compile(self) -> dict | None:
+        """Generates the source of the predicate and scan functions from
+        the tree and compiles it once, so a test is a single flat
+        expression with arguments bound to locals instead of a call
+        per node of the tree."""
+        if self.head is None:
+            return None
+        if self.compiled is not None:
+            return self.compiled
+        names: dict[str, Any] = {"as_set": as_set}
+        expression = self.make_expression(self.head, names)
+        conditions = self.conditions(self.head)
+        binds = "".join(f"    a{node.index} = args.get({node.index})\n" for node in conditions)
+        sets = "".join(
+                f"    a{node.index} = as_set(a{node.index})\n"
+                for node in conditions if node.operator == "in"
+        )
+        self.source = (
+                f"def predicate(entity, args):\n{binds}"
+                f"    return {expression}\n\n\n"
+                f"def scan(entities, args):\n{binds}{sets}"
+                f"    for entity in entities:\n"
+                f"        if {expression}:\n"
+                f"            yield entity\n"
+        )
+        exec(compile(self.source, "<repository predicate>", "exec"), names)
+        self.compiled = names
+        return names
+
+    def conditions(self, node: Node | None) -> list[Node]:
+        if node is None:
+            return []
+        if node.field_name:
+            return [node]
+        return self.conditions(node.left) + self.conditions(node.right)
+
+    def make_expression(self, node: Node | None, names: dict[str, Any]) -> str:
+        if node is None:
+            raise Exception("Wrong node operation")
+        if node.field_name:
+            key = node.index
+            name = node.field_name
+            if name.isidentifier() and not keyword.iskeyword(name):
+                value = f"entity.{name}"
+            else:
+                names[f"get{key}"] = attrgetter(name)
+                value = f"get{key}(entity)"
+            if node.operator not in CONDITIONS:
+                raise Exception(f"Unknown operator {node.operator}")
+            return CONDITIONS[node.operator].format(value=value, arg=f"a{key}", var=f"v{key}")
+        if node.op not in ('and', 'or'):
+            raise Exception("Wrong node operation")
+        left = self.make_expression(node.left, names)
+        right = self.make_expression(node.right, names)
+        return f"({left} {node.op} {right})"
+
+    def make_index_lookup(self, node: Node | None = None) -> Callable:
+        """Builds a function (store, args) returning candidate ids from
+        the store's indexes, or None if a full scan is needed."""
         if node is None:
             node = self.head
         if node is None:
             return None  # type: ignore
         if node.field_name:
             name = node.field_name
-            return lambda entity, args: getattr(entity, name) == args.get(name)
-        elif node.op == 'and':
-            left_pred = self.make_predicate(node.left)
-            right_pred = self.make_predicate(node.right)
-            return lambda entity, args: left_pred(entity, args) and right_pred(entity, args)
+            key = node.index
+            operator = node.operator
+            return lambda store, args: store.lookup_op(name, operator, args.get(key))
+        left_lookup = self.make_index_lookup(node.left)
+        right_lookup = self.make_index_lookup(node.right)
+        if node.op == 'and':
+            def and_lookup(store, args):  # type: ignore
+                left = left_lookup(store, args)
+                if left is not None and not left:
+                    return left
+                right = right_lookup(store, args)
+                if left is None:
+                    return right
+                if right is None:
+                    return left
+                return intersect(left, right)
+            return and_lookup
         elif node.op == 'or':
-            left_pred = self.make_predicate(node.left)
-            right_pred = self.make_predicate(node.right)
-            return lambda entity, args: left_pred(entity, args) or right_pred(entity, args) 
+            def or_lookup(store, args):  # type: ignore
+                left = left_lookup(store, args)
+                if left is None:
+                    return None
+                right = right_lookup(store, args)
+                if right is None:
+                    return None
+                return union(left, right)
+            return or_lookup
         raise Exception("Wrong node operation")
+
+    def make_sql(self, node: Node | None = None) -> tuple[str, list[tuple[int, str]]]:
+        """Builds a parameterized SQL condition, with the (argument
+        position, operator) pairs its parameters come from."""
+        if node is None:
+            node = self.head
+        if node is None:
+            return "", []
+        if node.field_name:
+            condition = SQL_CONDITIONS[node.operator].format(quote(node.field_name))
+            return condition, [(node.index, node.operator)]
+        if node.op not in ('and', 'or'):
+            raise Exception("Wrong node operation")
+        left_sql, left_params = self.make_sql(node.left)
+        right_sql, right_params = self.make_sql(node.right)
+        return f"({left_sql} {node.op.upper()} {right_sql})", left_params + right_params
@@ -1,4 +1,5 @@
-from typing import TypeVar, Generic, List, Optional
+from typing import TypeVar, Generic, Iterable, List, Optional, Union, get_args, get_origin
+from hippopytamus.data.storage import QueryBackend, StorageBackend
 from hippopytamus.logger.logger import LoggerFactory
 
 T = TypeVar("T")
@@ -6,6 +7,13 @@ ID = TypeVar("ID")
 
 
 class HippoRepository(Generic[T, ID]):
+    # entities are kept in memory only, unless a backend is set
+    # on the repository class, e.g. LogStorage("users.log")
+    _storage: Optional[Union[StorageBackend, QueryBackend]] = None
+    # keep in-memory entities as slotted records and return copies,
+    # for HippoRepository[Entity, ID] with a dataclass entity
+    _compact: bool = False
+
     def __init__(self) -> None:
         self.logger = LoggerFactory.get_logger()
         self.logger.info("Repo created")
@@ -13,11 +21,34 @@ class HippoRepository(Generic[T, ID]):
     def save(self, entity: T) -> T:
         raise NotImplementedError
 
+    def save_all(self, entities: Iterable[T]) -> List[T]:
+        raise NotImplementedError
+
     def find_by_id(self, id: ID) -> Optional[T]:
         raise NotImplementedError
 
     def find_all(self) -> List[T]:
         raise NotImplementedError
 
+    def find_all_by_id_in(self, ids: Iterable[ID]) -> List[T]:
+        raise NotImplementedError
+
+    def exists_by_id(self, id: ID) -> bool:
+        raise NotImplementedError
+
     def delete_by_id(self, id: ID) -> None:
         raise NotImplementedError
+
+    def delete_all_by_id_in(self, ids: Iterable[ID]) -> List[T]:
+        raise NotImplementedError
+
+
+def entity_type(repo_cls: type) -> Optional[type]:
+    """Returns T of a repository declared as HippoRepository[T, ID]."""
+    for cls in repo_cls.__mro__:
+        for base in getattr(cls, "__orig_bases__", ()):
+            if get_origin(base) is HippoRepository:
+                args = get_args(base)
+                if args and isinstance(args[0], type):
+                    return args[0]
+    return None
@@ -0,0 +1,344 @@
+import pickle
+import sqlite3
+import threading
+import weakref
+from dataclasses import fields, is_dataclass
+from functools import partial
+from types import NoneType, UnionType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union, cast, get_args, get_origin, get_type_hints
+from hippopytamus.data.page import Page
+from hippopytamus.data.repo_creator import bind_args
+from hippopytamus.data.repo_parser import RepoMethodDefinition
+from hippopytamus.data.repo_predicate import RepoPredicate, quote, sql_params
+from hippopytamus.data.storage import QueryBackend, StorageError
+from hippopytamus.data.transaction import current_transaction
+from hippopytamus.logger.logger import LoggerFactory
+
+SQL_TYPES = {int: "INTEGER", float: "REAL", str: "TEXT", bytes: "BLOB", bool: "INTEGER"}
+SQL_AGGREGATES = {"sum": "COALESCE(SUM({0}), 0)", "avg": "AVG({0})", "min": "MIN({0})", "max": "MAX({0})"}
+
+
+class Column:
+    """Maps a dataclass field to a column; values of types SQLite
+    doesn't store are pickled."""
+
+    def __init__(self, name: str, hint: Any) -> None:
+        self.name = name
+        if get_origin(hint) in (Union, UnionType):
+            args = [arg for arg in get_args(hint) if arg is not NoneType]
+            hint = args[0] if len(args) == 1 else object
+        self.sql_type = SQL_TYPES.get(hint, "BLOB")
+        self.write: Optional[Callable[[Any], Any]] = None
+        self.read: Optional[Callable[[Any], Any]] = None
+        if hint is bool:
+            self.read = bool
+        elif hint not in SQL_TYPES:
+            self.write = pickle.dumps
+            self.read = pickle.loads
+
+
+class ThreadConnection:
+    """Holds the connection of a thread in a threading.local; the
+    local drops it when the thread ends, which closes the connection."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+
+def release(connections: Dict[int, sqlite3.Connection], lock: threading.Lock,
+            ident: int, conn: sqlite3.Connection) -> None:
+    with lock:
+        if connections.get(ident) is conn:
+            del connections[ident]
+    conn.close()
+
+
+class SqliteStorage(QueryBackend):
+    """Keeps the entities of a repository in a SQLite table and runs
+    its methods as SQL.
+
+    The statements of every method are generated once, when the
+    repository is created; sqlite3 keeps them prepared in the
+    statement cache of each connection. Each thread gets its own
+    connection, in autocommit mode and with a write-ahead log, so
+    readers don't wait for writers; it is closed when the thread ends
+    and the connections of running threads are closed by close. Inside a @Transactional call the
+    connection of the thread runs a SQLite transaction, committed or
+    rolled back with it."""
+
+    def __init__(self, path: str, timeout: float = 5.0) -> None:
+        self.path = path
+        self.uri = False
+        self.keepalive: Optional[sqlite3.Connection] = None
+        if path == ":memory:":
+            # a shared in-memory database lives while a connection is open
+            self.path = f"file:hippo-{id(self)}?mode=memory&cache=shared"
+            self.uri = True
+        self.timeout = timeout
+        self.logger = LoggerFactory.get_logger()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.connections: Dict[int, sqlite3.Connection] = {}
+        self.cached_statements = 128
+        self.entity_cls: Optional[type] = None
+        self.table = ""
+        self.columns: List[Column] = []
+        self.by_name: Dict[str, Column] = {}
+        self.select_columns = ""
+        self.converted = False
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+                self.path,
+                timeout=self.timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=self.cached_statements,
+                uri=self.uri
+        )
+        if not self.uri:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        holder = getattr(self.local, "connection", None)
+        if holder is None:
+            holder = self.local.connection = self.open_connection()
+        conn = holder.conn
+        transaction = current_transaction()
+        if transaction is not None and transaction.join(
+                self, partial(conn.execute, "COMMIT"), partial(conn.execute, "ROLLBACK")
+        ):
+            # takes the write lock up front, so transactions wait for
+            # each other instead of failing to upgrade a read
+            conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    def open_connection(self) -> ThreadConnection:
+        ident = threading.get_ident()
+        holder = ThreadConnection(self.connect())
+        with self.lock:
+            if self.uri and self.keepalive is None:
+                self.keepalive = self.connect()
+            self.connections[ident] = holder.conn
+        weakref.finalize(holder, release, self.connections, self.lock, ident, holder.conn)
+        return holder
+
+    def prepare(self, entity_cls: Optional[type], definitions: Iterable[RepoMethodDefinition]) -> None:
+        if entity_cls is None or not is_dataclass(entity_cls):
+            raise StorageError(
+                    "SqliteStorage needs a dataclass entity, "
+                    "declare the repository as HippoRepository[Entity, ID]"
+            )
+        definitions = list(definitions)
+        hints = get_type_hints(entity_cls)
+        self.entity_cls = entity_cls
+        self.table = quote(entity_cls.__name__)
+        self.columns = [Column(f.name, hints.get(f.name, Any)) for f in fields(entity_cls)]
+        self.by_name = {column.name: column for column in self.columns}
+        self.select_columns = ", ".join(quote(column.name) for column in self.columns)
+        self.converted = any(column.read or column.write for column in self.columns)
+        self.cached_statements = max(128, 4 * len(definitions))
+        names = [column.name for column in self.columns]
+        if "id" not in names:
+            raise StorageError(f"Entity {entity_cls.__name__} has no id field")
+
+        queried: List[str] = []
+        for definition in definitions:
+            for name in definition.projection + ([definition.aggregate] if definition.aggregate else []):
+                if name not in names:
+                    raise StorageError(f"Entity {entity_cls.__name__} has no field {name}")
+            for name in [f for f, _ in definition.fields] + [f for f, _ in definition.order]:
+                if name not in names:
+                    raise StorageError(f"Entity {entity_cls.__name__} has no field {name}")
+                if name != "id" and name not in queried:
+                    queried.append(name)
+
+        conn = self.connection()
+        columns = ", ".join(
+                f"{quote(c.name)} {c.sql_type}" + (" PRIMARY KEY" if c.name == "id" else "")
+                for c in self.columns
+        )
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({columns})")
+        for name in queried:
+            index = quote(f"{entity_cls.__name__}_{name}")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {self.table} ({quote(name)})")
+        self.logger.debug(f"Prepared table {self.table}, indexed {queried}")
+
+    def to_row(self, entity: Any) -> List[Any]:
+        if not self.converted:
+            return [getattr(entity, column.name) for column in self.columns]
+        row = []
+        for column in self.columns:
+            value = getattr(entity, column.name)
+            if column.write is not None and value is not None:
+                value = column.write(value)
+            row.append(value)
+        return row
+
+    def to_entity(self, row: tuple) -> Any:
+        cls = self.entity_cls
+        if not self.converted:
+            return cls(*row)  # type: ignore[misc]
+        values = []
+        for column, value in zip(self.columns, row):
+            if column.read is not None and value is not None:
+                value = column.read(value)
+            values.append(value)
+        return cls(*values)  # type: ignore[misc]
+
+    def to_projection(self, columns: List[Column], row: tuple) -> Any:
+        """Values of projected columns: a value for one, else a tuple."""
+        values = []
+        for column, value in zip(columns, row):
+            if column.read is not None and value is not None:
+                value = column.read(value)
+            values.append(value)
+        return values[0] if len(values) == 1 else tuple(values)
+
+    def generate_method(self, definition: RepoMethodDefinition) -> Callable:
+        storage = self
+        table = self.table
+        if definition.action == "save":
+            placeholders = ", ".join("?" for _ in self.columns)
+            insert = f"INSERT OR REPLACE INTO {table} ({self.select_columns}) VALUES ({placeholders})"
+
+            if definition.all:
+                def save_all(self, entities):  # type: ignore
+                    entities = list(entities)
+                    storage.transaction(insert, [storage.to_row(entity) for entity in entities])
+                    return entities
+                return save_all
+
+            def save(self, entity):  # type: ignore
+                storage.connection().execute(insert, storage.to_row(entity))
+                return entity
+            return save
+
+        pred = RepoPredicate()
+        pred.build_tree(definition.fields, definition.operators)
+        condition, conditions = pred.make_sql()
+        where = f" WHERE {condition}" if condition else ""
+        order = ""
+        if definition.order:
+            order = " ORDER BY " + ", ".join(
+                    f"{quote(name)} {direction.upper()} NULLS LAST"
+                    for name, direction in definition.order
+            )
+        columns = self.select_columns
+        to_result = self.to_entity
+        if definition.projection:
+            projected = [self.by_name[name] for name in definition.projection]
+            columns = "DISTINCT " + ", ".join(quote(column.name) for column in projected)
+            to_result = partial(self.to_projection, projected)
+        select = f"SELECT {columns} FROM {table}{where}{order}"
+        select_limit = select + " LIMIT ?"
+        select_page = select + " LIMIT ? OFFSET ?"
+        if definition.projection:
+            count = f"SELECT COUNT(*) FROM (SELECT {columns} FROM {table}{where})"
+            count_limit = f"SELECT COUNT(*) FROM (SELECT {columns} FROM {table}{where} LIMIT ?)"
+        else:
+            count = f"SELECT COUNT(*) FROM {table}{where}"
+            count_limit = f"SELECT COUNT(*) FROM (SELECT 1 FROM {table}{where} LIMIT ?)"
+        exists = f"SELECT EXISTS (SELECT 1 FROM {table}{where})"
+        delete = f"DELETE FROM {table}{where} RETURNING {self.select_columns}"
+        delete_limit = (
+                f'DELETE FROM {table} WHERE "id" IN (SELECT "id" FROM {table}{where}{order} LIMIT ?) '
+                f"RETURNING {self.select_columns}"
+        )
+        aggregate = ""
+        aggregate_limit = ""
+        if definition.aggregate is not None:
+            function = SQL_AGGREGATES[cast(str, definition.action)]
+            column = quote(definition.aggregate)
+            aggregate = f"SELECT {function.format(column)} FROM {table}{where}"
+            aggregate_limit = (
+                    f"SELECT {function.format(column)} "
+                    f"FROM (SELECT {column} FROM {table}{where}{order} LIMIT ?)"
+            )
+        action = definition.action
+        first_only = not definition.all and action not in ("count", "exists") and not aggregate
+
+        def params(arg: dict) -> List[Any]:
+            result: List[Any] = []
+            for key, operator in conditions:
+                result.extend(sql_params(operator, arg.get(key)))
+            return result
+
+        def query(self, *args, **kwargs):  # type: ignore
+            arg, limit, pageable = bind_args(definition, args, kwargs)
+            values = params(arg)
+            if first_only:
+                limit = 1
+            conn = storage.connection()
+
+            if pageable is not None:
+                offset = pageable.offset
+                size = pageable.size
+                if limit is None:
+                    total = conn.execute(count, values).fetchone()[0]
+                else:
+                    total = conn.execute(count_limit, values + [limit]).fetchone()[0]
+                    size = max(0, min(size, limit - offset))
+                rows = conn.execute(select_page, values + [size, offset])
+                content = [to_result(row) for row in rows]
+                return Page(content, pageable.page, pageable.size, total)
+            if action == "count":
+                if limit is None:
+                    return conn.execute(count, values).fetchone()[0]
+                return conn.execute(count_limit, values + [limit]).fetchone()[0]
+            if action == "exists":
+                return bool(conn.execute(exists, values).fetchone()[0])
+            if aggregate:
+                if limit is None:
+                    return conn.execute(aggregate, values).fetchone()[0]
+                return conn.execute(aggregate_limit, values + [limit]).fetchone()[0]
+            if action == "delete":
+                if limit is None:
+                    returned = conn.execute(delete, values).fetchall()
+                else:
+                    returned = conn.execute(delete_limit, values + [limit]).fetchall()
+                deleted = [storage.to_entity(row) for row in returned]
+                if first_only:
+                    return deleted[0] if deleted else None
+                return deleted
+
+            if limit is None:
+                cursor = conn.execute(select, values)
+            else:
+                cursor = conn.execute(select_limit, values + [limit])
+            if action == "stream":
+                return map(to_result, cursor)
+            if first_only:
+                row = cursor.fetchone()
+                return to_result(row) if row is not None else None
+            return [to_result(row) for row in cursor]
+        return query
+
+    def transaction(self, statement: str, rows: List[List[Any]]) -> None:
+        """Runs a statement for every row in a single transaction, so a
+        batch is written and synced once and either all of it or none
+        of it is saved."""
+        conn = self.connection()
+        if conn.in_transaction:
+            conn.executemany(statement, rows)
+            return
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(statement, rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self.lock:
+            for conn in self.connections.values():
+                conn.close()
+            self.connections.clear()
+            if self.keepalive is not None:
+                self.keepalive.close()
+                self.keepalive = None
+        # dropping the local releases the holders, which takes the lock
+        self.local = threading.local()
@@ -0,0 +1,400 @@
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from hippopytamus.data.repo_parser import RepoMethodDefinition
+from hippopytamus.logger.logger import LoggerFactory
+
+PUT = 1
+DELETE = 2
+# the changes of a transaction or bulk write, replayed all or nothing
+BATCH = 3
+# record header: operation, payload length, crc32 of the payload
+HEADER = struct.Struct("<BII")
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageBackend(ABC):
+    """Persists the writes of a repository store.
+
+    Queries are served by the in-memory store; a backend only has to
+    replay the saved entities on startup and record every change."""
+
+    @abstractmethod
+    def load(self) -> Iterator[Tuple[Any, Any]]:
+        """Yields (id, entity) pairs saved by an earlier run."""
+
+    @abstractmethod
+    def put(self, key: Any, entity: Any) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: Any) -> None:
+        pass
+
+    def put_all(self, items: Iterable[Tuple[Any, Any]]) -> None:
+        """Records many (id, entity) writes; backends that can should
+        write them as one batch."""
+        for key, entity in items:
+            self.put(key, entity)
+
+    def delete_all(self, keys: Iterable[Any]) -> None:
+        for key in keys:
+            self.delete(key)
+
+    def apply(self, items: Iterable[Tuple[Any, Any]], keys: Iterable[Any]) -> None:
+        """Records the saves and deletes of a committed transaction;
+        backends that can should replay them all or not at all."""
+        self.put_all(items)
+        self.delete_all(keys)
+
+    def prepare(self, items: Iterable[Tuple[Any, Any]], keys: Iterable[Any]) -> Any:
+        """Checks and serializes a batch for write, raising for changes
+        that can't be recorded, before anything is written."""
+        return list(items), list(keys)
+
+    def write(self, prepared: Any) -> None:
+        self.apply(*prepared)
+
+    def start(self, entities: Callable[[], Dict[Any, Any]]) -> None:
+        """Called once the store is loaded, with a function returning
+        a copy of the current entities."""
+
+    def flush(self) -> None:
+        """Makes everything recorded so far durable."""
+
+    def close(self) -> None:
+        pass
+
+
+class QueryBackend(ABC):
+    """Storage that runs repository methods itself, e.g. as SQL,
+    instead of querying the in-memory store."""
+
+    @abstractmethod
+    def prepare(self, entity_cls: Optional[type], definitions: Iterable[RepoMethodDefinition]) -> None:
+        """Called once per repository class, before generating its
+        methods, with the entity type and all method definitions."""
+
+    @abstractmethod
+    def generate_method(self, definition: RepoMethodDefinition) -> Callable:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def frame(op: int, payload: bytes) -> bytes:
+    return HEADER.pack(op, len(payload), zlib.crc32(payload)) + payload
+
+
+def replay(log: BinaryIO, entities: Dict[Any, Any], end: Optional[int] = None) -> Tuple[int, int]:
+    """Applies the records of a log to entities, up to the end offset
+    if given; returns the number of changes and the offset reached."""
+    changes = 0
+    offset = 0
+    for op, record, next_offset in read_records(log):
+        if end is not None and offset >= end:
+            break
+        offset = next_offset
+        if op == BATCH:
+            changes += len(record)
+            for op, key, entity in record:
+                if op == PUT:
+                    entities[key] = entity
+                else:
+                    entities.pop(key, None)
+        elif op == PUT:
+            changes += 1
+            key, entity = record
+            entities[key] = entity
+        else:
+            changes += 1
+            entities.pop(record, None)
+    return changes, offset
+
+
+def read_records(file: BinaryIO) -> Iterator[Tuple[int, Any, int]]:
+    """Yields (op, record, end offset) until the end of the file or
+    the first incomplete or corrupt record."""
+    offset = 0
+    while True:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        op, length, crc = HEADER.unpack(header)
+        payload = file.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc or op not in (PUT, DELETE, BATCH):
+            return
+        offset += HEADER.size + length
+        yield op, pickle.loads(payload), offset
+
+
+class LogStorage(StorageBackend):
+    """Append-only log of pickled writes, framed with a crc32.
+
+    On startup the snapshot is loaded and the log replayed on top of
+    it; a record torn by a crash ends the replay and is cut off.
+    A background thread compacts the log into a new snapshot once it
+    holds compact_ratio times more records than there are entities.
+
+    fsync_interval sets durability: 0 syncs every write, a positive
+    value syncs pending writes in batches that often, and None leaves
+    it to the OS. Writes always reach the OS before put returns, so
+    only a machine crash can lose batched writes.
+
+    Syncs are group commits: while one thread waits for an fsync, the
+    writes of the others queue up behind it and the next fsync covers
+    all of them, so concurrent writers share one sync instead of
+    taking turns. Bulk writes and transactions are written as a single
+    BATCH record, which a crash loses entirely or not at all."""
+
+    def __init__(
+            self,
+            path: str,
+            fsync_interval: Optional[float] = 0.05,
+            compact_ratio: float = 2.0,
+            compact_min_records: int = 1000,
+            compaction_interval: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.fsync_interval = fsync_interval
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+        self.compaction_interval = compaction_interval
+        self.logger = LoggerFactory.get_logger()
+        self.lock = threading.Lock()
+        self.file: Optional[BinaryIO] = None
+        self.records = 0
+        self.live = 0
+        self.dirty = False
+        # group commit: appends written so far, appends known to be
+        # synced and whether a thread is syncing them
+        self.appended = 0
+        self.synced = 0
+        self.syncing = False
+        self.sync_done = threading.Condition(threading.Lock())
+        self.compactions = 0
+        self.entities: Optional[Callable[[], Dict[Any, Any]]] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def load(self) -> Iterator[Tuple[Any, Any]]:
+        self.close()
+        entities = self.read_snapshot()
+        self.records = 0
+        end = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as log:
+                self.records, end = replay(log, entities)
+                size = log.seek(0, os.SEEK_END)
+            if size > end:
+                self.logger.warn(
+                        "Dropping %d bytes of incomplete records from %s",
+                        size - end, self.path
+                )
+                os.truncate(self.path, end)
+
+        self.live = len(entities)
+        self.file = open(self.path, "ab", buffering=0)
+        return iter(entities.items())
+
+    def read_snapshot(self) -> Dict[Any, Any]:
+        entities: Dict[Any, Any] = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as snapshot:
+                for op, record, _ in read_records(snapshot):
+                    key, entity = record
+                    entities[key] = entity
+                if snapshot.read(1):
+                    raise StorageError(f"Corrupt snapshot {self.snapshot_path}")
+        return entities
+
+    def start(self, entities: Callable[[], Dict[Any, Any]]) -> None:
+        self.entities = entities
+        if self.thread is not None:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="hippo-log-storage", daemon=True)
+        self.thread.start()
+
+    def put(self, key: Any, entity: Any) -> None:
+        self.append(frame(PUT, pickle.dumps((key, entity))))
+
+    def delete(self, key: Any) -> None:
+        self.append(frame(DELETE, pickle.dumps(key)))
+
+    def put_all(self, items: Iterable[Tuple[Any, Any]]) -> None:
+        self.apply(items, ())
+
+    def delete_all(self, keys: Iterable[Any]) -> None:
+        self.apply((), keys)
+
+    def apply(self, items: Iterable[Tuple[Any, Any]], keys: Iterable[Any]) -> None:
+        self.write(self.prepare(items, keys))
+
+    def prepare(self, items: Iterable[Tuple[Any, Any]], keys: Iterable[Any]) -> Any:
+        changes = [(PUT, key, entity) for key, entity in items]
+        changes.extend((DELETE, key, None) for key in keys)
+        if not changes:
+            return None
+        return frame(BATCH, pickle.dumps(changes)), len(changes)
+
+    def write(self, prepared: Any) -> None:
+        if prepared is not None:
+            self.append(*prepared)
+
+    def append(self, record: bytes, changes: int = 1) -> None:
+        """Writes a framed record holding a number of changes."""
+        with self.lock:
+            if self.file is None:
+                raise StorageError(f"Log {self.path} is not open")
+            self.file.write(record)
+            self.records += changes
+            self.appended += 1
+            self.dirty = True
+        if self.fsync_interval == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Waits until every record appended so far is synced. The
+        first caller to find no sync running syncs everything appended
+        by then, the others wait for it and sync again only for appends
+        it didn't cover."""
+        with self.lock:
+            target = self.appended
+        with self.sync_done:
+            while self.synced < target:
+                if not self.syncing:
+                    self.syncing = True
+                    break
+                self.sync_done.wait()
+            else:
+                return
+        synced = 0
+        try:
+            with self.lock:
+                upto = self.appended
+                fileno = self.file.fileno() if self.file is not None else None
+                self.dirty = False
+            # appends continue during the fsync and go to the next one
+            if fileno is not None:
+                os.fsync(fileno)
+            synced = upto
+        finally:
+            self.finish_sync(synced)
+
+    def finish_sync(self, synced: int) -> None:
+        with self.sync_done:
+            self.synced = max(self.synced, synced)
+            self.syncing = False
+            self.sync_done.notify_all()
+
+    def exclusive_sync(self) -> int:
+        """Waits for a running sync and keeps others from starting, so
+        the log file can be replaced; returns the appends synced."""
+        with self.sync_done:
+            while self.syncing:
+                self.sync_done.wait()
+            self.syncing = True
+            return self.synced
+
+    def run(self) -> None:
+        interval = self.compaction_interval
+        if self.fsync_interval:
+            interval = min(interval, self.fsync_interval)
+        last_check = time.monotonic()
+        while not self.stopped.wait(interval):
+            if self.fsync_interval is not None:
+                self.flush()
+            now = time.monotonic()
+            if now - last_check >= self.compaction_interval:
+                last_check = now
+                self.maybe_compact()
+
+    def maybe_compact(self) -> None:
+        if self.entities is None or self.records < self.compact_min_records:
+            return
+        self.live = len(self.entities())
+        if self.records > self.compact_ratio * max(self.live, 1):
+            self.compact()
+
+    def compact(self) -> None:
+        """Writes a new snapshot and starts a new log with only the
+        records appended meanwhile.
+
+        The snapshot is built from the old snapshot and the log up to
+        where it ended when compaction started, so it holds every write
+        the log has, published or not, and writers keep appending while
+        it's pickled and synced. The append lock is only held to copy
+        the records appended since then to the new log and switch to
+        it. Until the new log replaces the old one, a restart replays
+        the old log on top of the new snapshot, which is harmless."""
+        with self.lock:
+            if self.file is None:
+                return
+            end = self.file.tell()
+            compacted = self.records
+        entities = self.read_snapshot()
+        with open(self.path, "rb") as log:
+            replay(log, entities, end)
+        tmp_snapshot = self.snapshot_path + ".tmp"
+        with open(tmp_snapshot, "wb") as snapshot:
+            for key, entity in entities.items():
+                snapshot.write(frame(PUT, pickle.dumps((key, entity))))
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+
+        synced = self.exclusive_sync()
+        try:
+            with self.lock:
+                self.switch_log(tmp_snapshot, end)
+                self.records -= compacted
+                self.live = len(entities)
+                # the new log holds every append not in the snapshot, synced
+                synced = self.appended
+        finally:
+            self.finish_sync(synced)
+        self.logger.debug("Compacted %s to %d entities", self.path, self.live)
+
+    def switch_log(self, snapshot_path: str, end: int) -> None:
+        """Installs a snapshot of the log up to end and starts a new log
+        with the records after it. Called with the append lock held."""
+        tmp_log = self.path + ".tmp"
+        with open(self.path, "rb") as log:
+            log.seek(end)
+            tail = log.read()
+        with open(tmp_log, "wb") as new_log:
+            new_log.write(tail)
+            new_log.flush()
+            os.fsync(new_log.fileno())
+        os.replace(snapshot_path, self.snapshot_path)
+        os.replace(tmp_log, self.path)
+        if self.file is not None:
+            self.file.close()
+        self.file = open(self.path, "ab", buffering=0)
+        self.dirty = False
+        self.compactions += 1
+
+    def close(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+        synced = self.exclusive_sync()
+        try:
+            with self.lock:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+        finally:
+            self.finish_sync(synced)
@@ -0,0 +1,574 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from operator import is_not, itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, ValuesView
+from hippopytamus.data.records import RecordType
+from hippopytamus.data.storage import StorageBackend
+
+# ids are kept in dicts with None values, used as insertion-ordered sets
+IdSet = Dict[Any, None]
+# optimistic reads before a reader falls back to the writers' lock
+RETRIES = 3
+# batches larger than this, or than a tenth of a sorted index, are
+# merged into it with one sort instead of an insert per value
+MERGE_BATCH = 1500
+T = TypeVar("T")
+
+
+def consistent(versioned: Any, lock: threading.Lock, read: Callable[[], T]) -> T:
+    """Runs read again until no write happened meanwhile. Writers hold
+    the lock and keep versioned.version odd while they write; readers
+    only take the lock when writes keep interleaving."""
+    for _ in range(RETRIES):
+        version = versioned.version
+        if version & 1:
+            time.sleep(0)
+            continue
+        result = read()
+        if versioned.version == version:
+            return result
+    with lock:
+        return read()
+
+
+class SortedIndex:
+    """Field values kept in sorted order with bisect, with the id of
+    the entity for each value. None and values that can't be compared
+    with the rest aren't ordered; they come last when iterating.
+
+    Writes change the lists in place under the store's lock, with the
+    version odd while they do; readers check it to see the two lists
+    in step without locking."""
+
+    def __init__(self, lock: Optional[threading.Lock] = None) -> None:
+        self.keys: List[Any] = []
+        self.ids: List[Any] = []
+        self.values: Dict[Any, Any] = {}
+        self.unordered: IdSet = {}
+        self.version = 0
+        self.lock = lock if lock is not None else threading.Lock()
+
+    def build(self, items: Iterable[Tuple[Any, Any]]) -> None:
+        """Fills an empty index from (id, value) pairs, sorting once."""
+        pairs = []
+        for key, value in items:
+            if value is None:
+                self.unordered[key] = None
+            else:
+                pairs.append((value, key))
+        try:
+            pairs.sort(key=itemgetter(0))
+        except TypeError:
+            for value, key in pairs:
+                self.add(key, value)
+            return
+        self.keys = [value for value, _ in pairs]
+        self.ids = [key for _, key in pairs]
+        self.values = {key: value for value, key in pairs}
+
+    def add(self, key: Any, value: Any) -> None:
+        self.version += 1
+        try:
+            self.insert(key, value)
+        finally:
+            self.version += 1
+
+    def remove(self, key: Any) -> None:
+        self.version += 1
+        try:
+            self.delete(key)
+        finally:
+            self.version += 1
+
+    def replace(self, key: Any, value: Any) -> None:
+        self.version += 1
+        try:
+            self.delete(key)
+            self.insert(key, value)
+        finally:
+            self.version += 1
+
+    def update(self, items: List[Tuple[Any, Any]]) -> None:
+        """Sets the values of many ids at once."""
+        self.version += 1
+        try:
+            if len(items) <= min(MERGE_BATCH, len(self.keys) // 10):
+                for key, value in items:
+                    self.delete(key)
+                    self.insert(key, value)
+                return
+            changed = {key for key, _ in items}
+            self.without(changed)
+            pairs = list(zip(self.keys, self.ids))
+            added = []
+            for key, value in items:
+                if value is None:
+                    self.unordered[key] = None
+                else:
+                    added.append((value, key))
+            pairs.extend(added)
+            try:
+                pairs.sort(key=itemgetter(0))
+            except TypeError:
+                for value, key in added:
+                    self.insert(key, value)
+                return
+            self.keys = [value for value, _ in pairs]
+            self.ids = [key for _, key in pairs]
+            self.values.update((key, value) for value, key in added)
+        finally:
+            self.version += 1
+
+    def remove_all(self, keys: Iterable[Any]) -> None:
+        self.version += 1
+        try:
+            self.without(set(keys))
+        finally:
+            self.version += 1
+
+    def without(self, keys: set) -> None:
+        """Drops the given ids with a single pass over the lists."""
+        for key in keys & self.unordered.keys():
+            del self.unordered[key]
+        if not keys & self.values.keys():
+            return
+        kept = [(value, key) for value, key in zip(self.keys, self.ids) if key not in keys]
+        self.keys = [value for value, _ in kept]
+        self.ids = [key for _, key in kept]
+        for key in keys:
+            self.values.pop(key, None)
+
+    def insert(self, key: Any, value: Any) -> None:
+        if value is None:
+            self.unordered[key] = None
+            return
+        try:
+            pos = bisect_right(self.keys, value)
+        except TypeError:
+            self.unordered[key] = None
+            return
+        self.keys.insert(pos, value)
+        self.ids.insert(pos, key)
+        self.values[key] = value
+
+    def delete(self, key: Any) -> None:
+        if key in self.unordered:
+            del self.unordered[key]
+            return
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        low = bisect_left(self.keys, value)
+        high = bisect_right(self.keys, value)
+        pos = self.ids.index(key, low, high)
+        del self.keys[pos]
+        del self.ids[pos]
+
+    def span(self, operator: str, value: Any) -> Optional[slice]:
+        """Positions of the values matching a comparison, or None if
+        the operator isn't answered by ordering."""
+        keys = self.keys
+        if operator == "greater_than":
+            return slice(bisect_right(keys, value), len(keys))
+        if operator == "less_than":
+            return slice(0, bisect_left(keys, value))
+        if operator == "between":
+            low, high = value
+            return slice(bisect_left(keys, low), bisect_right(keys, high))
+        if operator == "starting_with" and isinstance(value, str):
+            if not value:
+                return slice(0, len(keys))
+            upper = value[:-1] + chr(ord(value[-1]) + 1)
+            return slice(bisect_left(keys, value), bisect_left(keys, upper))
+        return None
+
+    def lookup(self, operator: str, value: Any) -> Optional[IdSet]:
+        def read() -> Optional[IdSet]:
+            span = self.span(operator, value)
+            return None if span is None else dict.fromkeys(self.ids[span])
+        return consistent(self, self.lock, read)
+
+    def count(self, operator: str, value: Any) -> Optional[int]:
+        def read() -> Optional[int]:
+            span = self.span(operator, value)
+            return None if span is None else max(0, span.stop - span.start)
+        return consistent(self, self.lock, read)
+
+    def ordered(self, descending: bool = False) -> Iterator[Any]:
+        ids, unordered = consistent(self, self.lock, lambda: (self.ids[:], tuple(self.unordered)))
+        if descending:
+            yield from reversed(ids)
+        else:
+            yield from ids
+        yield from unordered
+
+
+class IndexedStore(MutableMapping):
+    """Entities by id, with hash indexes on selected fields.
+
+    Each hash index maps a field value to the ids of entities with
+    that value; sorted indexes serve range queries and ordering.
+    Indexes are updated on every write, so an entity changed in place
+    has to be saved again to be found by its new values, and counted
+    by them. With records, entities are kept as slotted records and
+    rebuilt by unpack when handed out, so changes to them never reach
+    the store without a save. With a
+    storage backend, entities are loaded from it and every write is
+    passed on to it.
+
+    Writes to the same id are serialized by one of a set of striped
+    locks; the backend gets a write under that lock before it's
+    published, so it sees writes in the same order and a write it
+    fails on is never seen at all. The shared indexes are changed
+    under a short store-wide lock. Readers take no locks: they iterate over
+    snapshots of ids and entities, and a write adds an id to the new
+    hash index entries before publishing the entity and removes the
+    old entries after, so a reader finds either the old or the new
+    version of it."""
+
+    def __init__(
+            self,
+            indexed_fields: Iterable[str] = (),
+            sorted_fields: Iterable[str] = (),
+            id_field: str = "id",
+            backend: Optional[StorageBackend] = None,
+            stripes: int = 64,
+            records: Optional[RecordType] = None
+    ) -> None:
+        self.entities: Dict[Any, Any] = {}
+        self.records = records
+        self.unpack = records.unpack if records is not None else None
+        self.id_field = id_field
+        self.indexes: Dict[str, Dict[Any, IdSet]] = {}
+        self.indexed_values: Dict[str, Dict[Any, Any]] = {}
+        self.sorted: Dict[str, SortedIndex] = {}
+        self.lock = threading.Lock()
+        self.stripes = [threading.Lock() for _ in range(stripes)]
+        if backend is not None:
+            loaded = backend.load()
+            if records is not None:
+                loaded = ((key, records.pack(entity)) for key, entity in loaded)
+            self.entities.update(loaded)
+        for name in indexed_fields:
+            self.add_index(name)
+        for name in sorted_fields:
+            self.add_sorted_index(name)
+        self.backend = None
+        if backend is not None:
+            backend.start(self.copy)
+            self.backend = backend
+
+    def stripe(self, key: Any) -> threading.Lock:
+        return self.stripes[hash(key) % len(self.stripes)]
+
+    @contextmanager
+    def locked(self, keys: Iterable[Any]) -> Iterator[None]:
+        """Holds the stripe locks of all the keys, taken in a fixed
+        order so batches can't deadlock with each other."""
+        with ExitStack() as stack:
+            for i in sorted({hash(key) % len(self.stripes) for key in keys}):
+                stack.enter_context(self.stripes[i])
+            yield
+
+    def add_index(self, name: str) -> None:
+        with self.lock:
+            if name == self.id_field or name in self.indexes:
+                return
+            self.indexes[name] = {}
+            self.indexed_values[name] = {}
+            for key, entity in self.entities.items():
+                self.index(name, key, getattr(entity, name, None))
+
+    def add_sorted_index(self, name: str) -> None:
+        with self.lock:
+            if name in self.sorted:
+                return
+            index = SortedIndex(self.lock)
+            index.build((key, getattr(entity, name, None)) for key, entity in self.entities.items())
+            self.sorted[name] = index
+
+    def index(self, name: str, key: Any, value: Any) -> bool:
+        try:
+            ids = self.indexes[name].setdefault(value, {})
+        except TypeError:
+            return False  # unhashable values are only found by scanning
+        ids[key] = None
+        self.indexed_values[name][key] = value
+        return True
+
+    def unindex(self, name: str, key: Any, value: Any) -> None:
+        index = self.indexes[name]
+        ids = index.get(value)
+        if ids is None or key not in ids:
+            return
+        del ids[key]
+        if not ids:
+            del index[value]
+
+    def lookup(self, name: str, value: Any) -> Optional[IdSet]:
+        """Returns ids of entities with the given field value, or None
+        if the field isn't indexed or the value can't be hashed."""
+        if name == self.id_field:
+            try:
+                return {value: None} if value in self.entities else {}
+            except TypeError:
+                return None
+        index = self.indexes.get(name)
+        if index is None:
+            return None
+        try:
+            return index.get(value, {})
+        except TypeError:
+            return None
+
+    def lookup_op(self, name: str, operator: str, value: Any) -> Optional[IdSet]:
+        """Like lookup, for any comparison operator of repository
+        methods. Returns None if the indexes can't answer it."""
+        if operator == "eq":
+            return self.lookup(name, value)
+        if operator == "in":
+            if value is None:
+                return None
+            result: IdSet = {}
+            for item in value:
+                ids = self.lookup(name, item)
+                if ids is None:
+                    return None
+                result.update(ids)
+            return result
+        index = self.sorted.get(name)
+        if index is None or value is None:
+            return None
+        try:
+            return index.lookup(operator, value)
+        except (TypeError, ValueError):
+            return None
+
+    def count_op(self, name: str, operator: str, value: Any) -> Optional[int]:
+        """Number of entities matching one condition, taken from the
+        size of its index entry or sorted range without collecting
+        ids. None if the indexes can't answer it."""
+        index = self.sorted.get(name)
+        if operator in ("eq", "in") or index is None or value is None:
+            ids = self.lookup_op(name, operator, value)
+            return None if ids is None else len(ids)
+        try:
+            return index.count(operator, value)
+        except (TypeError, ValueError):
+            return None
+
+    def ordered_ids(self, name: str, descending: bool = False) -> Optional[Iterator[Any]]:
+        index = self.sorted.get(name)
+        if index is None:
+            return None
+        return index.ordered(descending)
+
+    def fetch(self, ids: Iterable[Any]) -> Iterator[Any]:
+        """Stored entities for a snapshot of the ids, skipping deleted
+        ones. With records these are records, see unpack."""
+        return filter(partial(is_not, None), map(self.entities.get, tuple(ids)))
+
+    def snapshot(self) -> Tuple[Any, ...]:
+        return tuple(self.entities.values())
+
+    def copy(self) -> Dict[Any, Any]:
+        """The current entities by id, unpacked from records."""
+        entities = dict(self.entities)
+        if self.unpack is not None:
+            return {key: self.unpack(record) for key, record in entities.items()}
+        return entities
+
+    def __getitem__(self, key: Any) -> Any:
+        if self.unpack is not None:
+            return self.unpack(self.entities[key])
+        return self.entities[key]
+
+    def __setitem__(self, key: Any, entity: Any) -> None:
+        stored = entity if self.records is None else self.records.pack(entity)
+        with self.stripe(key):
+            if self.backend is not None:
+                self.backend.put(key, entity)
+            with self.lock:
+                stale = self.hash_index(key, entity)
+                for name, index in self.sorted.items():
+                    value = getattr(entity, name, None)
+                    if key in index.values and index.values[key] == value:
+                        continue
+                    index.replace(key, value)
+                self.entities[key] = stored
+                for name, old in stale:
+                    self.unindex(name, key, old)
+
+    def put_all(self, entities: Dict[Any, Any]) -> None:
+        """Saves entities keyed by id, taking the locks once for the
+        batch: sorted indexes merge the new values together and the
+        backend gets them as one write."""
+        self.apply(entities, ())
+
+    def remove_all(self, keys: Iterable[Any]) -> List[Any]:
+        """Deletes the entities with the given ids as one batch and
+        returns the ones that existed."""
+        return self.apply({}, keys)
+
+    def apply(self, entities: Dict[Any, Any], keys: Iterable[Any]) -> List[Any]:
+        """Saves entities keyed by id and deletes the entities with the
+        other given ids as one batch, under one hold of the locks, and
+        returns the deleted entities that existed. The backend gets the
+        saves and deletes together, as a single write."""
+        batch = Batch(entities, [key for key in dict.fromkeys(keys) if key not in entities])
+        self.pack(batch)
+        with self.locked(batch.ids()):
+            if self.backend is not None:
+                # entities can't appear or go away while their stripes
+                # are held, so only existing ones are recorded as deleted
+                existing = [key for key in batch.keys if key in self.entities]
+                if entities or existing:
+                    self.backend.apply(entities.items(), existing)
+            return self.publish(batch)
+
+    def prepare(self, entities: Dict[Any, Any], keys: Iterable[Any]) -> "Batch":
+        """Packs a batch of saves and deletes and serializes it for the
+        backend without writing anything, so entities that can't be
+        stored fail here. A prepared batch is written with write and
+        then published, both with the stripe locks of its ids held."""
+        batch = Batch(entities, [key for key in dict.fromkeys(keys) if key not in entities])
+        self.pack(batch)
+        if self.backend is not None and (entities or batch.keys):
+            batch.prepared = self.backend.prepare(entities.items(), batch.keys)
+        return batch
+
+    def pack(self, batch: "Batch") -> None:
+        batch.stored = batch.entities
+        if self.records is not None:
+            batch.stored = {key: self.records.pack(entity) for key, entity in batch.entities.items()}
+
+    def write(self, batch: "Batch") -> None:
+        if self.backend is not None and batch.prepared is not None:
+            self.backend.write(batch.prepared)
+
+    def publish(self, batch: "Batch") -> List[Any]:
+        """Makes a batch visible in memory and returns the deleted
+        entities that existed."""
+        entities = batch.entities
+        with self.lock:
+            removed = {}
+            for key in batch.keys:
+                entity = self.drop(key)
+                if entity is not None:
+                    removed[key] = entity
+            if removed:
+                for index in self.sorted.values():
+                    index.remove_all(removed)
+            stale: List[Tuple[Any, str, Any]] = []
+            for key, entity in entities.items():
+                stale.extend((key, name, old) for name, old in self.hash_index(key, entity))
+            for name, index in self.sorted.items():
+                changed = []
+                for key, entity in entities.items():
+                    value = getattr(entity, name, None)
+                    if key not in index.values or index.values[key] != value:
+                        changed.append((key, value))
+                if changed:
+                    index.update(changed)
+            self.entities.update(batch.stored)
+            for key, name, old in stale:
+                self.unindex(name, key, old)
+        if self.unpack is not None:
+            return [self.unpack(record) for record in removed.values()]
+        return list(removed.values())
+
+    def flush(self) -> None:
+        """Waits until the backend has made every write durable."""
+        if self.backend is not None:
+            self.backend.flush()
+
+    def hash_index(self, key: Any, entity: Any) -> List[Tuple[str, Any]]:
+        """Adds an entity's values to the hash indexes, returning the
+        entries for its old values, to remove once it's published."""
+        stale: List[Tuple[str, Any]] = []
+        for name in self.indexes:
+            value = getattr(entity, name, None)
+            values = self.indexed_values[name]
+            if key in values:
+                old = values[key]
+                if old == value:
+                    continue
+                stale.append((name, old))
+            if not self.index(name, key, value):
+                values.pop(key, None)
+        return stale
+
+    def __delitem__(self, key: Any) -> None:
+        if self.remove(key) is None:
+            raise KeyError(key)
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        entity = self.remove(key)
+        if entity is not None:
+            return entity
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    def remove(self, key: Any) -> Optional[Any]:
+        """Deletes the entity with the given id and returns it, or None
+        if there is none, checking and deleting as one step."""
+        with self.stripe(key):
+            if key not in self.entities:
+                return None
+            if self.backend is not None:
+                self.backend.delete(key)
+            with self.lock:
+                entity = self.drop(key)
+                for index in self.sorted.values():
+                    index.remove(key)
+        return entity if self.unpack is None else self.unpack(entity)
+
+    def drop(self, key: Any) -> Optional[Any]:
+        entity = self.entities.pop(key, None)
+        if entity is not None:
+            for name, values in self.indexed_values.items():
+                if key in values:
+                    self.unindex(name, key, values.pop(key))
+        return entity
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(tuple(self.entities))
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def values(self) -> ValuesView[Any]:
+        if self.unpack is not None:
+            return super().values()
+        return self.entities.values()
+
+
+class Batch:
+    """Entities to save keyed by id and ids to delete, with the stored
+    form of the entities and the batch as serialized by the backend."""
+
+    def __init__(self, entities: Dict[Any, Any], keys: List[Any]) -> None:
+        self.entities = entities
+        self.keys = keys
+        self.stored: Dict[Any, Any] = entities
+        self.prepared: Any = None
+
+    def ids(self) -> List[Any]:
+        return list(self.entities) + self.keys
+
+
+def intersect(left: IdSet, right: IdSet) -> IdSet:
+    if len(left) > len(right):
+        left, right = right, left
+    return {key: None for key in tuple(left) if key in right}
+
+
+def union(left: IdSet, right: IdSet) -> IdSet:
+    result = dict(left)
+    result.update(right)
+    return result
@@ -0,0 +1,142 @@
+import functools
+import inspect
+import threading
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from hippopytamus.core.annotation import get_method_decorators
+from hippopytamus.data.store import IndexedStore
+from hippopytamus.logger.logger import LoggerFactory
+
+# stands for an entity deleted by a transaction
+DELETED = object()
+
+local = threading.local()
+
+
+class Transaction:
+    """Repository writes made during a @Transactional call, kept until
+    the call returns and then applied together.
+
+    Saves and deletes of in-memory repositories are buffered per store,
+    the last write to an id replacing earlier ones, and repository
+    methods called by the same thread read through the buffer, so the
+    call sees its own writes. Storage that keeps its own transactions,
+    like SQLite, joins with its commit and rollback.
+
+    Commit has two phases. First the writes of every store are packed
+    and serialized as one batch; an entity that can't be stored fails
+    the commit here, with nothing written anywhere. Then the joined
+    resources commit, each store's backend records its batch as one
+    write with the stripe locks of all stores held, the batches are
+    published to memory together, and the stores wait for them to be
+    durable; transactions committing at the same time share the sync.
+
+    Once written, a batch is atomic only within its own store: if a
+    later store's write fails, e.g. on a full disk, the batches already
+    written stay committed and are published, and after a crash each
+    store's log replays or drops its batch on its own.
+
+    Reads aren't isolated from other transactions and concurrent
+    writes to the same entity aren't detected: the last commit wins."""
+
+    def __init__(self) -> None:
+        self.stores: Dict[int, Tuple[IndexedStore, Dict[Any, Any]]] = {}
+        self.resources: Dict[int, Tuple[Callable[[], Any], Callable[[], Any]]] = {}
+
+    def pending(self, store: IndexedStore) -> Optional[Dict[Any, Any]]:
+        """Entities saved or DELETED in the store by this transaction."""
+        entry = self.stores.get(id(store))
+        return entry[1] if entry is not None else None
+
+    def writes(self, store: IndexedStore) -> Dict[Any, Any]:
+        entry = self.stores.get(id(store))
+        if entry is None:
+            entry = self.stores[id(store)] = (store, {})
+        return entry[1]
+
+    def save(self, store: IndexedStore, key: Any, entity: Any) -> None:
+        self.writes(store)[key] = entity
+
+    def delete(self, store: IndexedStore, key: Any) -> None:
+        self.writes(store)[key] = DELETED
+
+    def join(self, resource: Any, commit: Callable[[], Any], rollback: Callable[[], Any]) -> bool:
+        """Adds a resource committed and rolled back with the
+        transaction; returns False if it had already joined."""
+        if id(resource) in self.resources:
+            return False
+        self.resources[id(resource)] = (commit, rollback)
+        return True
+
+    def commit(self) -> None:
+        resources = list(self.resources.values())
+        try:
+            batches = [(store, store.prepare(
+                {key: entity for key, entity in writes.items() if entity is not DELETED},
+                [key for key, entity in writes.items() if entity is DELETED],
+            )) for store, writes in sorted(self.stores.values(), key=lambda entry: id(entry[0]))]
+        except BaseException:
+            self.rollback()
+            raise
+        for i, (commit, _) in enumerate(resources):
+            try:
+                commit()
+            except BaseException:
+                for _, rollback in resources[i:]:
+                    rollback()
+                raise
+        with ExitStack() as stack:
+            for store, batch in batches:
+                stack.enter_context(store.locked(batch.ids()))
+            written = []
+            try:
+                for store, batch in batches:
+                    store.write(batch)
+                    written.append((store, batch))
+            finally:
+                for store, batch in written:
+                    store.publish(batch)
+        for store, _ in batches:
+            store.flush()
+
+    def rollback(self) -> None:
+        self.stores.clear()
+        for _, rollback in self.resources.values():
+            rollback()
+
+
+def current_transaction() -> Optional[Transaction]:
+    """The transaction of the @Transactional call running on this
+    thread, if any."""
+    return getattr(local, "transaction", None)
+
+
+def Transactional(func: Callable) -> Callable:
+    """Runs a controller or service method in a transaction: repository
+    writes made during the call are applied when it returns and
+    discarded if it raises. A call made inside another transactional
+    call joins the outer transaction."""
+    if inspect.isclass(func):
+        raise Exception("@Transactional cannot be applied to class")
+    logger = LoggerFactory.get_logger(for_cls="hippopytamus.data.transaction")
+
+    @functools.wraps(func)
+    def transactional(*args: Any, **kwargs: Any) -> Any:
+        if getattr(local, "transaction", None) is not None:
+            return func(*args, **kwargs)
+        transaction = Transaction()
+        local.transaction = transaction
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            logger.debug("Rolling back transaction of %s", func.__qualname__)
+            transaction.rollback()
+            raise
+        finally:
+            local.transaction = None
+        transaction.commit()
+        return result
+
+    decorators: List[Dict[str, Any]] = [{"__decorator__": "Transactional"}, *get_method_decorators(func)]
+    setattr(transactional, "__hippo_method_decorators", decorators)
+    return transactional
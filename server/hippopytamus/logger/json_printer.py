@@ -0,0 +1,149 @@
+import atexit
+import datetime
+import json
+import os
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Optional
+from hippopytamus.logger.logger import LogPrinter, LogObject
+
+
+class JsonLinesPrinter(LogPrinter):
+    """Writes records as JSON lines to a buffered file.
+
+    The file is rotated when it grows over max_bytes or is older than
+    rotate_interval seconds; rotated files get .1 ... .backup_count
+    suffixes. With fsync_interval set, the file is flushed and fsynced
+    at most that often (0 means after every record), and a background
+    thread syncs records left in the buffer once the interval passes;
+    otherwise the OS decides when buffered data hits the disk. With
+    flush_on_shutdown the file is flushed and closed at exit. Records
+    printed after close are dropped and counted in dropped."""
+
+    def __init__(
+            self,
+            path: str,
+            buffer_size: int = 1 << 20,
+            max_bytes: Optional[int] = None,
+            rotate_interval: Optional[float] = None,
+            backup_count: int = 5,
+            fsync_interval: Optional[float] = None,
+            flush_on_shutdown: bool = True,
+    ) -> None:
+        self.path = path
+        self.buffer_size = buffer_size
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.cached_second: Optional[datetime.datetime] = None
+        self.cached_prefix = ""
+        self.stream = self.open()
+        self.last_fsync = time.monotonic()
+        self.unsynced = False
+        self.dropped = 0
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        if fsync_interval:
+            self.thread = threading.Thread(
+                    target=self.run,
+                    name="hippo-log-sync",
+                    daemon=True
+            )
+            self.thread.start()
+        if flush_on_shutdown:
+            atexit.register(self.close)
+
+    def open(self) -> BinaryIO:
+        stream = open(self.path, "ab", buffering=self.buffer_size)
+        self.size = stream.tell()
+        self.opened_at = time.monotonic()
+        return stream
+
+    def format_timestamp(self, ts: datetime.datetime) -> str:
+        second = ts.replace(microsecond=0)
+        if second != self.cached_second:
+            self.cached_second = second
+            self.cached_prefix = second.strftime("%Y-%m-%dT%H:%M:%S")
+        return f"{self.cached_prefix}.{ts.microsecond:06d}"
+
+    def format(self, obj: LogObject) -> str:
+        record: Dict[str, Any] = {
+            "timestamp": self.format_timestamp(obj.timestamp),
+            "level": obj.log_level,
+            "class": obj.class_source,
+            "method": obj.method_source,
+            "line": obj.line_source,
+            "text": obj.message(),
+        }
+        if obj.context:
+            record["context"] = obj.context
+        return json.dumps(record, default=repr)
+
+    def print(self, obj: LogObject) -> None:
+        with self.lock:
+            if self.stream.closed:
+                self.dropped += 1
+                return
+            line = (self.format(obj) + "\n").encode("utf-8")
+            now = time.monotonic()
+            if self.should_rotate(now):
+                self.rotate()
+            self.stream.write(line)
+            self.size += len(line)
+            self.unsynced = True
+            if self.fsync_interval is not None and now - self.last_fsync >= self.fsync_interval:
+                self.sync(now)
+
+    def should_rotate(self, now: float) -> bool:
+        if self.size == 0:
+            return False
+        if self.max_bytes is not None and self.size >= self.max_bytes:
+            return True
+        if self.rotate_interval is not None and now - self.opened_at >= self.rotate_interval:
+            return True
+        return False
+
+    def rotate(self) -> None:
+        self.stream.close()
+        if self.backup_count > 0:
+            for i in range(self.backup_count - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.stream = self.open()
+
+    def sync(self, now: float) -> None:
+        self.stream.flush()
+        os.fsync(self.stream.fileno())
+        self.last_fsync = now
+        self.unsynced = False
+
+    def run(self) -> None:
+        interval = self.fsync_interval or 0.0
+        while not self.stopped.wait(interval):
+            with self.lock:
+                now = time.monotonic()
+                if self.unsynced and not self.stream.closed and now - self.last_fsync >= interval:
+                    self.sync(now)
+
+    def flush(self) -> None:
+        with self.lock:
+            if not self.stream.closed:
+                self.stream.flush()
+
+    def close(self) -> None:
+        self.stopped.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        with self.lock:
+            if self.stream.closed:
+                return
+            self.stream.flush()
+            if self.fsync_interval is not None:
+                os.fsync(self.stream.fileno())
+            self.stream.close()
@@ -1,13 +1,39 @@
 import inspect
 import datetime
-from typing import Type, Any, Union, Optional
-from typing import Callable, Dict, TextIO
+from typing import Type, Any, Union, Optional, Mapping
+from typing import Callable, Dict, TextIO, Tuple
 import functools
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
+import json
+import os
 import sys
 
 
+DEBUG = 10
+LOG = 15
+INFO = 20
+WARN = 30
+ERROR = 40
+
+LEVELS = {
+    "DEBUG": DEBUG,
+    "LOG": LOG,
+    "INFO": INFO,
+    "WARN": WARN,
+    "ERROR": ERROR,
+}
+
+
+def level_value(level: Union[str, int]) -> int:
+    if isinstance(level, int):
+        return level
+    value = LEVELS.get(level.upper())
+    if value is None:
+        raise ValueError(f"Unknown log level {level}")
+    return value
+
+
 @dataclass
 class LogObject:
     timestamp: datetime.datetime = field(default_factory=datetime.datetime.now)
@@ -16,9 +42,26 @@ class LogObject:
     method_source: Optional[str] = None
     line_source: Optional[int] = None
     text: str = ""
-    text_args: Dict = field(default_factory=dict)
+    text_args: Tuple = ()
     context: Dict = field(default_factory=dict)
 
+    def message(self) -> str:
+        """Formats text with text_args, %-style or {}-style. Printers
+        call this only for records they emit."""
+        text = self.text if isinstance(self.text, str) else str(self.text)
+        if not self.text_args:
+            return text
+        try:
+            return text % self.text_args
+        except (TypeError, ValueError):
+            pass
+        if "{" in text:
+            try:
+                return text.format(*self.text_args)
+            except (IndexError, KeyError, ValueError):
+                pass
+        return " ".join([text, *(str(arg) for arg in self.text_args)])
+
 
 class LogPrinter(ABC):
     @abstractmethod
@@ -27,30 +70,29 @@ class LogPrinter(ABC):
         pass
 
 
-def with_frame(fn: Callable) -> Callable:
-    @functools.wraps(fn)
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
-        self_param = args[0]
-        if self_param.disabled:
-            return
-        frame = inspect.currentframe()
-        if not frame:
-            return
-        frame = frame.f_back
-        if not frame:
-            return
-        try:
-            for_method = frame.f_code.co_name
-            for_line = frame.f_lineno
-            return fn(
-                    *args,
-                    for_method=for_method,
-                    for_line=for_line,
-                    **kwargs
-            )
-        finally:
-            del frame
-    return wrapper
+def with_frame(level: int) -> Callable[[Callable], Callable]:
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self_param = args[0]
+            # checked before the frame is captured, so filtered
+            # calls cost only two attribute lookups
+            if self_param.disabled or level < self_param.level:
+                return
+            frame = sys._getframe(1)
+            try:
+                for_method = frame.f_code.co_name
+                for_line = frame.f_lineno
+                return fn(
+                        *args,
+                        for_method=for_method,
+                        for_line=for_line,
+                        **kwargs
+                )
+            finally:
+                del frame
+        return wrapper
+    return decorator
 
 
 def with_caller(fn: Callable) -> Callable:
@@ -92,6 +134,7 @@ class Logger:
         self_name: str = "self",
         for_cls: Optional[Union[Type, str]] = None,
         disabled: bool = False,
+        level: int = DEBUG,
     ) -> None:
         if for_cls is not None:
             if isinstance(for_cls, str):
@@ -101,13 +144,17 @@ class Logger:
         else:
             self.caller = "<unknown>"
         self.disabled = disabled
+        self.level = level
         self.printer = printer
 
+    def is_enabled_for(self, level: Union[str, int]) -> bool:
+        return not self.disabled and level_value(level) >= self.level
+
     def _log(
         self,
         level: str,
         text: str,
-        args: Any,
+        args: Tuple,
         for_method: Optional[str],
         for_line: Optional[int],
         **context: Any
@@ -124,7 +171,7 @@ class Logger:
         )
         self.printer.print(logObj)
 
-    @with_frame
+    @with_frame(LOG)
     def log(
             self,
             text: str,
@@ -135,7 +182,7 @@ class Logger:
     ) -> None:
         self._log("LOG", text, args, for_method, for_line, **context)
 
-    @with_frame
+    @with_frame(DEBUG)
     def debug(
             self,
             text: str,
@@ -146,7 +193,7 @@ class Logger:
     ) -> None:
         self._log("DEBUG", text, args, for_method, for_line, **context)
 
-    @with_frame
+    @with_frame(INFO)
     def info(
             self,
             text: str,
@@ -157,7 +204,7 @@ class Logger:
     ) -> None:
         self._log("INFO", text, args, for_method, for_line, **context)
 
-    @with_frame
+    @with_frame(WARN)
     def warn(
             self,
             text: str,
@@ -168,7 +215,7 @@ class Logger:
     ) -> None:
         self._log("WARN", text, args, for_method, for_line, **context)
 
-    @with_frame
+    @with_frame(ERROR)
     def error(
             self,
             text: str,
@@ -180,6 +227,16 @@ class Logger:
         self._log("ERROR", text, args, for_method, for_line, **context)
 
 
+def logger_name(for_cls: Union[Type[Any], str]) -> str:
+    if isinstance(for_cls, str):
+        return for_cls
+    return f"{for_cls.__module__}.{for_cls.__name__}"
+
+
+def split_names(value: str) -> list[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
 class LoggerFactory:
     _factory: Optional["LoggerFactory"] = None
 
@@ -189,6 +246,8 @@ class LoggerFactory:
         self.printer: Optional[LogPrinter] = None
         self.whitelist: set[str] = set()
         self.blacklist: set[str] = set()
+        self.level: int = DEBUG
+        self.levels: dict[str, int] = {}
 
     @classmethod
     @with_caller
@@ -202,11 +261,7 @@ class LoggerFactory:
         if caller_class is None:
             # TODO: unknown sources
             raise Exception("Couldn't determine caller class")
-        name = ""
-        if isinstance(caller_class, str):
-            name = caller_class
-        else:
-            name = f"{caller_class.__module__}.{caller_class.__name__}"
+        name = logger_name(caller_class)
         factory = cls.get_factory()
         disabled = factory.disabled
         if name in factory.blacklist:
@@ -218,7 +273,8 @@ class LoggerFactory:
                     factory._get_printer(),
                     self_name=self_name,
                     for_cls=caller_class,
-                    disabled=disabled
+                    disabled=disabled,
+                    level=factory.levels.get(name, factory.level)
             )
         return factory.loggers[name]
 
@@ -227,6 +283,7 @@ class LoggerFactory:
         if cls._factory:
             return cls._factory
         factory = LoggerFactory()
+        factory.configure_from_env()
         cls._factory = factory
         return factory
 
@@ -240,8 +297,8 @@ class LoggerFactory:
         for logger in self.loggers.values():
             logger.disabled = False
 
-    def disable_for(self, class_type: Type[Any]) -> None:
-        name = f"{class_type.__module__}.{class_type.__name__}"
+    def disable_for(self, class_type: Union[Type[Any], str]) -> None:
+        name = logger_name(class_type)
         logger = self.loggers.get(name)
         if logger:
             logger.disabled = True
@@ -249,8 +306,8 @@ class LoggerFactory:
         if name in self.whitelist:
             self.whitelist.remove(name)
 
-    def enable_for(self, class_type: Type[Any]) -> None:
-        name = f"{class_type.__module__}.{class_type.__name__}"
+    def enable_for(self, class_type: Union[Type[Any], str]) -> None:
+        name = logger_name(class_type)
         logger = self.loggers.get(name)
         if logger:
             logger.disabled = False
@@ -258,6 +315,58 @@ class LoggerFactory:
         if name in self.blacklist:
             self.blacklist.remove(name)
 
+    def set_level(self, level: Union[str, int]) -> None:
+        self.level = level_value(level)
+        for name, logger in self.loggers.items():
+            logger.level = self.levels.get(name, self.level)
+
+    def set_level_for(self, class_type: Union[Type[Any], str], level: Union[str, int]) -> None:
+        name = logger_name(class_type)
+        self.levels[name] = level_value(level)
+        logger = self.loggers.get(name)
+        if logger:
+            logger.level = self.levels[name]
+
+    def configure(self, config: Mapping[str, Any]) -> None:
+        """Applies settings from a dict with optional keys: disabled,
+        level, enable (list of names), disable (list of names) and
+        levels (name to level mapping)."""
+        if config.get("disabled"):
+            self.disable_all()
+        if "level" in config:
+            self.set_level(config["level"])
+        for name in config.get("enable", []):
+            self.enable_for(name)
+        for name in config.get("disable", []):
+            self.disable_for(name)
+        for name, level in config.get("levels", {}).items():
+            self.set_level_for(name, level)
+
+    def configure_from_file(self, path: str) -> None:
+        with open(path) as f:
+            self.configure(json.load(f))
+
+    def configure_from_env(self, environ: Mapping[str, str] = os.environ) -> None:
+        """Reads HIPPO_LOG_CONFIG (path to JSON file), HIPPO_LOG_DISABLED,
+        HIPPO_LOG_LEVEL, HIPPO_LOG_ENABLE and HIPPO_LOG_DISABLE (comma
+        separated names) and HIPPO_LOG_LEVELS (name=LEVEL pairs)."""
+        path = environ.get("HIPPO_LOG_CONFIG")
+        if path:
+            self.configure_from_file(path)
+        config: Dict[str, Any] = {}
+        if environ.get("HIPPO_LOG_DISABLED", "") not in ("", "0"):
+            config["disabled"] = True
+        if environ.get("HIPPO_LOG_LEVEL"):
+            config["level"] = environ["HIPPO_LOG_LEVEL"]
+        config["enable"] = split_names(environ.get("HIPPO_LOG_ENABLE", ""))
+        config["disable"] = split_names(environ.get("HIPPO_LOG_DISABLE", ""))
+        levels = {}
+        for pair in split_names(environ.get("HIPPO_LOG_LEVELS", "")):
+            name, _, level = pair.partition("=")
+            levels[name.strip()] = level.strip()
+        config["levels"] = levels
+        self.configure(config)
+
     def _get_printer(self) -> LogPrinter:
         if self.printer is None:
             self.printer = BasicConsolePrinter()
@@ -319,6 +428,9 @@ class BasicConsolePrinter(LogPrinter):
         return f"{self.COLORS['LINE']}:{lineno}{self.COLORS['RESET']}"
 
     def print(self, obj: LogObject) -> None:
+        print(self.format(obj), file=self.stream)
+
+    def format(self, obj: LogObject) -> str:
         timestamp = obj.timestamp.strftime("%H:%M:%S")
         ctx_str = ""
         if obj.context is not None and len(obj.context) > 0:
@@ -329,7 +441,4 @@ class BasicConsolePrinter(LogPrinter):
         method = self._format_method(obj.method_source)
         line = self._format_line(obj.line_source)
 
-        print(
-            f"{level} {timestamp} {cls}.{method}{line} - {obj.text}{ctx_str}",
-            file=self.stream
-        )
+        return f"{level} {timestamp} {cls}.{method}{line} - {obj.message()}{ctx_str}"
@@ -0,0 +1,138 @@
+import atexit
+import queue
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, TextIO
+from hippopytamus.logger.logger import LogPrinter, LogObject, BasicConsolePrinter
+
+
+class QueueLogPrinter(LogPrinter):
+    """Hands records to a background thread that formats them and
+    writes them in batches, so a slow stream doesn't block callers.
+
+    overflow decides what happens when the queue is full: "drop"
+    discards the record and counts it in dropped, "block" waits
+    for free space while the writer thread runs. Records printed
+    after close are dropped."""
+
+    def __init__(
+            self,
+            stream: Optional[TextIO] = None,
+            formatter: Optional[Callable[[LogObject], str]] = None,
+            maxsize: int = 10000,
+            batch_size: int = 256,
+            overflow: str = "drop",
+            flush_on_shutdown: bool = True,
+    ) -> None:
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"Unknown overflow policy {overflow}")
+        self.stream = stream if stream is not None else sys.stdout
+        self.formatter = formatter or BasicConsolePrinter(self.stream).format
+        self.queue: queue.Queue[Optional[LogObject]] = queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.block = overflow == "block"
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(
+                target=self.run,
+                name="hippo-log-writer",
+                daemon=True
+        )
+        self.thread.start()
+        if flush_on_shutdown:
+            atexit.register(self.close)
+
+    def print(self, obj: LogObject) -> None:
+        if self.closed:
+            self.drop()
+            return
+        if self.block:
+            if not self.put(obj):
+                self.drop()
+            return
+        try:
+            self.queue.put_nowait(obj)
+        except queue.Full:
+            self.drop()
+
+    def put(self, obj: Optional[LogObject]) -> bool:
+        """Waits for free space in the queue; gives up when the writer
+        thread is gone, since nothing would ever take the record."""
+        while True:
+            try:
+                self.queue.put(obj, timeout=0.1)
+                return True
+            except queue.Full:
+                if not self.thread.is_alive():
+                    return False
+                if obj is not None and self.closed:
+                    return False
+
+    def drop(self) -> None:
+        with self.lock:
+            self.dropped += 1
+
+    def run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                stop = self.write_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                return
+
+    def write_batch(self, batch: List[Optional[LogObject]]) -> bool:
+        stop = False
+        lines = []
+        dropped = self.dropped
+        if dropped > self.reported_dropped:
+            lines.append(f"[WARN]  {dropped - self.reported_dropped} log records dropped")
+            self.reported_dropped = dropped
+        for obj in batch:
+            if obj is None:
+                stop = True
+                continue
+            try:
+                lines.append(self.formatter(obj))
+            except Exception as e:
+                lines.append(f"[ERROR] Couldn't format log record: {e!r}")
+        if lines:
+            try:
+                self.stream.write("\n".join(lines) + "\n")
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass
+        return stop
+
+    def flush(self, timeout: Optional[float] = 5.0) -> None:
+        """Waits until every queued record is written, giving up after
+        timeout seconds or once the writer thread is gone."""
+        if self.closed:
+            return
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        done = self.queue.all_tasks_done
+        with done:
+            while self.queue.unfinished_tasks and self.thread.is_alive():
+                wait = 0.1
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        return
+                done.wait(wait)
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.put(None)
+        self.thread.join(timeout)
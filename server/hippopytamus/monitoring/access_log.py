@@ -0,0 +1,154 @@
+import datetime
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+from hippopytamus.core.annotation import Controller, GetMapping, RequestHeader, RequestMapping, RequestParam
+from hippopytamus.core.container import RequestListener
+from hippopytamus.logger.logger import LogObject, LogPrinter
+from hippopytamus.monitoring.admin import check_admin_token
+from hippopytamus.protocol.interface import Request, Response
+
+
+class AccessLog(RequestListener):
+    """Keeps sampled request records in a preallocated ring buffer.
+
+    Every sample_every-th request is recorded, and so is every request
+    answered with status >= error_status or slower than slow_threshold
+    seconds. With a printer, a background thread writes new records
+    to it every flush_interval seconds."""
+
+    def __init__(
+            self,
+            capacity: int = 4096,
+            sample_every: int = 1,
+            error_status: int = 500,
+            slow_threshold: float = 0.5,
+            printer: Optional[LogPrinter] = None,
+            flush_interval: float = 1.0,
+    ) -> None:
+        self.capacity = capacity
+        self.sample_every = max(1, sample_every)
+        self.error_status = error_status
+        self.slow_threshold = slow_threshold
+        self.timestamps = array('d', [0.0]) * capacity
+        self.latencies = array('d', [0.0]) * capacity
+        self.statuses = array('i', [0]) * capacity
+        self.sizes = array('q', [0]) * capacity
+        self.methods: List[str] = [""] * capacity
+        self.paths: List[str] = [""] * capacity
+        self.seen = 0
+        self.written = 0
+        self.flushed = 0
+        self.lock = threading.Lock()
+        self.printer = printer
+        self.flush_interval = flush_interval
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        if printer is not None:
+            self.thread = threading.Thread(
+                    target=self.run,
+                    name="hippo-access-log",
+                    daemon=True
+            )
+            self.thread.start()
+
+    def request_finished(self, request: Request, response: Response, elapsed: float, size: int) -> None:
+        self.seen += 1
+        status = 200
+        if isinstance(response, dict):
+            status = response.get('code', 200)
+        sampled = self.seen % self.sample_every == 0
+        if not (sampled or status >= self.error_status or elapsed >= self.slow_threshold):
+            return
+        method = ""
+        path = ""
+        if isinstance(request, dict):
+            method = request.get('method', "")
+            path = request.get('uri', "")
+        with self.lock:
+            i = self.written % self.capacity
+            self.timestamps[i] = time.time()
+            self.latencies[i] = elapsed
+            self.statuses[i] = status
+            self.sizes[i] = size
+            self.methods[i] = method
+            self.paths[i] = path
+            self.written += 1
+
+    def entry(self, i: int) -> Dict[str, Any]:
+        return {
+            "timestamp": self.timestamps[i],
+            "method": self.methods[i],
+            "path": self.paths[i],
+            "status": self.statuses[i],
+            "bytes": self.sizes[i],
+            "latency_ms": self.latencies[i] * 1000,
+        }
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns retained records, oldest first."""
+        with self.lock:
+            end = self.written
+            start = max(0, end - self.capacity)
+            if limit is not None:
+                start = max(start, end - limit)
+            return [self.entry(n % self.capacity) for n in range(start, end)]
+
+    def flush(self) -> None:
+        if self.printer is None:
+            return
+        with self.lock:
+            end = self.written
+            start = max(self.flushed, end - self.capacity)
+            lost = start - self.flushed
+            records = [self.entry(n % self.capacity) for n in range(start, end)]
+            self.flushed = end
+        if lost > 0:
+            self.printer.print(LogObject(
+                    log_level="WARN",
+                    class_source="access",
+                    text="%d access log records overwritten before flush",
+                    text_args=(lost,),
+            ))
+        for record in records:
+            self.printer.print(LogObject(
+                    timestamp=datetime.datetime.fromtimestamp(record["timestamp"]),
+                    log_level="INFO",
+                    class_source="access",
+                    text="%s %s %d %dB %.2fms",
+                    text_args=(
+                        record["method"], record["path"], record["status"],
+                        record["bytes"], record["latency_ms"]
+                    ),
+            ))
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
+
+
+@Controller
+@RequestMapping("/admin")
+class AccessLogController:
+    """Lists recent access log records; calls must carry the admin
+    token in X-Admin-Token."""
+
+    def __init__(self, access_log: AccessLog, token: Optional[str] = None) -> None:
+        self.access_log = access_log
+        self.token = token
+
+    @GetMapping("/access-log")
+    def entries(
+            self,
+            token: RequestHeader(str, "X-Admin-Token"),  # type: ignore[valid-type]
+            limit: RequestParam(int, "limit", defaultValue=100)  # type: ignore[valid-type]
+    ) -> List[Dict[str, Any]]:
+        check_admin_token(self.token, token)
+        return self.access_log.entries(limit)
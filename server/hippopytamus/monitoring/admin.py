@@ -0,0 +1,11 @@
+import hmac
+from typing import Optional
+from hippopytamus.core.exception import HippoInternalForbiddenException
+
+
+def check_admin_token(expected: Optional[str], token: Optional[str]) -> None:
+    """Refuses a call to an admin endpoint unless its X-Admin-Token
+    header matches the configured token; with no token configured
+    every call is refused."""
+    if expected is None or token is None or not hmac.compare_digest(token, expected):
+        raise HippoInternalForbiddenException()
@@ -0,0 +1,355 @@
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from hippopytamus.core.annotation import Controller, GetMapping
+from hippopytamus.core.container import RequestListener
+from hippopytamus.protocol.interface import Request, Response
+from hippopytamus.server.observer import ServerObserver
+
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+SIZE_BUCKETS = (0, 16, 64, 256, 512, 1024, 4096, 16384, 65536)
+# methods used as labels; anything else a client sends is "other"
+HTTP_METHODS = frozenset(("GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"))
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name: str) -> List[Tuple[str, str, float]]:
+        return [(name, "", self.value)]
+
+
+class Gauge:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value -= amount
+
+    def samples(self, name: str) -> List[Tuple[str, str, float]]:
+        return [(name, "", self.value)]
+
+
+class Histogram:
+    """Counts observations in fixed buckets. Counts live in a
+    preallocated array, so observe() doesn't allocate."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.bounds = tuple(sorted(buckets))
+        self.counts = array('Q', [0]) * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name: str) -> List[Tuple[str, str, float]]:
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+            count = self.count
+        result = []
+        cumulative = 0
+        for bound, bucket in zip(self.bounds, counts):
+            cumulative += bucket
+            result.append((f"{name}_bucket", f'le="{format_value(bound)}"', float(cumulative)))
+        result.append((f"{name}_bucket", 'le="+Inf"', float(count)))
+        result.append((f"{name}_sum", "", total))
+        result.append((f"{name}_count", "", float(count)))
+        return result
+
+
+class MetricFamily:
+    """A named metric with one child per combination of label values."""
+
+    def __init__(
+            self,
+            name: str,
+            help: str,
+            kind: str,
+            labelnames: Tuple[str, ...],
+            factory: Callable[[], Any],
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = labelnames
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], Any] = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *values: Any) -> Any:
+        child = self.children.get(values)
+        if child is not None:
+            return child
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        with self.lock:
+            child = self.children.get(values)
+            if child is None:
+                child = self.factory()
+                self.children[values] = child
+        return child
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {escape_help(self.help)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in list(self.children.items()):
+            labels = ",".join(
+                f'{name}="{escape_label(str(value))}"'
+                for name, value in zip(self.labelnames, values)
+            )
+            for sample, extra, value in child.samples(self.name):
+                all_labels = ",".join(label for label in (labels, extra) if label)
+                if all_labels:
+                    lines.append(f"{sample}{{{all_labels}}} {format_value(value)}")
+                else:
+                    lines.append(f"{sample} {format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.families: Dict[str, MetricFamily] = {}
+        self.lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self.family(name, help, "counter", labelnames, Counter)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self.family(name, help, "gauge", labelnames, Gauge)
+
+    def histogram(
+            self,
+            name: str,
+            help: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> MetricFamily:
+        return self.family(name, help, "histogram", labelnames, lambda: Histogram(buckets))
+
+    def family(
+            self,
+            name: str,
+            help: str,
+            kind: str,
+            labelnames: Sequence[str],
+            factory: Callable[[], Any]
+    ) -> MetricFamily:
+        with self.lock:
+            family = self.families.get(name)
+            if family is None:
+                family = MetricFamily(name, help, kind, tuple(labelnames), factory)
+                self.families[name] = family
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} already registered as {family.kind}")
+            return family
+
+    def render(self) -> str:
+        """Returns all metrics in Prometheus text exposition format."""
+        lines: List[str] = []
+        for family in list(self.families.values()):
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def escape_label(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class HttpMetrics(RequestListener, ServerObserver):
+    """Records per-route request metrics from the container and
+    connection metrics from the server."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.requests = registry.counter(
+                "hippo_http_requests_total",
+                "Processed requests.",
+                ("route", "method", "status"))
+        self.latency = registry.histogram(
+                "hippo_http_request_duration_seconds",
+                "Request processing time in seconds.",
+                ("route", "method"))
+        self.request_bytes = registry.counter(
+                "hippo_http_request_body_bytes_total",
+                "Received request body bytes.",
+                ("route",))
+        self.response_bytes = registry.counter(
+                "hippo_http_response_body_bytes_total",
+                "Sent response body bytes.",
+                ("route",))
+        self.open_connections = registry.gauge(
+                "hippo_server_open_connections",
+                "Currently open connections.").labels()
+        self.connections = registry.counter(
+                "hippo_server_connections_total",
+                "Accepted connections.").labels()
+        self.received = registry.counter(
+                "hippo_server_received_bytes_total",
+                "Bytes read from sockets.").labels()
+        self.sent = registry.counter(
+                "hippo_server_sent_bytes_total",
+                "Bytes written to sockets.").labels()
+        self.parse_errors = registry.counter(
+                "hippo_server_parse_errors_total",
+                "Requests that couldn't be parsed.").labels()
+
+    def request_finished(self, request: Request, response: Response, elapsed: float, size: int) -> None:
+        route = "unmatched"
+        method = ""
+        received = 0
+        if isinstance(request, dict):
+            route = request.get('route') or route
+            method = request.get('method', "")
+            if method not in HTTP_METHODS:
+                method = "other"
+            body = request.get('body')
+            received = len(body) if body else 0
+        status = 200
+        if isinstance(response, dict):
+            status = response.get('code', 200)
+        self.requests.labels(route, method, status).inc()
+        self.latency.labels(route, method).observe(elapsed)
+        if received:
+            self.request_bytes.labels(route).inc(received)
+        if size:
+            self.response_bytes.labels(route).inc(size)
+
+    def connection_opened(self) -> None:
+        self.connections.inc()
+        self.open_connections.inc()
+
+    def connection_closed(self) -> None:
+        self.open_connections.dec()
+
+    def bytes_received(self, count: int) -> None:
+        self.received.inc(count)
+
+    def bytes_sent(self, count: int) -> None:
+        self.sent.inc(count)
+
+    def parse_error(self, error: Exception) -> None:
+        self.parse_errors.inc()
+
+
+class LoopMetrics(ServerObserver):
+    """Records how an event-loop server spends its time: blocked in
+    select/poll, processing ready sockets, events and accepts per
+    wakeup and bytes per recv.
+
+    The busy-polling server never blocks, so each of its iterations is
+    a wakeup with every socket as an event, and polls that found
+    nothing are counted as idle reads."""
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.blocked = registry.histogram(
+                "hippo_loop_blocked_seconds",
+                "Time spent waiting in select/poll.").labels()
+        self.busy = registry.histogram(
+                "hippo_loop_busy_seconds",
+                "Time spent processing ready sockets after a wakeup.").labels()
+        self.events = registry.histogram(
+                "hippo_loop_events_per_wakeup",
+                "Ready sockets per wakeup.",
+                buckets=COUNT_BUCKETS).labels()
+        self.accepts = registry.histogram(
+                "hippo_loop_accepts_per_wakeup",
+                "Accepted connections per wakeup.",
+                buckets=COUNT_BUCKETS).labels()
+        self.recv_bytes = registry.histogram(
+                "hippo_server_recv_bytes",
+                "Bytes returned by a single recv.",
+                buckets=SIZE_BUCKETS).labels()
+        self.idle_reads = registry.counter(
+                "hippo_loop_idle_reads_total",
+                "Polls of sockets that had nothing to read.").labels()
+        self.waiting_since: Optional[float] = None
+        self.woke_at: Optional[float] = None
+        self.accepted = 0
+
+    def loop_waiting(self) -> None:
+        now = time.perf_counter()
+        if self.woke_at is not None:
+            self.busy.observe(now - self.woke_at)
+            self.accepts.observe(self.accepted)
+            self.woke_at = None
+        self.waiting_since = now
+
+    def loop_woke(self, events: int) -> None:
+        now = time.perf_counter()
+        if self.waiting_since is not None:
+            self.blocked.observe(now - self.waiting_since)
+            self.waiting_since = None
+        self.events.observe(events)
+        self.accepted = 0
+        self.woke_at = now
+
+    def connection_opened(self) -> None:
+        self.accepted += 1
+
+    def bytes_received(self, count: int) -> None:
+        self.recv_bytes.observe(count)
+
+    def read_would_block(self) -> None:
+        self.idle_reads.inc()
+
+
+@Controller
+class MetricsController:
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+
+    @GetMapping("/metrics")
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "code": 200,
+            "body": bytes(self.registry.render(), "utf-8"),
+            "headers": {
+                "Server": "Hippopytamus",
+                "Content-Type": "text/plain; version=0.0.4",
+            },
+        }
@@ -0,0 +1,252 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from types import FrameType
+from typing import Any, Dict, List, Optional
+from hippopytamus.core.annotation import Controller, GetMapping, PostMapping, RequestMapping
+from hippopytamus.core.annotation import RequestHeader, RequestParam
+from hippopytamus.monitoring import tracing
+from hippopytamus.monitoring.admin import check_admin_token
+
+
+MODES = ("sample", "cprofile")
+# shorter sampling intervals would keep the sampler thread spinning
+MIN_INTERVAL = 0.001
+
+
+class RequestProfiler(tracing.Tracer):
+    """Profiles a running process for the next N requests or T seconds.
+
+    In "sample" mode a background thread snapshots the stacks of all
+    threads every interval seconds and counts them as collapsed stacks.
+    In "cprofile" mode cProfile runs from the first received byte of
+    a request until its response is sent, so server, framework and
+    handler frames all show up. Requests are seen through the tracing
+    hooks, which stay registered only while profiling."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.state = "idle"
+        self.mode = "sample"
+        self.interval = 0.005
+        self.requests_left: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self.requests = 0
+        self.samples = 0
+        self.stacks: Dict[str, int] = {}
+        self.profile: Optional[cProfile.Profile] = None
+        self.profiled_span: Optional[tracing.Span] = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(
+            self,
+            mode: str = "sample",
+            requests: Optional[int] = None,
+            seconds: Optional[float] = None,
+            interval: float = 0.005,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiler mode {mode}")
+        if interval <= 0:
+            raise ValueError(f"Sampling interval must be positive, got {interval}")
+        interval = max(interval, MIN_INTERVAL)
+        if requests is None and seconds is None:
+            seconds = 10.0
+        with self.lock:
+            if self.state == "running":
+                raise ValueError("Profiler is already running")
+            self.state = "running"
+            self.mode = mode
+            self.interval = interval
+            self.requests_left = requests
+            self.started_at = time.perf_counter()
+            self.deadline = self.started_at + seconds if seconds is not None else None
+            self.requests = 0
+            self.samples = 0
+            self.stacks = {}
+            self.profile = cProfile.Profile() if mode == "cprofile" else None
+            self.profiled_span = None
+            self.stopped.clear()
+        tracing.add_tracer(self)
+        if mode == "sample":
+            self.thread = threading.Thread(
+                    target=self.run,
+                    name="hippo-profiler",
+                    daemon=True
+            )
+            self.thread.start()
+
+    def span_started(self, span: tracing.Span) -> None:
+        if self.profile is None or self.profiled_span is not None:
+            return
+        with self.lock:
+            if self.state != "running" or self.profiled_span is not None:
+                return
+            self.profiled_span = span
+        self.profile.enable()
+
+    def span_finished(self, span: tracing.Span) -> None:
+        if span.start < self.started_at:
+            return
+        if span is self.profiled_span and self.profile is not None:
+            self.profile.disable()
+            self.profiled_span = None
+        with self.lock:
+            self.requests += 1
+            if self.requests_left is not None:
+                self.requests_left -= 1
+            done = self.requests_left == 0 or self.expired()
+        if done:
+            self.stop()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            if self.expired():
+                self.stop()
+                return
+            self.sample()
+
+    def sample(self) -> None:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        with self.lock:
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                stack = collapse(frame, names.get(ident, str(ident)))
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        with self.lock:
+            if self.state != "running":
+                return
+            self.state = "done"
+            self.finished_at = time.perf_counter()
+        tracing.remove_tracer(self)
+        self.stopped.set()
+        if self.profiled_span is not None and self.profile is not None:
+            self.profile.disable()
+            self.profiled_span = None
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.thread = None
+
+    def status(self) -> Dict[str, Any]:
+        if self.state == "running" and self.expired() and self.mode == "cprofile":
+            self.stop()
+        end = self.finished_at if self.state == "done" else time.perf_counter()
+        return {
+            "state": self.state,
+            "mode": self.mode,
+            "requests": self.requests,
+            "samples": self.samples,
+            "seconds": end - self.started_at if self.state != "idle" else 0.0,
+        }
+
+    def collapsed(self) -> str:
+        """Returns sampled stacks in the collapsed format used by
+        flamegraph tools: frames joined with ';', then the count."""
+        with self.lock:
+            stacks = sorted(self.stacks.items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def pstats(self, sort: str = "cumulative", limit: int = 50) -> str:
+        if self.profile is None:
+            return ""
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_qualname}"
+
+
+def collapse(frame: Optional[FrameType], root: str) -> str:
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    labels.reverse()
+    return ";".join(labels)
+
+
+@Controller
+@RequestMapping("/admin/profiler")
+class ProfilerController:
+    """Starts and stops profiling sessions and returns their results.
+    Every call must carry the admin token in X-Admin-Token; with no
+    token configured all calls are refused."""
+
+    def __init__(self, profiler: RequestProfiler, token: Optional[str] = None) -> None:
+        self.profiler = profiler
+        self.token = token
+
+    def check_token(self, token: Optional[str]) -> None:
+        check_admin_token(self.token, token)
+
+    @PostMapping("/start")
+    def start(
+            self,
+            token: RequestHeader(str, "X-Admin-Token"),  # type: ignore[valid-type]
+            mode: RequestParam(str, "mode", defaultValue="sample"),  # type: ignore[valid-type]
+            requests: RequestParam(int, "requests"),  # type: ignore[valid-type]
+            seconds: RequestParam(int, "seconds"),  # type: ignore[valid-type]
+            interval_ms: RequestParam(int, "interval", defaultValue=5)  # type: ignore[valid-type]
+    ) -> Dict[str, Any]:
+        self.check_token(token)
+        try:
+            self.profiler.start(mode, requests, seconds, interval_ms / 1000)
+        except ValueError as e:
+            return {"code": 400, "body": bytes(str(e), "utf-8")}
+        return self.profiler.status()
+
+    @PostMapping("/stop")
+    def stop(
+            self,
+            token: RequestHeader(str, "X-Admin-Token")  # type: ignore[valid-type]
+    ) -> Dict[str, Any]:
+        self.check_token(token)
+        self.profiler.stop()
+        return self.profiler.status()
+
+    @GetMapping("/result")
+    def result(
+            self,
+            token: RequestHeader(str, "X-Admin-Token"),  # type: ignore[valid-type]
+            format: RequestParam(str, "format")  # type: ignore[valid-type]
+    ) -> Dict[str, Any]:
+        self.check_token(token)
+        status = self.profiler.status()
+        if status["state"] != "done":
+            return status
+        if format is None:
+            format = "pstats" if self.profiler.mode == "cprofile" else "collapsed"
+        if format == "pstats":
+            body = self.profiler.pstats()
+        elif format == "collapsed":
+            body = self.profiler.collapsed()
+        else:
+            return {"code": 400, "body": bytes(f"Unknown format {format}", "utf-8")}
+        return {
+            "code": 200,
+            "body": bytes(body, "utf-8"),
+            "headers": {"Server": "Hippopytamus", "Content-Type": "text/plain"},
+        }
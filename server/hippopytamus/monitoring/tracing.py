@@ -0,0 +1,168 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from hippopytamus.core.annotation import Controller, GetMapping, RequestHeader, RequestMapping
+from hippopytamus.monitoring.admin import check_admin_token
+
+
+class Span:
+    """Phase timestamps of a single request.
+
+    Each mark() closes a phase, so its duration is the time since the
+    previous mark (or since the span started). Handlers can attach
+    their own data to the current span with annotate()."""
+
+    __slots__ = ("start", "phases", "annotations", "route")
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.phases: List[Tuple[str, float]] = []
+        self.annotations: Dict[str, Any] = {}
+        self.route: Optional[str] = None
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases.append((phase, now))
+        for tracer in _tracers:
+            tracer.phase_finished(self, phase, now)
+
+    def annotate(self, key: str, value: Any) -> None:
+        self.annotations[key] = value
+
+    def durations(self) -> List[Tuple[str, float]]:
+        result = []
+        previous = self.start
+        for phase, timestamp in self.phases:
+            result.append((phase, timestamp - previous))
+            previous = timestamp
+        return result
+
+    def elapsed(self) -> float:
+        if not self.phases:
+            return 0.0
+        return self.phases[-1][1] - self.start
+
+
+class Tracer:
+    """Receives span events. Timestamps come from time.perf_counter()."""
+
+    def span_started(self, span: Span) -> None:
+        pass
+
+    def phase_finished(self, span: Span, phase: str, timestamp: float) -> None:
+        pass
+
+    def span_finished(self, span: Span) -> None:
+        pass
+
+
+_tracers: List[Tracer] = []
+_local = threading.local()
+
+
+def add_tracer(tracer: Tracer) -> None:
+    _tracers.append(tracer)
+
+
+def remove_tracer(tracer: Tracer) -> None:
+    if tracer in _tracers:
+        _tracers.remove(tracer)
+
+
+def enabled() -> bool:
+    return bool(_tracers)
+
+
+def start_span() -> Optional[Span]:
+    """Returns a new span, or None if no tracer is registered."""
+    if not _tracers:
+        return None
+    span = Span(time.perf_counter())
+    for tracer in _tracers:
+        tracer.span_started(span)
+    return span
+
+
+def activate(span: Optional[Span]) -> None:
+    """Makes span the current span of this thread."""
+    _local.span = span
+
+
+def current_span() -> Optional[Span]:
+    if not _tracers:
+        return None
+    return getattr(_local, "span", None)
+
+
+def finish_span(span: Span) -> None:
+    if getattr(_local, "span", None) is span:
+        _local.span = None
+    for tracer in _tracers:
+        tracer.span_finished(span)
+
+
+class PhaseAggregator(Tracer):
+    """Sums up phase durations of finished spans per route."""
+
+    def __init__(self) -> None:
+        self.stats: Dict[str, Dict[str, List[float]]] = {}
+        self.lock = threading.Lock()
+
+    def span_finished(self, span: Span) -> None:
+        route = span.route or "unmatched"
+        with self.lock:
+            phases = self.stats.get(route)
+            if phases is None:
+                phases = {}
+                self.stats[route] = phases
+            for phase, duration in span.durations():
+                self.add(phases, phase, duration)
+            self.add(phases, "total", span.elapsed())
+
+    def add(self, phases: Dict[str, List[float]], phase: str, duration: float) -> None:
+        stat = phases.get(phase)
+        if stat is None:
+            phases[phase] = [1, duration, duration]
+            return
+        stat[0] += 1
+        stat[1] += duration
+        if duration > stat[2]:
+            stat[2] = duration
+
+    def breakdown(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        with self.lock:
+            return {
+                route: {
+                    phase: {
+                        "count": count,
+                        "total_ms": total * 1000,
+                        "mean_ms": total * 1000 / count,
+                        "max_ms": longest * 1000,
+                    }
+                    for phase, (count, total, longest) in phases.items()
+                }
+                for route, phases in self.stats.items()
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.stats = {}
+
+
+@Controller
+@RequestMapping("/admin")
+class TracingController:
+    """Returns the per-route phase breakdown; calls must carry the
+    admin token in X-Admin-Token."""
+
+    def __init__(self, aggregator: PhaseAggregator, token: Optional[str] = None) -> None:
+        self.aggregator = aggregator
+        self.token = token
+
+    @GetMapping("/tracing")
+    def breakdown(
+            self,
+            token: RequestHeader(str, "X-Admin-Token")  # type: ignore[valid-type]
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
+        check_admin_token(self.token, token)
+        return self.aggregator.breakdown()
@@ -0,0 +1,126 @@
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from types import FrameType
+from typing import Dict, Optional
+from hippopytamus.core.container import RequestListener
+from hippopytamus.logger.logger import LoggerFactory
+from hippopytamus.protocol.interface import Request, Response
+from hippopytamus.server.observer import ServerObserver
+
+
+@dataclass
+class InFlight:
+    request: Request
+    started: float
+    reported: bool = False
+
+
+class Watchdog(RequestListener, ServerObserver):
+    """Logs where requests that run longer than threshold seconds are
+    stuck, once per request, with the stack of the processing thread.
+
+    As a server observer it also watches the event loop: if the loop
+    doesn't get back to select/poll within threshold seconds, the
+    lag is logged with the loop thread's stack."""
+
+    def __init__(
+            self,
+            threshold: float = 1.0,
+            interval: Optional[float] = None,
+            start: bool = True,
+    ) -> None:
+        self.threshold = threshold
+        self.interval = interval if interval is not None else max(threshold / 4, 0.01)
+        self.inflight: Dict[int, InFlight] = {}
+        self.loop_thread: Optional[int] = None
+        self.loop_busy_since: Optional[float] = None
+        self.loop_reported = False
+        self.max_loop_lag = 0.0
+        self.reports = 0
+        self.logger = LoggerFactory.get_logger()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        if start:
+            self.thread = threading.Thread(
+                    target=self.run,
+                    name="hippo-watchdog",
+                    daemon=True
+            )
+            self.thread.start()
+
+    def request_started(self, request: Request) -> None:
+        self.inflight[threading.get_ident()] = InFlight(request, time.monotonic())
+
+    def request_finished(self, request: Request, response: Response, elapsed: float, size: int) -> None:
+        self.inflight.pop(threading.get_ident(), None)
+
+    def loop_woke(self, events: int) -> None:
+        self.loop_thread = threading.get_ident()
+        self.loop_busy_since = time.monotonic()
+        self.loop_reported = False
+
+    def loop_waiting(self) -> None:
+        busy_since = self.loop_busy_since
+        if busy_since is not None:
+            lag = time.monotonic() - busy_since
+            if lag > self.max_loop_lag:
+                self.max_loop_lag = lag
+        self.loop_busy_since = None
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def check(self) -> None:
+        now = time.monotonic()
+        frames = None
+        for ident, entry in list(self.inflight.items()):
+            elapsed = now - entry.started
+            if entry.reported or elapsed < self.threshold:
+                continue
+            entry.reported = True
+            if frames is None:
+                frames = sys._current_frames()
+            self.report_request(entry, elapsed, format_stack(frames.get(ident)))
+        busy_since = self.loop_busy_since
+        if busy_since is None or self.loop_reported:
+            return
+        lag = now - busy_since
+        if lag < self.threshold:
+            return
+        self.loop_reported = True
+        self.reports += 1
+        loop_thread = self.loop_thread
+        if loop_thread in self.inflight:
+            self.logger.warn("Event loop blocked for %.3fs by a request", lag)
+            return
+        if frames is None:
+            frames = sys._current_frames()
+        stack = format_stack(frames.get(loop_thread)) if loop_thread is not None else ""
+        self.logger.warn("Event loop blocked for %.3fs:\n%s", lag, stack)
+
+    def report_request(self, entry: InFlight, elapsed: float, stack: str) -> None:
+        self.reports += 1
+        method = ""
+        route = ""
+        if isinstance(entry.request, dict):
+            method = entry.request.get('method', "")
+            route = entry.request.get('route') or entry.request.get('uri', "")
+        self.logger.warn(
+                "Request %s %s running for %.3fs:\n%s",
+                method, route, elapsed, stack
+        )
+
+    def close(self) -> None:
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+def format_stack(frame: Optional[FrameType]) -> str:
+    if frame is None:
+        return "  <thread finished>"
+    return "".join(traceback.format_stack(frame)).rstrip()
@@ -1,5 +1,5 @@
 import os
-from typing import Optional, Dict, Tuple, cast
+from typing import Optional, Dict, Iterable, Tuple, Union, cast
 from hippopytamus.protocol.interface import Protocol, Servlet, Request, Response
 from hippopytamus.logger.logger import LoggerFactory
 
@@ -14,7 +14,7 @@ class HttpProtocol09(Protocol):
     def prepare_response(self, resp: Response) -> bytes:
         if not isinstance(resp, dict):
             raise Exception("Error")
-        return cast(bytes, resp['body'])
+        return body_bytes(resp['body'])
 
     def parse_request(self, request: bytes, context: Dict) -> Optional[Dict]:
         lines = request.split(b"\r\n")
@@ -60,9 +60,10 @@ class HttpProtocol10(Protocol):
                 response += b': '
                 response += bytes(value, 'ascii')
                 response += b"\r\n"
-        if resp['body']:
+        body = body_bytes(resp['body'])
+        if body:
             response += b"\r\n"
-            response += resp['body']
+            response += body
         return response
 
     def parse_headers(self, header: bytes) -> Optional[Dict]:
@@ -138,8 +139,8 @@ class HttpService(Servlet):
     def process_request(self, request: Request) -> Response:
         if not isinstance(request, dict):
             raise Exception("Error")
-        self.logger.debug(f"Method: {request['method']}")
-        self.logger.debug(f"Resource: {request['uri']}")
+        self.logger.debug("Method: %s", request['method'])
+        self.logger.debug("Resource: %s", request['uri'])
         if request['method'] != "GET":
             return {"code": 501, "body": ""}
         if request['uri'] != "/":
@@ -164,3 +165,11 @@ class HttpService(Servlet):
                 body = f.read()
             return body, None
         return None, "No such file"
+
+
+def body_bytes(body: Union[bytes, Iterable[bytes], None]) -> bytes:
+    """Response bodies are bytes, or an iterable of chunks for
+    streamed responses."""
+    if body is None or isinstance(body, (bytes, bytearray)):
+        return cast(bytes, body)
+    return b"".join(body)
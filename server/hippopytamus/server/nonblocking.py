@@ -1,6 +1,8 @@
 import socket
 from hippopytamus.protocol.interface import Protocol, Servlet
 from hippopytamus.logger.logger import LoggerFactory
+from hippopytamus.server.observer import ObservedServer
+from hippopytamus.monitoring import tracing
 import select
 from typing import List, Any, Dict, Optional
 
@@ -8,7 +10,7 @@ from typing import List, Any, Dict, Optional
 # this is a very naive implementation that will result in
 # many unnecessary calls to read while polling each
 # socket
-class SimpleNonBlockingTCPServer:
+class SimpleNonBlockingTCPServer(ObservedServer):
     def __init__(self, protocol: Protocol, service: Servlet,
                  host: str = "localhost", port: int = 8000) -> None:
         self.protocol = protocol
@@ -22,7 +24,8 @@ class SimpleNonBlockingTCPServer:
         try:
             connection, address = sock.accept()
             connection.setblocking(False)
-            self.logger.info(f"new client: {address}")
+            self.logger.info("new client: %s", address)
+            self.observer.connection_opened()
             self.connections.append({
                 "connection": connection,
                 "address": address,
@@ -31,32 +34,70 @@ class SimpleNonBlockingTCPServer:
                 "read": False,
             })
         except BlockingIOError:
-            pass
+            self.observer.read_would_block()
 
     def process(self, conn: Dict[str, Any], i: int, to_remove: List[int]) -> None:
-        conn['data'], conn['read'] = self.protocol.feed_parse(
-                conn['data'], conn['context'])
-        if conn['read']:
+        try:
+            conn['data'], conn['read'] = self.protocol.feed_parse(
+                    conn['data'], conn['context'])
+            if not conn['read']:
+                return
+            span = conn.get('span')
+            if span is not None:
+                span.mark("feed_parse")
             request = self.protocol.parse_request(
                     conn['data'], conn['context'])
+            if span is not None:
+                span.mark("parse_request")
+        except Exception as err:
+            self.logger.warn("Couldn't parse request: %r", err)
+            self.observer.parse_error(err)
+            self.close_connection(conn, i, to_remove)
+            return
+        if span is not None:
+            tracing.activate(span)
+        try:
             response = self.service.process_request(request)
             result = self.protocol.prepare_response(response)
+            if span is not None:
+                span.mark("prepare_response")
             conn['connection'].sendall(result)
-            if 'keep-alive' not in conn['context']:
-                conn['connection'].close()
-                to_remove.append(i)
+        except Exception as err:
+            # one broken response must not stop the event loop
+            self.logger.error("Couldn't respond: %r", err)
+            if span is not None:
+                tracing.finish_span(span)
+                conn['span'] = None
+            self.close_connection(conn, i, to_remove)
+            return
+        self.observer.bytes_sent(len(result))
+        if span is not None:
+            span.mark("sendall")
+            tracing.finish_span(span)
+            conn['span'] = None
+        if 'keep-alive' not in conn['context']:
+            self.close_connection(conn, i, to_remove)
+
+    def close_connection(self, conn: Dict[str, Any], i: int, to_remove: List[int]) -> None:
+        conn['connection'].close()
+        to_remove.append(i)
+        self.observer.connection_closed()
 
     def read(self, conn: Dict[str, Any], i: int, to_remove: List[int]) -> bool:
         try:
-            conn['data'] += conn['connection'].recv(1024)
-            return True
+            chunk = conn['connection'].recv(1024)
         except BlockingIOError:
+            self.observer.read_would_block()
             return False
         except Exception as err:
             self.logger.warn(err)
-            conn['connection'].close()
-            to_remove.append(i)
+            self.close_connection(conn, i, to_remove)
             return False
+        self.observer.bytes_received(len(chunk))
+        if not conn['data']:
+            conn['span'] = tracing.start_span()
+        conn['data'] += chunk
+        return True
 
     def clear_connections(self, to_remove: List[int]) -> None:
         for i in to_remove:
@@ -78,6 +119,9 @@ class SimpleNonBlockingTCPServer:
 
         to_remove: List[int] = []
         while True:
+            # nothing to wait for: every iteration polls all sockets
+            self.observer.loop_waiting()
+            self.observer.loop_woke(len(self.connections) + 1)
             self.clear_connections(to_remove)
             self.accept_connection(sock)
             for i, conn in enumerate(self.connections):
@@ -86,7 +130,7 @@ class SimpleNonBlockingTCPServer:
                     self.process(conn, i, to_remove)
 
 
-class SelectTCPServer:
+class SelectTCPServer(ObservedServer):
     def __init__(self, protocol: Protocol, service: Servlet,
                  host: str = "localhost", port: int = 8000) -> None:
         self.protocol = protocol
@@ -110,7 +154,9 @@ class SelectTCPServer:
 
         while True:
             # TODO: use select for writing; exceptions
+            self.observer.loop_waiting()
             readable, _, _ = select.select(self.connections, [], [])
+            self.observer.loop_woke(len(readable))
 
             for conn in readable:
                 if conn is sock:
@@ -125,11 +171,13 @@ class SelectTCPServer:
         index = self.connections.index(connection)
         self.connections.pop(index)
         self.state.pop(index)
+        self.observer.connection_closed()
 
     def accept_connection(self, sock: socket.socket) -> None:
         connection, address = sock.accept()
         connection.setblocking(False)
-        self.logger.info(f"new client: {address}")
+        self.logger.info("new client: %s", address)
+        self.observer.connection_opened()
         self.connections.append(connection)
         self.state.append({
             "address": address,
@@ -139,29 +187,65 @@ class SelectTCPServer:
         })
 
     def process(self, conn: socket.socket, state: Dict[str, Any]) -> None:
-        state['data'], state['read'] = self.protocol.feed_parse(
-                state['data'], state['context'])
-        if state['read']:
+        try:
+            state['data'], state['read'] = self.protocol.feed_parse(
+                    state['data'], state['context'])
+            if not state['read']:
+                return
+            span = state.get('span')
+            if span is not None:
+                span.mark("feed_parse")
             request = self.protocol.parse_request(
                     state['data'], state['context'])
+            if span is not None:
+                span.mark("parse_request")
+        except Exception as err:
+            self.logger.warn("Couldn't parse request: %r", err)
+            self.observer.parse_error(err)
+            conn.close()
+            self.remove_connection(conn)
+            return
+        if span is not None:
+            tracing.activate(span)
+        try:
             response = self.service.process_request(request)
             result = self.protocol.prepare_response(response)
+            if span is not None:
+                span.mark("prepare_response")
             conn.sendall(result)
-            if 'keep-alive' not in state['context']:
-                conn.close()
-                self.remove_connection(conn)
+        except Exception as err:
+            # one broken response must not stop the event loop
+            self.logger.error("Couldn't respond: %r", err)
+            if span is not None:
+                tracing.finish_span(span)
+                state['span'] = None
+            conn.close()
+            self.remove_connection(conn)
+            return
+        self.observer.bytes_sent(len(result))
+        if span is not None:
+            span.mark("sendall")
+            tracing.finish_span(span)
+            state['span'] = None
+        if 'keep-alive' not in state['context']:
+            conn.close()
+            self.remove_connection(conn)
 
     def read(self, conn: socket.socket, state: Dict[str, Any]) -> bool:
         try:
-            state['data'] += conn.recv(1024)
-            return True
+            chunk = conn.recv(1024)
         except Exception as err:
             self.logger.warn(err)
             self.remove_connection(conn)
             return False
+        self.observer.bytes_received(len(chunk))
+        if not state['data']:
+            state['span'] = tracing.start_span()
+        state['data'] += chunk
+        return True
 
 
-class PollTCPServer:
+class PollTCPServer(ObservedServer):
     def __init__(self, protocol: Protocol, service: Servlet,
                  host: str = "localhost", port: int = 8000) -> None:
         self.protocol = protocol
@@ -186,7 +270,9 @@ class PollTCPServer:
         self.fdmap[sock.fileno()] = {"connection": sock, "state": None}
 
         while True:
+            self.observer.loop_waiting()
             events = self.poller.poll(-1)
+            self.observer.loop_woke(len(events))
 
             for fd, flag in events:
                 conn = self.fdmap.get(fd)
@@ -207,13 +293,15 @@ class PollTCPServer:
             return
         self.poller.unregister(fd)
         connection['connection'].close()
+        self.observer.connection_closed()
 
     def accept_connection(self, sock: socket.socket) -> None:
         connection, address = sock.accept()
         connection.setblocking(False)
-        self.logger.info(f"new client: {address}")
+        self.logger.info("new client: %s", address)
         if not self.poller:
             return
+        self.observer.connection_opened()
         self.poller.register(connection, select.POLLIN)
         self.fdmap[connection.fileno()] = {
             "connection": connection,
@@ -224,22 +312,56 @@ class PollTCPServer:
         }
 
     def process(self, conn: Dict[str, Any]) -> None:
-        conn['data'], conn['read'] = self.protocol.feed_parse(
-                conn['data'], conn['context'])
-        if conn['read']:
+        try:
+            conn['data'], conn['read'] = self.protocol.feed_parse(
+                    conn['data'], conn['context'])
+            if not conn['read']:
+                return
+            span = conn.get('span')
+            if span is not None:
+                span.mark("feed_parse")
             request = self.protocol.parse_request(
                     conn['data'], conn['context'])
+            if span is not None:
+                span.mark("parse_request")
+        except Exception as err:
+            self.logger.warn("Couldn't parse request: %r", err)
+            self.observer.parse_error(err)
+            self.remove_connection(conn)
+            return
+        if span is not None:
+            tracing.activate(span)
+        try:
             response = self.service.process_request(request)
             result = self.protocol.prepare_response(response)
+            if span is not None:
+                span.mark("prepare_response")
             conn['connection'].sendall(result)
-            if 'keep-alive' not in conn['context']:
-                self.remove_connection(conn)
+        except Exception as err:
+            # one broken response must not stop the event loop
+            self.logger.error("Couldn't respond: %r", err)
+            if span is not None:
+                tracing.finish_span(span)
+                conn['span'] = None
+            self.remove_connection(conn)
+            return
+        self.observer.bytes_sent(len(result))
+        if span is not None:
+            span.mark("sendall")
+            tracing.finish_span(span)
+            conn['span'] = None
+        if 'keep-alive' not in conn['context']:
+            self.remove_connection(conn)
 
     def read(self, conn: Dict[str, Any]) -> bool:
         try:
-            conn['data'] += conn['connection'].recv(1024)
-            return True
+            chunk = conn['connection'].recv(1024)
         except Exception as err:
             self.logger.warn(err)
-            self.remove_connection(conn['connection'])
+            self.remove_connection(conn)
             return False
+        self.observer.bytes_received(len(chunk))
+        if not conn['data']:
+            conn['span'] = tracing.start_span()
+        conn['data'] += chunk
+        return True
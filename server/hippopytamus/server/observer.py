@@ -0,0 +1,83 @@
+from typing import List
+
+
+class ServerObserver:
+    """Receives server events. All methods are no-ops, subclasses
+    override the ones they need."""
+
+    def connection_opened(self) -> None:
+        pass
+
+    def connection_closed(self) -> None:
+        pass
+
+    def bytes_received(self, count: int) -> None:
+        pass
+
+    def bytes_sent(self, count: int) -> None:
+        pass
+
+    def parse_error(self, error: Exception) -> None:
+        pass
+
+    def loop_waiting(self) -> None:
+        """Called by event-loop servers before they wait for events."""
+        pass
+
+    def loop_woke(self, events: int) -> None:
+        """Called by event-loop servers when the wait returns."""
+        pass
+
+    def read_would_block(self) -> None:
+        """Called by polling servers when a socket had nothing to read."""
+        pass
+
+
+class ObserverChain(ServerObserver):
+    def __init__(self, observers: List[ServerObserver]) -> None:
+        self.observers = observers
+
+    def connection_opened(self) -> None:
+        for observer in self.observers:
+            observer.connection_opened()
+
+    def connection_closed(self) -> None:
+        for observer in self.observers:
+            observer.connection_closed()
+
+    def bytes_received(self, count: int) -> None:
+        for observer in self.observers:
+            observer.bytes_received(count)
+
+    def bytes_sent(self, count: int) -> None:
+        for observer in self.observers:
+            observer.bytes_sent(count)
+
+    def parse_error(self, error: Exception) -> None:
+        for observer in self.observers:
+            observer.parse_error(error)
+
+    def loop_waiting(self) -> None:
+        for observer in self.observers:
+            observer.loop_waiting()
+
+    def loop_woke(self, events: int) -> None:
+        for observer in self.observers:
+            observer.loop_woke(events)
+
+    def read_would_block(self) -> None:
+        for observer in self.observers:
+            observer.read_would_block()
+
+
+class ObservedServer:
+    observer: ServerObserver = ServerObserver()
+
+    def add_observer(self, observer: ServerObserver) -> None:
+        current = self.observer
+        if type(current) is ServerObserver:
+            self.observer = observer
+        elif isinstance(current, ObserverChain):
+            current.observers.append(observer)
+        else:
+            self.observer = ObserverChain([current, observer])
@@ -1,11 +1,13 @@
 import socket
 from hippopytamus.protocol.interface import Protocol, Servlet
 from hippopytamus.logger.logger import LoggerFactory
+from hippopytamus.server.observer import ObservedServer
+from hippopytamus.monitoring import tracing
 import threading
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
-class ThreadedTCPServer:
+class ThreadedTCPServer(ObservedServer):
     def __init__(self, protocol: Protocol, service: Servlet,
                  host: str = "localhost", port: int = 8000) -> None:
         self.protocol = protocol
@@ -24,7 +26,8 @@ class ThreadedTCPServer:
 
         while True:
             connection, address = sock.accept()
-            self.logger.info(f"new client: {address}")
+            self.observer.connection_opened()
+            self.logger.info("new client: %s", address)
             client = threading.Thread(
                     target=self.thread,
                     args=(connection, address,)
@@ -36,13 +39,45 @@ class ThreadedTCPServer:
         while True:
             read = False
             data = b''
-            while not read:
-                data += connection.recv(1024)
-                data, read = self.protocol.feed_parse(data, context)
-            request = self.protocol.parse_request(data, context)
-            response = self.service.process_request(request)
-            result = self.protocol.prepare_response(response)
-            connection.sendall(result)
+            span: Optional[tracing.Span] = None
+            try:
+                while not read:
+                    chunk = connection.recv(1024)
+                    self.observer.bytes_received(len(chunk))
+                    if not data:
+                        span = tracing.start_span()
+                    data += chunk
+                    data, read = self.protocol.feed_parse(data, context)
+                if span is not None:
+                    span.mark("feed_parse")
+                request = self.protocol.parse_request(data, context)
+                if span is not None:
+                    span.mark("parse_request")
+            except OSError:
+                raise
+            except Exception as err:
+                self.logger.warn("Couldn't parse request: %r", err)
+                self.observer.parse_error(err)
+                break
+            if span is not None:
+                tracing.activate(span)
+            try:
+                response = self.service.process_request(request)
+                result = self.protocol.prepare_response(response)
+                if span is not None:
+                    span.mark("prepare_response")
+                connection.sendall(result)
+            except Exception as err:
+                # closes this connection only, the server keeps accepting
+                self.logger.error("Couldn't respond: %r", err)
+                if span is not None:
+                    tracing.finish_span(span)
+                break
+            self.observer.bytes_sent(len(result))
+            if span is not None:
+                span.mark("sendall")
+                tracing.finish_span(span)
             if 'keep-alive' not in context:
                 break
         connection.close()
+        self.observer.connection_closed()
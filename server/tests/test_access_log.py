@@ -0,0 +1,106 @@
+import json
+from typing import List
+from hippopytamus.core.app import HippoApp, ServerOptions
+from hippopytamus.logger.logger import LogObject, LogPrinter
+from hippopytamus.monitoring.access_log import AccessLog
+
+
+class ListPrinter(LogPrinter):
+    def __init__(self):
+        self.logged: List[LogObject] = []
+
+    def print(self, obj: LogObject) -> None:
+        self.logged.append(obj)
+
+
+def request(uri: str, method: str = "GET", headers: dict = {}) -> dict:
+    return {"method": method, "uri": uri, "version": "HTTP/1.0", "headers": headers}
+
+
+def response(code: int = 200, body: bytes = b"ok") -> dict:
+    return {"code": code, "body": body}
+
+
+def test_records_request_fields():
+    log = AccessLog(capacity=8)
+
+    log.request_finished(request("/a?x=1", "POST"), response(201, b"abc"), 0.002, 3)
+
+    [entry] = log.entries()
+    assert entry["method"] == "POST"
+    assert entry["path"] == "/a?x=1"
+    assert entry["status"] == 201
+    assert entry["bytes"] == 3
+    assert entry["latency_ms"] == 2.0
+
+
+def test_ring_buffer_keeps_newest_entries():
+    log = AccessLog(capacity=4)
+
+    for i in range(10):
+        log.request_finished(request(f"/{i}"), response(), 0.001, 2)
+
+    assert [e["path"] for e in log.entries()] == ["/6", "/7", "/8", "/9"]
+    assert [e["path"] for e in log.entries(limit=2)] == ["/8", "/9"]
+
+
+def test_sampling_keeps_errors_and_slow_requests():
+    log = AccessLog(capacity=100, sample_every=10, slow_threshold=0.1)
+
+    for i in range(1, 21):
+        log.request_finished(request(f"/{i}"), response(), 0.001, 2)
+    log.request_finished(request("/error"), response(500), 0.001, 2)
+    log.request_finished(request("/slow"), response(), 0.2, 2)
+
+    paths = [e["path"] for e in log.entries()]
+    assert paths == ["/10", "/20", "/error", "/slow"]
+
+
+def test_flush_writes_new_records_to_printer():
+    printer = ListPrinter()
+    log = AccessLog(capacity=4, printer=printer, flush_interval=60)
+
+    log.request_finished(request("/a"), response(), 0.001, 2)
+    log.flush()
+    log.request_finished(request("/b"), response(404), 0.001, 2)
+    log.close()
+
+    assert [obj.message() for obj in printer.logged] == [
+        "GET /a 200 2B 1.00ms",
+        "GET /b 404 2B 1.00ms",
+    ]
+
+
+def test_admin_endpoint_lists_requests():
+    opt = ServerOptions(port=0, access_log=True, admin_token="secret")
+    app = HippoApp("hippopytamus.example.example1", opt)
+    app.access_log.printer = None
+
+    app.container.process_request(request("/api/test"))
+    app.container.process_request(request("/missing"))
+    resp = app.container.process_request(
+            request("/admin/access-log?limit=10", headers={"X-Admin-Token": "secret"}))
+
+    entries = json.loads(resp["body"])
+    assert [(e["path"], e["status"]) for e in entries] == [
+        ("/api/test", 200),
+        ("/missing", 404),
+    ]
+
+
+def test_admin_endpoint_requires_token():
+    opt = ServerOptions(port=0, access_log=True, admin_token="secret")
+    app = HippoApp("hippopytamus.example.example1", opt)
+    app.access_log.printer = None
+    unset = HippoApp("hippopytamus.example.example1", ServerOptions(port=0, access_log=True))
+    unset.access_log.printer = None
+
+    missing = app.container.process_request(request("/admin/access-log"))
+    wrong = app.container.process_request(
+            request("/admin/access-log", headers={"X-Admin-Token": "guess"}))
+    not_configured = unset.container.process_request(
+            request("/admin/access-log", headers={"X-Admin-Token": ""}))
+
+    assert missing["code"] == 403
+    assert wrong["code"] == 403
+    assert not_configured["code"] == 403
@@ -0,0 +1,41 @@
+from hippopytamus.core.annotation import (
+        GetMapping, ResponseStatus, ExceptionHandler,
+        get_method_decorators
+)
+from hippopytamus.core.extractor import get_class_methods
+
+
+def handler(self) -> str:
+    return "ok"
+
+
+def test_annotations_do_not_wrap_method():
+    decorated = ResponseStatus(code=201)(GetMapping("/a")(handler))
+
+    assert decorated is handler
+    assert not hasattr(decorated, "__wrapped__")
+
+
+def test_stacked_annotations_are_listed_outermost_first():
+    class Controller:
+        @ResponseStatus(code=400)
+        @ExceptionHandler(ValueError)
+        def on_error(self) -> None:
+            pass
+
+    decorators = get_method_decorators(Controller.on_error)
+
+    assert [d['__decorator__'] for d in decorators] == ["ResponseStatus", "ExceptionHandler"]
+
+
+def test_extracted_handle_is_original_function():
+    class Controller:
+        @GetMapping("/b")
+        def get(self) -> str:
+            return "b"
+
+    methods = get_class_methods(Controller)
+    get = next(m for m in methods if m['name'] == "get")
+
+    assert get['method_handle'] is Controller.__dict__["get"]
+    assert get['decorators'][0]['path'] == ["/b"]
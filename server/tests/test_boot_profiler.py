@@ -0,0 +1,47 @@
+import json
+from hippopytamus.core.app import HippoApp, ServerOptions
+from hippopytamus.core.boot_profiler import BootProfiler
+
+
+def test_profiler_disabled_by_default():
+    app = HippoApp("hippopytamus.example.example1", ServerOptions(port=0))
+
+    assert app.profiler.records == []
+
+
+def test_profiler_records_boot_phases(tmp_path, capsys):
+    path = tmp_path / "boot.json"
+    opt = ServerOptions(port=0, boot_profile=True, boot_profile_json=str(path))
+
+    HippoApp("hippopytamus.example.example5", opt)
+
+    out = capsys.readouterr().out
+    assert "Boot finished in" in out
+    report = json.loads(path.read_text())
+    assert report["total_seconds"] > 0
+    for phase in ["scan", "import", "register", "RepoProcessor"]:
+        assert phase in report["phases"]
+    names = [r["name"] for r in report["records"] if r["phase"] == "register"]
+    assert "hippopytamus.example.example5.components.UserRepository" in names
+
+
+def test_profiler_enabled_from_env(monkeypatch):
+    monkeypatch.setenv("HIPPO_BOOT_PROFILE", "1")
+
+    profiler = BootProfiler.from_env()
+
+    assert profiler.enabled
+
+
+def test_report_sorted_by_time():
+    profiler = BootProfiler(enabled=True)
+    profiler.start()
+    with profiler.measure("fast", "a"):
+        pass
+    with profiler.measure("slow", "b"):
+        sum(range(100000))
+
+    lines = profiler.report().splitlines()
+
+    assert lines[2].endswith("slow")
+    assert lines[3].endswith("fast")
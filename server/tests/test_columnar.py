@@ -0,0 +1,167 @@
+import random
+from array import array
+from dataclasses import dataclass
+from typing import Iterator, Optional
+import pytest
+from hippopytamus.data.columnar import ColumnarStorage
+from hippopytamus.data.page import Page, Pageable
+from hippopytamus.data.repository import HippoRepository
+from hippopytamus.data.repo_creator import HippoRepositoryCreator
+from .test_store import run_concurrently
+
+
+@dataclass
+class Sample:
+    id: int
+    host: str
+    value: float
+    count: int
+    ok: bool = True
+    note: Optional[str] = None
+
+
+class SampleRepository(HippoRepository[Sample, int]):
+    _storage = ColumnarStorage(batch_size=4)
+
+    def find_all_by_host_and_value_greater_than(self, host: str, value: float) -> list[Sample]:
+        pass
+
+    def find_all_by_count_between_or_note_starting_with(self, low_high: tuple, prefix: str) -> list[Sample]:
+        pass
+
+    def find_first_by_host_order_by_value_desc(self, host: str) -> Sample:
+        pass
+
+    def find_all_by_ok_order_by_note(self, ok: bool, pageable: Pageable) -> Page[Sample]:
+        pass
+
+    def stream_by_host_in(self, hosts: list) -> Iterator[Sample]:
+        pass
+
+    def count_by_host(self, host: str) -> int:
+        pass
+
+    def sum_count_by_host(self, host: str) -> int:
+        pass
+
+    def avg_value(self) -> float:
+        pass
+
+    def max_value_by_ok(self, ok: bool) -> float:
+        pass
+
+    def delete_all_by_host(self, host: str) -> list[Sample]:
+        pass
+
+    def find_distinct_host_and_ok_by_value_greater_than(self, value: float) -> list[tuple]:
+        pass
+
+    def count_distinct_note(self) -> int:
+        pass
+
+
+@pytest.fixture
+def repo():
+    HippoRepositoryCreator().create_repo_impl(SampleRepository)
+    repo = SampleRepository()
+    for i in range(10):
+        repo.save(Sample(i, f"h{i % 3}", i * 1.5, i, ok=i % 2 == 0, note="x" if i == 7 else None))
+    return repo
+
+
+def test_fields_are_stored_in_columns(repo):
+    storage = repo._storage
+    assert isinstance(storage.by_name["value"].values, array)
+    assert storage.by_name["count"].values.typecode == "q"
+    assert isinstance(storage.by_name["host"].values, list)
+    assert repo.find_by_id(4) == Sample(4, "h1", 6.0, 4, ok=True)
+    assert repo.find_by_id(11) is None
+
+
+def test_queries_evaluate_columns(repo):
+    assert [s.id for s in repo.find_all_by_host_and_value_greater_than("h0", 4)] == [3, 6, 9]
+    assert [s.id for s in repo.find_all_by_count_between_or_note_starting_with((1, 2), "x")] == [1, 2, 7]
+    assert repo.find_first_by_host_order_by_value_desc("h2").id == 8
+    assert [s.id for s in repo.stream_by_host_in(["h1"])] == [1, 4, 7]
+    page = repo.find_all_by_ok_order_by_note(False, Pageable(page=0, size=2))
+    assert [s.id for s in page.content] == [7, 1]
+    assert page.total == 5
+
+
+def test_counts_and_aggregates_skip_entities(repo, monkeypatch):
+    def fail(row):
+        raise AssertionError("entity built")
+    monkeypatch.setattr(repo._storage, "entity", fail)
+
+    assert repo.count_by_host("h0") == 4
+    assert repo.sum_count_by_host("h0") == 18
+    assert repo.avg_value() == 6.75
+    assert repo.max_value_by_ok(True) == 12.0
+
+
+def test_distinct_projections_read_columns(repo, monkeypatch):
+    def fail(row):
+        raise AssertionError("entity built")
+    monkeypatch.setattr(repo._storage, "entity", fail)
+
+    assert repo.find_distinct_host_and_ok_by_value_greater_than(1) == [
+        ("h1", False), ("h2", True), ("h0", False), ("h1", True), ("h2", False), ("h0", True)
+    ]
+    assert repo.count_distinct_note() == 2
+
+
+def test_deleted_rows_are_reused(repo):
+    deleted = repo.delete_all_by_host("h0")
+
+    assert [s.id for s in deleted] == [0, 3, 6, 9]
+    assert repo.count_by_host("h0") == 0
+    assert repo.find_by_id(3) is None
+    repo.save(Sample(20, "h0", 1.0, 1))
+    assert len(repo._storage.alive) == 10
+    assert [s.id for s in repo.find_all_by_host_and_value_greater_than("h0", 0)] == [20]
+
+
+def test_bulk_methods(repo):
+    version = repo._storage.version
+    repo.save_all(Sample(i, "h9", 1.0, i) for i in range(10, 15))
+
+    assert repo._storage.version == version + 2
+    assert [s.id for s in repo.find_all_by_id_in([12, 3, 40, 3])] == [3, 12]
+    assert repo.exists_by_id(14) and not repo.exists_by_id(15)
+    assert [s.id for s in repo.delete_all_by_id_in([10, 11, 40])] == [10, 11]
+    assert repo.count_by_host("h9") == 3
+
+
+def test_rejected_values_leave_storage_unchanged(repo):
+    with pytest.raises(TypeError):
+        repo.save(Sample(30, "h0", None, 1))
+    with pytest.raises(TypeError):
+        repo.save(Sample(1, "h9", 1.0, None))
+
+    assert len(repo._storage.by_name["host"].values) == 10
+    assert repo.find_by_id(1) == Sample(1, "h1", 1.5, 1, ok=False)
+
+
+def test_reads_during_writes_match_one_version(repo):
+    rng = random.Random(2)
+
+    def write():
+        i = rng.randrange(40)
+        if rng.random() < 0.3:
+            repo.delete_by_id(i)
+        else:
+            value = rng.randrange(10) * 1.0
+            repo.save(Sample(i, f"h{rng.randrange(3)}", value, int(value)))
+
+    def read():
+        for sample in repo.find_all_by_host_and_value_greater_than("h1", 4):
+            assert sample.host == "h1" and sample.value > 4
+            assert sample.count == int(sample.value) or sample.id < 10
+        assert repo.count_by_host("h1") >= 0
+
+    errors = run_concurrently(write, write, read, read)
+
+    assert errors == []
+    storage = repo._storage
+    assert storage.version % 2 == 0
+    assert sorted(storage.rows.values()) == [row for row, alive in enumerate(storage.alive) if alive]
@@ -1,6 +1,10 @@
 import threading
 import pytest
+from dataclasses import dataclass
 from hippopytamus.core.app import HippoApp, ServerOptions
+from hippopytamus.core.container import HippoContainer
+from hippopytamus.data.page import Page
+from hippopytamus.protocol.http import HttpProtocol10
 from typing import Generator
 from .utils import get_free_port
 from .utils import TestClient
@@ -53,3 +57,19 @@ def test_404_path(client: TestClient):
 
     assert resp.code == 404
     assert "Not found" in resp.body
+
+
+@dataclass
+class Item:
+    id: int
+
+
+def test_generator_is_streamed_as_json_array():
+    container = HippoContainer()
+    resp = container.transform_response(Item(i) for i in range(3))
+
+    assert not isinstance(resp["body"], bytes)
+    assert HttpProtocol10().prepare_response(resp).endswith(b'\r\n\r\n[{"id": 0},{"id": 1},{"id": 2}]')
+    page = container.transform_response(Page([Item(1)], 0, 1, 5))
+    assert page["body"] == b'{"content": [{"id": 1}], "page": 0, "size": 1, "total": 5}'
+    assert container.transform_response(iter([]))["body"] is not None
@@ -0,0 +1,126 @@
+import datetime
+import json
+import os
+import time
+from hippopytamus.logger.logger import LogObject
+from hippopytamus.logger.json_printer import JsonLinesPrinter
+
+
+def record(text: str, *args, **context) -> LogObject:
+    return LogObject(
+            timestamp=datetime.datetime(2024, 5, 1, 12, 30, 15, 1234),
+            log_level="INFO",
+            class_source="app.Service",
+            method_source="handle",
+            line_source=42,
+            text=text,
+            text_args=args,
+            context=context,
+    )
+
+
+def read_lines(path) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_writes_json_lines(tmp_path):
+    path = tmp_path / "app.log"
+    printer = JsonLinesPrinter(str(path))
+
+    printer.print(record("user %s", "bob", status=200, obj=object()))
+    printer.close()
+
+    [line] = read_lines(path)
+    assert line["timestamp"] == "2024-05-01T12:30:15.001234"
+    assert line["level"] == "INFO"
+    assert line["class"] == "app.Service"
+    assert line["method"] == "handle"
+    assert line["line"] == 42
+    assert line["text"] == "user bob"
+    assert line["context"]["status"] == 200
+    assert line["context"]["obj"].startswith("<object")
+
+
+def test_timestamp_prefix_is_cached_per_second(tmp_path):
+    printer = JsonLinesPrinter(str(tmp_path / "app.log"))
+    base = datetime.datetime(2024, 5, 1, 12, 30, 15)
+
+    first = printer.format_timestamp(base.replace(microsecond=5))
+    cached = printer.cached_prefix
+    second = printer.format_timestamp(base.replace(microsecond=999999))
+    third = printer.format_timestamp(base + datetime.timedelta(seconds=1))
+
+    assert printer.cached_prefix != cached
+    assert first == "2024-05-01T12:30:15.000005"
+    assert second == "2024-05-01T12:30:15.999999"
+    assert third == "2024-05-01T12:30:16.000000"
+    printer.close()
+
+
+def test_rotates_by_size(tmp_path):
+    path = tmp_path / "app.log"
+    printer = JsonLinesPrinter(str(path), max_bytes=500, backup_count=2)
+
+    for i in range(30):
+        printer.print(record(f"message {i}"))
+    printer.close()
+
+    assert os.path.exists(f"{path}.1")
+    assert os.path.exists(f"{path}.2")
+    assert not os.path.exists(f"{path}.3")
+    assert os.path.getsize(path) <= 500 + 300
+    assert read_lines(path)[-1]["text"] == "message 29"
+
+
+def test_fsync_every_record(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+    printer = JsonLinesPrinter(str(tmp_path / "app.log"), fsync_interval=0)
+
+    printer.print(record("a"))
+    printer.print(record("b"))
+
+    assert len(synced) == 2
+    printer.close()
+
+
+def test_buffered_records_are_synced_on_a_timer(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd))
+    printer = JsonLinesPrinter(str(tmp_path / "app.log"), fsync_interval=0.05)
+
+    printer.print(record("a"))
+    printer.print(record("b"))
+    deadline = time.monotonic() + 5
+    while not synced and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(synced) == 1
+    assert [line["text"] for line in read_lines(tmp_path / "app.log")] == ["a", "b"]
+    printer.close()
+    assert not printer.thread.is_alive()
+
+
+def test_size_counts_encoded_bytes(tmp_path):
+    path = tmp_path / "app.log"
+    printer = JsonLinesPrinter(str(path))
+
+    printer.print(record("zażółć", city="Kraków"))
+    printer.flush()
+
+    assert printer.size == os.path.getsize(path)
+    printer.close()
+
+
+def test_records_after_close_are_dropped(tmp_path):
+    path = tmp_path / "app.log"
+    printer = JsonLinesPrinter(str(path))
+    printer.print(record("kept"))
+    printer.close()
+
+    printer.print(record("late"))
+    printer.flush()
+
+    assert printer.dropped == 1
+    assert [line["text"] for line in read_lines(path)] == ["kept"]
@@ -115,3 +115,88 @@ def test_disable_enable_for_class(test_printer, logger):
     factory.enable_for(Dummy)
     obj.action()
     assert len(test_printer.logged) == 5
+
+
+def test_global_level_filters_lower_levels(test_printer, logger):
+    obj = Dummy(logger)
+
+    factory = LoggerFactory.get_factory()
+    factory.set_level("WARN")
+    obj.action()
+
+    assert [log.log_level for log in test_printer.logged] == ["WARN", "ERROR"]
+
+
+def test_level_for_class_overrides_global(test_printer, logger):
+    factory = LoggerFactory.get_factory()
+    factory.set_level("ERROR")
+    factory.set_level_for(Dummy2, "DEBUG")
+
+    Dummy2().action()
+    Dummy(logger).action()
+
+    assert [log.log_level for log in test_printer.logged] == ["DEBUG", "ERROR"]
+
+
+def test_filtered_call_skips_frame_capture(test_printer, logger, monkeypatch):
+    import sys
+
+    def fail(*args):
+        raise AssertionError("frame captured")
+    LoggerFactory.get_factory().set_level("INFO")
+    monkeypatch.setattr(sys, "_getframe", fail)
+
+    logger.debug("hidden")
+
+    assert test_printer.logged == []
+
+
+def test_configure_from_env(test_printer):
+    factory = LoggerFactory.get_factory()
+    factory.configure_from_env({
+        "HIPPO_LOG_LEVEL": "info",
+        "HIPPO_LOG_DISABLE": "tests.test_logger.Dummy",
+        "HIPPO_LOG_LEVELS": "tests.test_logger.Dummy2=DEBUG",
+    })
+
+    Dummy(LoggerFactory.get_logger(for_cls=Dummy)).action()
+    Dummy2().action()
+
+    assert [log.log_level for log in test_printer.logged] == ["DEBUG"]
+
+
+def test_configure_from_file(test_printer, tmp_path, logger):
+    path = tmp_path / "log.json"
+    path.write_text('{"level": "ERROR"}')
+
+    LoggerFactory.get_factory().configure_from_file(str(path))
+    Dummy(logger).action()
+
+    assert [log.log_level for log in test_printer.logged] == ["ERROR"]
+
+
+@pytest.mark.parametrize(
+    "text,args,expected",
+    [
+        ("hello %s", ("world",), "hello world"),
+        ("%d items", (3,), "3 items"),
+        ("{} and {}", ("a", "b"), "a and b"),
+        ("plain", (), "plain"),
+        ("READ", (4,), "READ 4"),
+    ]
+)
+def test_log_object_message_formatting(text, args, expected):
+    obj = LogObject(text=text, text_args=args)
+
+    assert obj.message() == expected
+
+
+def test_arguments_are_not_formatted_until_printed(test_printer, logger):
+    class Exploding:
+        def __str__(self):
+            raise AssertionError("formatted")
+
+    logger.debug("value %s", Exploding())
+
+    assert len(test_printer.logged) == 1
+    assert test_printer.logged[0].text == "value %s"
@@ -0,0 +1,103 @@
+import json
+import pytest
+from hippopytamus.core.app import HippoApp, ServerOptions
+from hippopytamus.core.manifest import HippoManifest, ManifestError
+
+
+PACKAGE = "hippopytamus.example.example1"
+
+
+@pytest.fixture
+def manifest_path(tmp_path) -> str:
+    path = str(tmp_path / "manifest.json")
+    HippoManifest.build(PACKAGE).save(path)
+    return path
+
+
+def get(app: HippoApp, uri: str, headers=None):
+    return app.container.process_request({
+        "method": "GET",
+        "uri": uri,
+        "version": "HTTP/1.0",
+        "headers": headers or {},
+    })
+
+
+def test_manifest_lists_components(manifest_path):
+    manifest = HippoManifest.load(manifest_path)
+
+    classes = [cls.__name__ for cls, _ in manifest.components()]
+
+    assert "UserController" in classes
+    assert "HelloController" in classes
+    assert manifest.is_fresh(PACKAGE)
+
+
+def test_app_boots_from_manifest(manifest_path, monkeypatch):
+    def fail_scan(self, module_name):
+        raise AssertionError("package should not be scanned")
+    monkeypatch.setattr(HippoApp, "scan", fail_scan)
+
+    app = HippoApp(PACKAGE, ServerOptions(port=0, manifest=manifest_path))
+    resp = get(app, "/api/hello/7", headers={"X-Request-ID": "abc"})
+
+    assert resp["code"] == 200
+    assert b"Hello User#7!" in resp["body"]
+    assert b"abc" in resp["body"]
+
+
+def test_app_routes_from_manifest_match_scan(manifest_path):
+    scanned = HippoApp(PACKAGE, ServerOptions(port=0))
+    loaded = HippoApp(PACKAGE, ServerOptions(port=0, manifest=manifest_path))
+
+    for uri in ["/h2/shout/wow", "/h2/add?a=2&b=3", "/hello?name=Bob", "/missing"]:
+        assert get(loaded, uri) == get(scanned, uri)
+
+
+def test_stale_manifest_falls_back_to_scan(manifest_path):
+    manifest = HippoManifest.load(manifest_path)
+    manifest.data["fingerprint"]["deps.py"] = [0, 0]
+    manifest.save(manifest_path)
+
+    app = HippoApp(PACKAGE, ServerOptions(port=0, manifest=manifest_path))
+    resp = get(app, "/api/test")
+
+    assert resp["code"] == 200
+    assert len(app.container.components) == 5
+
+
+def test_missing_manifest_falls_back_to_scan(tmp_path):
+    path = str(tmp_path / "none.json")
+
+    app = HippoApp(PACKAGE, ServerOptions(port=0, manifest=path))
+
+    assert get(app, "/api/test")["code"] == 200
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data["components"][0].pop("class"),
+    lambda data: data["components"][1]["data"].pop("methods"),
+    lambda data: data.pop("exceptions"),
+    lambda data: data.update(components=None),
+])
+def test_malformed_manifest_falls_back_to_scan(manifest_path, damage):
+    manifest = HippoManifest.load(manifest_path)
+    damage(manifest.data)
+    manifest.save(manifest_path)
+
+    with pytest.raises(ManifestError):
+        loaded = HippoManifest.load(manifest_path)
+        loaded.components()
+        loaded.exceptions()
+    app = HippoApp(PACKAGE, ServerOptions(port=0, manifest=manifest_path))
+
+    assert get(app, "/api/test")["code"] == 200
+    assert len(app.container.components) == 5
+
+
+def test_manifest_must_be_an_object(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps([1, 2]))
+
+    with pytest.raises(ManifestError):
+        HippoManifest.load(str(path))
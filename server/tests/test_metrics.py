@@ -0,0 +1,208 @@
+import socket
+import time
+from typing import Iterator
+import pytest
+from hippopytamus.core.annotation import Controller, GetMapping
+from hippopytamus.core.app import HippoApp, ServerOptions
+from hippopytamus.core.container import HippoContainer
+from hippopytamus.monitoring.metrics import Histogram, HttpMetrics, LoopMetrics, MetricsRegistry
+from hippopytamus.protocol.http import HttpProtocol10
+from hippopytamus.server.nonblocking import SelectTCPServer, SimpleNonBlockingTCPServer
+from hippopytamus.server.observer import ObserverChain, ServerObserver
+
+
+def request(uri: str, method: str = "GET") -> dict:
+    return {"method": method, "uri": uri, "version": "HTTP/1.0", "headers": {}}
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram([0.1, 1.0])
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert list(histogram.counts) == [2, 1, 1]
+    samples = histogram.samples("latency")
+    assert samples == [
+        ("latency_bucket", 'le="0.1"', 2.0),
+        ("latency_bucket", 'le="1"', 3.0),
+        ("latency_bucket", 'le="+Inf"', 4.0),
+        ("latency_sum", "", 2.65),
+        ("latency_count", "", 4.0),
+    ]
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    requests.labels("/a").inc()
+    requests.labels("/a").inc()
+    requests.labels('/"b"').inc(3)
+    registry.gauge("open", "Open connections.").labels().set(2)
+
+    assert registry.render() == "\n".join([
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a"} 2',
+        'requests_total{route="/\\"b\\""} 3',
+        "# HELP open Open connections.",
+        "# TYPE open gauge",
+        "open 2",
+    ]) + "\n"
+
+
+def test_registry_returns_existing_family():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits", "Hits.")
+
+    assert registry.counter("hits", "Hits.") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("hits", "Hits.")
+    with pytest.raises(ValueError):
+        counter.labels("unexpected")
+
+
+def test_metrics_endpoint_reports_routes():
+    app = HippoApp("hippopytamus.example.example1", ServerOptions(port=0, metrics=True))
+
+    app.container.process_request(request("/api/test"))
+    app.container.process_request(request("/api/test"))
+    app.container.process_request(request("/missing"))
+    resp = app.container.process_request(request("/metrics"))
+
+    assert resp["code"] == 200
+    assert resp["headers"]["Content-Type"].startswith("text/plain")
+    text = resp["body"].decode("utf-8")
+    assert 'hippo_http_requests_total{route="/api/test",method="GET",status="200"} 2' in text
+    assert 'hippo_http_requests_total{route="unmatched",method="GET",status="404"} 1' in text
+    assert 'hippo_http_request_duration_seconds_count{route="/api/test",method="GET"} 2' in text
+
+
+def test_unknown_methods_share_one_label():
+    registry = MetricsRegistry()
+    metrics = HttpMetrics(registry)
+
+    for i in range(100):
+        metrics.request_finished({"method": f"VERB{i}", "route": "/a"}, {"code": 200}, 0.001, 0)
+    metrics.request_finished({"method": "POST", "route": "/a"}, {"code": 200}, 0.001, 0)
+
+    assert set(metrics.requests.children) == {("/a", "other", 200), ("/a", "POST", 200)}
+    assert set(metrics.latency.children) == {("/a", "other"), ("/a", "POST")}
+
+
+def test_server_reports_parse_errors():
+    registry = MetricsRegistry()
+    metrics = HttpMetrics(registry)
+    server = SelectTCPServer(HttpProtocol10(), None)  # type: ignore[arg-type]
+    server.add_observer(metrics)
+    conn, peer = socket.socketpair()
+    server.connections.append(conn)
+    server.state.append({"context": {}, "data": b"garbage\r\n\r\n", "read": False})
+    metrics.connection_opened()
+
+    server.process(conn, server.state[0])
+    peer.close()
+
+    assert metrics.parse_errors.value == 1
+    assert metrics.open_connections.value == 0
+    assert server.connections == []
+
+
+@Controller
+class StreamController:
+    @GetMapping("/items")
+    def items(self) -> Iterator[dict]:
+        return ({"id": i} for i in range(2))
+
+    @GetMapping("/broken")
+    def broken(self) -> Iterator[dict]:
+        yield {"id": 0}
+        raise ValueError("query failed")
+
+
+def test_lazy_bodies_are_encoded_before_listeners():
+    registry = MetricsRegistry()
+    metrics = HttpMetrics(registry)
+    container = HippoContainer()
+    container.register(StreamController)
+    container.add_request_listener(metrics)
+
+    resp = container.process_request(request("/items"))
+    broken = container.process_request(request("/broken"))
+
+    assert resp["body"] == b'[{"id": 0},{"id": 1}]'
+    assert metrics.response_bytes.labels("/items").value == len(resp["body"])
+    assert broken["code"] == 500
+    assert metrics.requests.labels("/broken", "GET", 500).value == 1
+
+
+def test_failed_response_closes_only_its_connection():
+    class BrokenServlet:
+        def process_request(self, request):
+            return {"code": 200, "body": iter([b"ok", None])}
+    server = SelectTCPServer(HttpProtocol10(), BrokenServlet())  # type: ignore[arg-type]
+    conn, peer = socket.socketpair()
+    server.connections.append(conn)
+    server.state.append({"context": {}, "data": b"GET / HTTP/1.0\r\n\r\n", "read": False})
+
+    server.process(conn, server.state[0])
+
+    assert server.connections == []
+    assert peer.recv(1024) == b""
+    peer.close()
+
+
+def test_observers_are_chained():
+    class Recorder(ServerObserver):
+        def __init__(self):
+            self.received = 0
+
+        def bytes_received(self, count: int) -> None:
+            self.received += count
+
+    server = SelectTCPServer(HttpProtocol10(), None)  # type: ignore[arg-type]
+    first, second = Recorder(), Recorder()
+    server.add_observer(first)
+    server.add_observer(second)
+
+    assert isinstance(server.observer, ObserverChain)
+    server.observer.bytes_received(10)
+    assert first.received == second.received == 10
+
+
+def test_loop_metrics_split_blocked_and_busy_time():
+    metrics = LoopMetrics(MetricsRegistry())
+
+    metrics.loop_waiting()
+    time.sleep(0.01)
+    metrics.loop_woke(3)
+    metrics.connection_opened()
+    metrics.connection_opened()
+    metrics.bytes_received(100)
+    metrics.loop_waiting()
+
+    assert metrics.blocked.count == 1
+    assert metrics.blocked.sum >= 0.01
+    assert metrics.busy.count == 1
+    assert metrics.busy.sum < metrics.blocked.sum
+    assert metrics.events.sum == 3
+    assert metrics.accepts.sum == 2
+    assert metrics.recv_bytes.sum == 100
+
+
+def test_busy_polling_counts_idle_reads():
+    metrics = LoopMetrics(MetricsRegistry())
+    server = SimpleNonBlockingTCPServer(HttpProtocol10(), None)  # type: ignore[arg-type]
+    server.add_observer(metrics)
+    conn, peer = socket.socketpair()
+    conn.setblocking(False)
+    entry = {"connection": conn, "context": {}, "data": b"", "read": False}
+
+    assert not server.read(entry, 0, [])
+    peer.sendall(b"abc")
+    assert server.read(entry, 0, [])
+    conn.close()
+    peer.close()
+
+    assert metrics.idle_reads.value == 1
+    assert metrics.recv_bytes.count == 1
@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from hippopytamus.core.app import HippoApp, ServerOptions
+from hippopytamus.monitoring import tracing
+from hippopytamus.monitoring.profiler import RequestProfiler
+
+
+TOKEN = {"X-Admin-Token": "secret"}
+
+
+def request(uri: str, headers: dict = TOKEN, method: str = "GET") -> dict:
+    return {"method": method, "uri": uri, "version": "HTTP/1.0", "headers": headers}
+
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def wait_until_done(profiler: RequestProfiler) -> None:
+    deadline = time.monotonic() + 5
+    while profiler.status()["state"] != "done" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_sampling_collects_collapsed_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="worker")
+    worker.start()
+    profiler = RequestProfiler()
+    try:
+        profiler.start("sample", seconds=0.2, interval=0.001)
+        wait_until_done(profiler)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.status()["samples"] > 0
+    lines = profiler.collapsed().splitlines()
+    assert any(
+        line.startswith("worker;") and "test_profiler:busy_loop" in line
+        for line in lines
+    )
+    assert not tracing.enabled()
+
+
+def test_profiler_rejects_second_session():
+    profiler = RequestProfiler()
+    profiler.start("sample", seconds=5)
+    try:
+        with pytest.raises(ValueError):
+            profiler.start("sample")
+    finally:
+        profiler.stop()
+    with pytest.raises(ValueError):
+        profiler.start("flame")
+
+
+def test_sampling_interval_is_positive_and_clamped():
+    profiler = RequestProfiler()
+    with pytest.raises(ValueError):
+        profiler.start("sample", interval=0)
+    profiler.start("sample", seconds=5, interval=0.00001)
+    try:
+        assert profiler.interval == 0.001
+    finally:
+        profiler.stop()
+
+    opt = ServerOptions(port=0, profiler=True, admin_token="secret")
+    app = HippoApp("hippopytamus.example.example1", opt)
+    response = app.container.process_request(
+            request("/admin/profiler/start?interval=0", method="POST"))
+    assert response["code"] == 400
+    assert app.profiler_session.state == "idle"
+
+
+def test_cprofile_next_requests():
+    opt = ServerOptions(port=0, profiler=True, admin_token="secret")
+    app = HippoApp("hippopytamus.example.example1", opt)
+    container = app.container
+
+    status = container.process_request(
+            request("/admin/profiler/start?mode=cprofile&requests=2", method="POST"))
+    assert status["code"] == 200
+    running = container.process_request(request("/admin/profiler/result"))
+    container.process_request(request("/api/test"))
+    container.process_request(request("/api/test"))
+    result = container.process_request(request("/admin/profiler/result"))
+
+    assert b'"state": "running"' in running["body"]
+    assert result["code"] == 200
+    assert "deps.py" in app.profiler_session.pstats(limit=1000)
+    assert b"do_process_request" in result["body"]
+    assert app.profiler_session.requests == 2
+    assert not tracing.enabled()
+
+
+def test_admin_token_is_required():
+    opt = ServerOptions(port=0, profiler=True, admin_token="secret")
+    app = HippoApp("hippopytamus.example.example1", opt)
+
+    denied = app.container.process_request(request("/admin/profiler/stop", {}, "POST"))
+    wrong = app.container.process_request(
+            request("/admin/profiler/stop", {"X-Admin-Token": "guess"}, "POST"))
+    allowed = app.container.process_request(request("/admin/profiler/stop", method="POST"))
+
+    assert denied["code"] == 403
+    assert wrong["code"] == 403
+    assert allowed["code"] == 200
+
+
+def test_endpoints_refuse_calls_without_configured_token():
+    app = HippoApp("hippopytamus.example.example1", ServerOptions(port=0, profiler=True))
+
+    started = app.container.process_request(
+            request("/admin/profiler/start", {"X-Admin-Token": ""}, "POST"))
+    result = app.container.process_request(request("/admin/profiler/result", {}))
+
+    assert started["code"] == 403
+    assert result["code"] == 403
+    assert app.profiler_session.state == "idle"
+
+
+def test_start_and_stop_are_post_only():
+    opt = ServerOptions(port=0, profiler=True, admin_token="secret")
+    app = HippoApp("hippopytamus.example.example1", opt)
+
+    response = app.container.process_request(request("/admin/profiler/start"))
+
+    assert response["code"] != 200
+    assert app.profiler_session.state == "idle"
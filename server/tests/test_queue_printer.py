@@ -0,0 +1,143 @@
+import io
+import threading
+import time
+import pytest
+from hippopytamus.logger.logger import LogObject
+from hippopytamus.logger.queue_printer import QueueLogPrinter
+
+
+class SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writes = 0
+
+    def write(self, s):
+        self.release.wait(5)
+        self.writes += 1
+        return super().write(s)
+
+
+def record(text: str) -> LogObject:
+    return LogObject(log_level="INFO", text=text)
+
+
+def test_records_are_written_in_order():
+    stream = io.StringIO()
+    printer = QueueLogPrinter(stream, formatter=lambda o: o.message(), flush_on_shutdown=False)
+
+    for i in range(100):
+        printer.print(record(f"line {i}"))
+    printer.flush()
+
+    assert stream.getvalue().splitlines() == [f"line {i}" for i in range(100)]
+    printer.close()
+
+
+def test_records_are_batched():
+    stream = SlowStream()
+    printer = QueueLogPrinter(stream, formatter=lambda o: o.message(), flush_on_shutdown=False)
+
+    for i in range(50):
+        printer.print(record(f"line {i}"))
+    stream.release.set()
+    printer.flush()
+
+    assert len(stream.getvalue().splitlines()) == 50
+    assert stream.writes < 50
+    printer.close()
+
+
+def test_overflow_drops_and_counts():
+    stream = SlowStream()
+    printer = QueueLogPrinter(
+            stream, formatter=lambda o: o.message(),
+            maxsize=5, batch_size=1, flush_on_shutdown=False
+    )
+
+    for i in range(50):
+        printer.print(record(f"line {i}"))
+
+    assert printer.dropped > 0
+    stream.release.set()
+    printer.flush()
+    printer.print(record("after"))
+    printer.flush()
+    assert "log records dropped" in stream.getvalue()
+    printer.close()
+
+
+def test_close_flushes_pending_records():
+    stream = io.StringIO()
+    printer = QueueLogPrinter(stream, formatter=lambda o: o.message(), flush_on_shutdown=False)
+
+    printer.print(record("last words"))
+    printer.close()
+
+    assert "last words" in stream.getvalue()
+
+
+def test_blocking_print_after_close_is_dropped():
+    stream = io.StringIO()
+    printer = QueueLogPrinter(
+            stream, formatter=lambda o: o.message(), maxsize=1,
+            overflow="block", flush_on_shutdown=False)
+    printer.close()
+
+    printed = threading.Thread(target=lambda: [printer.print(record(f"late {i}")) for i in range(3)])
+    printed.start()
+    printed.join(timeout=2)
+
+    assert not printed.is_alive()
+    assert printer.dropped == 3
+    assert stream.getvalue() == ""
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_blocking_print_gives_up_when_writer_is_gone():
+    def fail(obj):
+        raise SystemExit()
+    printer = QueueLogPrinter(
+            io.StringIO(), formatter=fail, maxsize=1,
+            overflow="block", flush_on_shutdown=False)
+    printer.print(record("kills the writer"))
+    printer.thread.join(timeout=2)
+
+    printed = threading.Thread(target=lambda: [printer.print(record(f"late {i}")) for i in range(2)])
+    printed.start()
+    printed.join(timeout=2)
+    printer.close()
+
+    assert not printed.is_alive()
+    assert printer.dropped == 1
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_flush_returns_when_writer_is_gone():
+    def fail(obj):
+        raise SystemExit()
+    printer = QueueLogPrinter(io.StringIO(), formatter=fail, flush_on_shutdown=False)
+    printer.print(record("kills the writer"))
+    printer.thread.join(timeout=2)
+    printer.print(record("never written"))
+
+    flushed = threading.Thread(target=printer.flush)
+    flushed.start()
+    flushed.join(timeout=2)
+
+    assert not flushed.is_alive()
+    assert printer.queue.unfinished_tasks == 1
+    printer.close()
+
+
+def test_flush_gives_up_after_timeout():
+    stream = SlowStream()
+    printer = QueueLogPrinter(stream, formatter=lambda o: o.message(), flush_on_shutdown=False)
+    printer.print(record("slow"))
+
+    started = time.monotonic()
+    printer.flush(timeout=0.1)
+
+    assert time.monotonic() - started < 2
+    stream.release.set()
+    printer.close()
@@ -101,3 +101,123 @@ def test_parse_find_all():
     assert parsed.distinct is False
     assert parsed.all is True
     assert parsed.fields == []
+
+
+def test_tokenize_comparison_operators():
+    tokens = tokenize_method("find_by_age_greater_than_and_name_starting_with")
+    assert tokens == [
+        Token.FIND, Token.BY,
+        (Token.FIELD, "age"), Token.GREATER_THAN, Token.AND,
+        (Token.FIELD, "name"), Token.STARTING_WITH
+    ]
+
+
+def test_operator_words_inside_field_names():
+    tokens = tokenize_method("find_by_first_name_and_order_id")
+    assert tokens == [
+        Token.FIND, Token.BY,
+        (Token.FIELD, "first_name"), Token.AND, (Token.FIELD, "order_id")
+    ]
+
+
+def test_parse_operators_order_and_limit():
+    tokens = tokenize_method("find_all_by_age_between_or_status_in_order_by_age_desc_and_name_limit_5")
+    parsed = TokenParser(tokens).parse()
+    assert parsed.fields == [('age', 'or'), ('status', '')]
+    assert parsed.operators == ['between', 'in']
+    assert parsed.order == [('age', 'desc'), ('name', 'asc')]
+    assert parsed.limit == 5
+    assert parsed.all is True
+
+
+def test_parse_first_and_top():
+    first = TokenParser(tokenize_method("find_first_by_name_order_by_age")).parse()
+    top = TokenParser(tokenize_method("find_top_3_order_by_age_desc")).parse()
+    assert first.limit == 1
+    assert first.all is False
+    assert top.limit == 3
+    assert top.all is True
+    assert top.fields == []
+    assert top.order == [('age', 'desc')]
+
+
+def test_parse_limit_argument():
+    parsed = TokenParser(tokenize_method("find_all_by_name_limit")).parse()
+    assert parsed.fields == [('name', '')]
+    assert parsed.limit_arg is True
+
+
+def test_parser_rejects_missing_order_field():
+    tokens = tokenize_method("find_all_order_by")
+    thrown = False
+    try:
+        TokenParser(tokens).parse()
+    except MethodParseError:
+        thrown = True
+    assert thrown
+
+
+def test_parse_stream():
+    parsed = TokenParser(tokenize_method("stream_by_stream_order_by_age")).parse()
+    assert parsed.action == "stream"
+    assert parsed.all is True
+    assert parsed.fields == [('stream', '')]
+    assert parsed.order == [('age', 'asc')]
+
+
+def test_parse_aggregates():
+    parsed = TokenParser(tokenize_method("sum_total_posts_by_name")).parse()
+    assert parsed.action == "sum"
+    assert parsed.aggregate == "total_posts"
+    assert parsed.fields == [('name', '')]
+
+    parsed = TokenParser(tokenize_method("max_age")).parse()
+    assert (parsed.action, parsed.aggregate, parsed.fields) == ("max", "age", [])
+
+    parsed = TokenParser(tokenize_method("find_by_max_age")).parse()
+    assert parsed.fields == [('max_age', '')]
+
+
+def test_parse_aggregate_requires_field():
+    thrown = False
+    try:
+        TokenParser(tokenize_method("avg_by_name")).parse()
+    except MethodParseError:
+        thrown = True
+    assert thrown
+
+
+def test_action_words_inside_field_names():
+    parsed = TokenParser(tokenize_method("count_by_count_and_save_count")).parse()
+    assert parsed.action == "count"
+    assert parsed.fields == [('count', 'and'), ('save_count', '')]
+
+
+def test_parse_bulk_methods():
+    save_all = TokenParser(tokenize_method("save_all")).parse()
+    assert (save_all.action, save_all.all) == ("save", True)
+
+    exists = TokenParser(tokenize_method("exists_by_name_and_exists")).parse()
+    assert (exists.action, exists.all) == ("exists", False)
+    assert exists.fields == [('name', 'and'), ('exists', '')]
+
+    delete = TokenParser(tokenize_method("delete_all_by_name_in")).parse()
+    assert (delete.action, delete.all, delete.operators) == ("delete", True, ["in"])
+
+
+def test_parse_distinct_projection():
+    parsed = TokenParser(tokenize_method("find_distinct_name_and_age_by_age_greater_than")).parse()
+    assert parsed.projection == ["name", "age"]
+    assert parsed.fields == [('age', '')]
+    assert parsed.all is True
+
+    first = TokenParser(tokenize_method("find_first_distinct_name_order_by_age")).parse()
+    assert (first.projection, first.all, first.limit) == (["name"], False, 1)
+    assert TokenParser(tokenize_method("find_distinct_by_name")).parse().projection == []
+
+    thrown = False
+    try:
+        TokenParser(tokenize_method("delete_distinct_name_by_age")).parse()
+    except MethodParseError:
+        thrown = True
+    assert thrown
@@ -0,0 +1,201 @@
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Iterator, Optional
+import pytest
+from hippopytamus.data.page import Page, Pageable
+from hippopytamus.data.repository import HippoRepository
+from hippopytamus.data.repo_creator import HippoRepositoryCreator
+from hippopytamus.data.sqlite import SqliteStorage
+from hippopytamus.data.storage import StorageError
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    posts: Optional[int]
+    active: bool = True
+    tags: Optional[list] = None
+
+
+def make_repo(path: str):
+    class UserRepository(HippoRepository[User, int]):
+        _storage = SqliteStorage(path)
+
+        def find_all_by_name_and_posts(self, name: str, posts: int) -> list[User]:
+            pass
+
+        def find_all_by_name_or_posts_greater_than(self, name: str, posts: int) -> list[User]:
+            pass
+
+        def find_first_by_name_starting_with_order_by_posts_desc(self, prefix: str) -> User:
+            pass
+
+        def find_all_by_posts_between_order_by_name(self, low_high: tuple) -> list[User]:
+            pass
+
+        def find_all_by_name_in(self, names: list) -> list[User]:
+            pass
+
+        def find_all_order_by_posts(self, pageable: Pageable) -> Page[User]:
+            pass
+
+        def stream_by_active(self, active: bool) -> Iterator[User]:
+            pass
+
+        def count_by_name(self, name: str) -> int:
+            pass
+
+        def delete_all_by_name(self, name: str) -> list[User]:
+            pass
+
+        def sum_posts_by_name(self, name: str) -> int:
+            pass
+
+        def max_posts(self) -> int:
+            pass
+
+        def find_distinct_name_and_active_order_by_name(self) -> list[tuple]:
+            pass
+
+        def find_distinct_tags_by_active(self, active: bool) -> list:
+            pass
+
+        def count_distinct_name(self) -> int:
+            pass
+
+    HippoRepositoryCreator().create_repo_impl(UserRepository)
+    repo = UserRepository()
+    users = (
+        User(1, "Alice", 10, tags=["a"]),
+        User(2, "Alice", 8),
+        User(3, "Bob", 10, active=False),
+        User(4, "Alicia", None),
+    )
+    for user in users:
+        repo.save(user)
+    return repo
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = make_repo(str(tmp_path / "app.db"))
+    yield repo
+    repo._storage.close()
+
+
+def test_table_and_indexes_are_created(repo):
+    conn = repo._storage.connection()
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(\"User\")")}
+
+    assert {"User_name", "User_posts", "User_active"} <= indexes
+    assert repo.find_by_id(1) == User(1, "Alice", 10, tags=["a"])
+    assert repo.find_by_id(3).active is False
+    assert repo.find_by_id(5) is None
+
+
+def test_derived_queries(repo):
+    assert [u.id for u in repo.find_all_by_name_and_posts("Alice", 8)] == [2]
+    assert sorted(u.id for u in repo.find_all_by_name_or_posts_greater_than("Bob", 9)) == [1, 3]
+    assert repo.find_first_by_name_starting_with_order_by_posts_desc("Ali").id == 1
+    assert [u.name for u in repo.find_all_by_posts_between_order_by_name((8, 10))] == ["Alice", "Alice", "Bob"]
+    assert sorted(u.id for u in repo.find_all_by_name_in(["Bob", "Alicia"])) == [3, 4]
+    assert [u.id for u in repo.stream_by_active(False)] == [3]
+    assert repo.count_by_name("Alice") == 2
+    assert repo.count_by_name("Carol") == 0
+    assert repo.sum_posts_by_name("Alice") == 18
+    assert repo.sum_posts_by_name("Carol") == 0
+    assert repo.max_posts() == 10
+
+
+def test_distinct_projections(repo):
+    assert repo.find_distinct_name_and_active_order_by_name() == [
+        ("Alice", True), ("Alicia", True), ("Bob", False)
+    ]
+    assert repo.find_distinct_tags_by_active(True) == [["a"], None]
+    assert repo.count_distinct_name() == 3
+
+
+def test_pages_put_nulls_last(repo):
+    page = repo.find_all_order_by_posts(Pageable(page=1, size=3))
+
+    assert [u.id for u in page.content] == [4]
+    assert page.total == 4
+
+
+def test_delete_returns_entities(repo):
+    deleted = repo.delete_all_by_name("Alice")
+
+    assert sorted(u.id for u in deleted) == [1, 2]
+    assert repo.count_by_name("Alice") == 0
+    repo.delete_by_id(3)
+    assert [u.id for u in repo.find_all()] == [4]
+
+
+def test_bulk_methods(repo):
+    saved = repo.save_all(User(i, f"user{i}", i) for i in range(10, 20))
+
+    assert len(saved) == 10
+    assert [u.id for u in repo.find_all_by_id_in([12, 3, 40])] == [3, 12]
+    assert repo.exists_by_id(19) and not repo.exists_by_id(20)
+    assert sorted(u.id for u in repo.delete_all_by_id_in([1, 2, 15])) == [1, 2, 15]
+    assert repo.count_by_name("Alice") == 0
+
+
+def test_save_all_is_one_transaction(repo):
+    with pytest.raises(sqlite3.ProgrammingError):
+        repo.save_all([User(10, "Dan", 1), User(11, "Eve", object())])
+
+    assert repo.find_by_id(10) is None
+
+
+def test_data_survives_reopening(tmp_path):
+    path = str(tmp_path / "app.db")
+    make_repo(path)._storage.close()
+
+    repo = make_repo(path)
+
+    assert len(repo.find_all()) == 4
+    repo._storage.close()
+
+
+def test_connection_per_thread(repo):
+    found = []
+    worker = threading.Thread(target=lambda: found.append(repo.find_by_id(2)))
+    worker.start()
+    worker.join()
+
+    assert found == [User(2, "Alice", 8)]
+    assert repo.find_by_id(2) == found[0]
+    assert list(repo._storage.connections) == [threading.get_ident()]
+
+
+def test_connection_is_closed_when_its_thread_ends(repo):
+    opened = []
+
+    def query():
+        repo.find_by_id(2)
+        opened.append(repo._storage.connection())
+    worker = threading.Thread(target=query)
+    worker.start()
+    worker.join()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        opened[0].execute("SELECT 1")
+    assert repo.find_by_id(2) == User(2, "Alice", 8)
+
+
+def test_in_memory_database():
+    repo = make_repo(":memory:")
+
+    assert repo.count_by_name("Alice") == 2
+    repo._storage.close()
+
+
+def test_repository_needs_entity_type():
+    class UntypedRepository(HippoRepository):
+        _storage = SqliteStorage(":memory:")
+
+    with pytest.raises(StorageError):
+        HippoRepositoryCreator().create_repo_impl(UntypedRepository)
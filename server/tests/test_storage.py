@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+import pytest
+from dataclasses import dataclass
+from hippopytamus.data.repository import HippoRepository
+from hippopytamus.data.repo_creator import HippoRepositoryCreator
+from hippopytamus.data.storage import HEADER, LogStorage
+from hippopytamus.data.store import IndexedStore
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+
+
+def open_store(path: str, **kwargs) -> IndexedStore:
+    kwargs.setdefault("fsync_interval", None)
+    return IndexedStore(["name"], backend=LogStorage(path, **kwargs))
+
+
+def test_log_is_replayed(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = open_store(path)
+    store[1] = User(1, "Alice")
+    store[2] = User(2, "Bob")
+    store[1] = User(1, "Alicia")
+    del store[2]
+    store.backend.close()
+
+    store = open_store(path)
+
+    assert store.entities == {1: User(1, "Alicia")}
+    assert list(store.lookup("name", "Alicia")) == [1]
+    assert store.backend.records == 4
+    store.backend.close()
+
+
+def test_batches_are_written_at_once(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = open_store(path)
+    writes = []
+    write = store.backend.file.write
+    store.backend.file.write = lambda data: writes.append(data) or write(data)
+
+    store.put_all({i: User(i, f"user{i}") for i in range(5)})
+    store.remove_all([0, 1, 7])
+    store.backend.close()
+
+    assert len(writes) == 2
+    store = open_store(path)
+    assert sorted(store.entities) == [2, 3, 4]
+    assert store.backend.records == 7
+    store.backend.close()
+
+
+def test_failed_backend_write_is_not_published(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = open_store(path)
+    store[1] = User(1, "Alice")
+    unpicklable = User(2, lambda: None)
+
+    with pytest.raises(Exception):
+        store[2] = unpicklable
+    with pytest.raises(Exception):
+        store.put_all({3: User(3, "Carol"), 2: unpicklable})
+    store.backend.file.close()
+    with pytest.raises(Exception):
+        store.remove(1)
+
+    assert sorted(store.entities) == [1]
+    assert not store.lookup("name", "Carol")
+    store.backend.file = None
+    store = open_store(path)
+    assert store.entities == {1: User(1, "Alice")}
+    store.backend.close()
+
+
+def test_torn_record_is_dropped(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = open_store(path)
+    store[1] = User(1, "Alice")
+    store[2] = User(2, "Bob")
+    store.backend.close()
+    size = os.path.getsize(path)
+    with open(path, "r+b") as log:
+        log.truncate(size - 3)
+
+    store = open_store(path)
+    store[3] = User(3, "Carol")
+    store.backend.close()
+
+    assert set(open_store(path).entities) == {1, 3}
+
+
+def test_corrupt_record_ends_replay(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = open_store(path)
+    store[1] = User(1, "Alice")
+    store[2] = User(2, "Bob")
+    store.backend.close()
+    with open(path, "r+b") as log:
+        log.seek(HEADER.size)
+        log.write(b"X")
+
+    store = open_store(path)
+
+    assert store.entities == {}
+    assert os.path.getsize(path) == 0
+    store.backend.close()
+
+
+def test_compaction_writes_snapshot(tmp_path):
+    path = str(tmp_path / "users.log")
+    store = open_store(path, compact_min_records=10, compaction_interval=0.01)
+    for i in range(20):
+        store[i % 3] = User(i % 3, f"user{i}")
+    del store[2]
+
+    store.backend.maybe_compact()
+
+    assert store.backend.compactions == 1
+    assert os.path.getsize(path) == 0
+    store[5] = User(5, "Eve")
+    store.backend.close()
+    store = open_store(path)
+    assert store.entities == {0: User(0, "user18"), 1: User(1, "user19"), 5: User(5, "Eve")}
+    store.backend.close()
+
+
+def test_writes_continue_during_compaction(tmp_path, monkeypatch):
+    path = str(tmp_path / "users.log")
+    store = open_store(path)
+    for i in range(10):
+        store[i % 2] = User(i % 2, f"user{i}")
+    fsync = os.fsync
+    writers = []
+    blocked = []
+
+    def fsync_and_write(fd):
+        # the first fsync is the new snapshot's, before the log switch
+        if not writers:
+            writer = threading.Thread(target=store.__setitem__, args=(7, User(7, "Zed")))
+            writers.append(writer)
+            writer.start()
+            writer.join(timeout=2)
+            blocked.append(writer.is_alive())
+        fsync(fd)
+    monkeypatch.setattr(os, "fsync", fsync_and_write)
+
+    store.backend.compact()
+
+    assert blocked == [False]
+    assert store.backend.records == 1
+    store.backend.close()
+    store = open_store(path)
+    assert store.entities == {0: User(0, "user8"), 1: User(1, "user9"), 7: User(7, "Zed")}
+    store.backend.close()
+
+
+def test_background_thread_syncs_and_compacts(tmp_path):
+    path = str(tmp_path / "users.log")
+    backend = LogStorage(path, fsync_interval=0.005, compact_min_records=5, compaction_interval=0.01)
+    store = IndexedStore(backend=backend)
+    for i in range(10):
+        store[1] = User(1, str(i))
+
+    time.sleep(0.1)
+
+    assert backend.compactions >= 1
+    assert not backend.dirty
+    backend.close()
+
+
+def test_repository_uses_storage_backend(tmp_path):
+    class UserRepository(HippoRepository):
+        _storage = LogStorage(str(tmp_path / "users.log"), fsync_interval=0)
+
+        def find_by_name(self, name: str) -> User:
+            pass
+
+    HippoRepositoryCreator().create_repo_impl(UserRepository)
+    repo = UserRepository()
+    repo.save(User(1, "Alice"))
+    repo.delete_by_id(1)
+    repo.save(User(2, "Bob"))
+    UserRepository._storage.close()
+
+    repo = UserRepository()
+    assert repo.find_by_name("Bob") == User(2, "Bob")
+    assert repo.find_by_id(1) is None
+    UserRepository._storage.close()
+
+
+def test_compact_repository_persists_entities(tmp_path):
+    class UserRepository(HippoRepository[User, int]):
+        _storage = LogStorage(str(tmp_path / "users.log"), fsync_interval=None)
+        _compact = True
+
+    HippoRepositoryCreator().create_repo_impl(UserRepository)
+    repo = UserRepository()
+    repo.save_all([User(1, "Alice"), User(2, "Bob")])
+    UserRepository._storage.compact()
+    repo.save(User(3, "Carol"))
+    UserRepository._storage.close()
+
+    repo = UserRepository()
+    assert repo.find_all_by_id_in([1, 3]) == [User(1, "Alice"), User(3, "Carol")]
+    assert not isinstance(repo._store.entities[2], User)
+    UserRepository._storage.close()
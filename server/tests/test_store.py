@@ -0,0 +1,516 @@
+import random
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Iterator
+from hippopytamus.data.repository import HippoRepository
+from hippopytamus.data.repo_creator import HippoRepositoryCreator, unique
+from hippopytamus.data.page import Page, Pageable
+from hippopytamus.data.records import RecordType
+from hippopytamus.data.repo_predicate import RepoPredicate
+from hippopytamus.data.store import IndexedStore
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    posts: int
+
+
+def test_index_follows_writes():
+    store = IndexedStore(["name"])
+    store[1] = User(1, "Alice", 1)
+    store[2] = User(2, "Alice", 2)
+    store[3] = User(3, "Bob", 3)
+
+    assert list(store.lookup("name", "Alice")) == [1, 2]
+
+    store[2] = User(2, "Bob", 2)
+    del store[1]
+
+    assert store.lookup("name", "Alice") == {}
+    assert list(store.lookup("name", "Bob")) == [3, 2]
+    assert "Alice" not in store.indexes["name"]
+
+
+def test_lookup_by_id_and_unindexed_fields():
+    store = IndexedStore(["name"])
+    store[1] = User(1, "Alice", 1)
+
+    assert store.lookup("id", 1) == {1: None}
+    assert store.lookup("id", 2) == {}
+    assert store.lookup("posts", 1) is None
+    assert store.lookup("name", ["unhashable"]) is None
+
+
+def test_add_index_builds_from_existing_entities():
+    store = IndexedStore()
+    store[1] = User(1, "Alice", 1)
+
+    store.add_index("posts")
+
+    assert store.lookup("posts", 1) == {1: None}
+
+
+class UserRepository(HippoRepository):
+    def find_all_by_name_and_posts(self, name: str, posts: int) -> list[User]:
+        pass
+
+    def find_all_by_name_or_posts(self, name: str, posts: int) -> list[User]:
+        pass
+
+    def count_by_name(self, name: str) -> int:
+        pass
+
+    def delete_all_by_name(self, name: str) -> None:
+        pass
+
+
+def make_repo() -> UserRepository:
+    HippoRepositoryCreator().create_repo_impl(UserRepository)
+    repo = UserRepository()
+    for user in (User(1, "Alice", 10), User(2, "Alice", 8), User(3, "Bob", 10), User(4, "Carol", 5)):
+        repo.save(user)
+    return repo
+
+
+def test_repository_indexes_referenced_fields():
+    repo = make_repo()
+
+    assert set(repo._store.indexes) == {"name", "posts"}
+    assert [u.id for u in repo.find_all_by_name_and_posts("Alice", 10)] == [1]
+    assert [u.id for u in repo.find_all_by_name_or_posts("Alice", 10)] == [1, 2, 3]
+    assert repo.count_by_name("Alice") == 2
+
+
+def test_repository_delete_updates_indexes():
+    repo = make_repo()
+
+    repo.delete_all_by_name("Alice")
+
+    assert repo.find_all_by_name_or_posts("Alice", 8) == []
+    assert [u.id for u in repo.find_all_by_name_or_posts("Bob", 5)] == [3, 4]
+    assert repo._store.lookup("posts", 8) == {}
+
+
+def test_stale_index_entries_are_filtered():
+    repo = make_repo()
+    alice = repo.find_by_id(1)
+
+    alice.name = "Alicia"
+
+    assert [u.id for u in repo.find_all_by_name_and_posts("Alice", 10)] == []
+    repo.save(alice)
+    assert repo.count_by_name("Alicia") == 1
+
+
+def test_sorted_index_ranges():
+    store = IndexedStore(sorted_fields=["posts", "name"])
+    for user in (User(1, "Alice", 10), User(2, "Bob", 5), User(3, "Alicia", 7), User(4, "Carol", None)):
+        store[user.id] = user
+
+    assert list(store.lookup_op("posts", "greater_than", 5)) == [3, 1]
+    assert list(store.lookup_op("posts", "less_than", 10)) == [2, 3]
+    assert list(store.lookup_op("posts", "between", (5, 7))) == [2, 3]
+    assert list(store.lookup_op("name", "starting_with", "Ali")) == [1, 3]
+    assert list(store.ordered_ids("posts", descending=True)) == [1, 3, 2, 4]
+
+    store[1] = User(1, "Alice", 1)
+    del store[3]
+
+    assert list(store.ordered_ids("posts")) == [1, 2, 4]
+    assert store.sorted["posts"].keys == [1, 5]
+
+
+def test_bulk_writes_merge_sorted_index():
+    store = IndexedStore(["name"], sorted_fields=["posts"])
+    store.put_all({i: User(i, f"n{i % 3}", i % 7) for i in range(100)})
+    store.put_all({i: User(i, "moved", None if i % 10 == 0 else 50 - i) for i in range(0, 100, 2)})
+
+    index = store.sorted["posts"]
+    assert index.keys == sorted(u.posts for u in store.values() if u.posts is not None)
+    assert set(index.unordered) == {i for i in range(0, 100, 10)}
+    assert len(store.lookup("name", "moved")) == 50
+    assert list(store.lookup("name", "n1")) == [i for i in range(1, 100, 2) if i % 3 == 1]
+
+    removed = store.remove_all([1, 2, 3, 200, 1])
+    assert [u.id for u in removed] == [1, 2, 3]
+    assert sorted(index.ids + list(index.unordered)) == sorted(store.entities)
+    assert 1 not in store.lookup("name", "n1")
+
+
+class BulkRepository(HippoRepository):
+    def delete_all_by_name_in(self, names: list) -> list[User]:
+        pass
+
+    def exists_by_name(self, name: str) -> bool:
+        pass
+
+    def find_all_order_by_posts(self) -> list[User]:
+        pass
+
+
+def test_bulk_repository_methods():
+    HippoRepositoryCreator().create_repo_impl(BulkRepository)
+    repo = BulkRepository()
+
+    saved = repo.save_all(User(i, f"n{i % 4}", -i) for i in range(10))
+
+    assert len(saved) == 10
+    assert [u.id for u in repo.find_all_by_id_in([3, 1, 42])] == [3, 1]
+    assert repo.exists_by_id(9) and not repo.exists_by_id(10)
+    assert repo.exists_by_name("n2") and not repo.exists_by_name("x")
+    assert sorted(u.id for u in repo.delete_all_by_name_in(["n0", "n1"])) == [0, 1, 4, 5, 8, 9]
+    assert [u.id for u in repo.delete_all_by_id_in([2, 3, 4])] == [2, 3]
+    assert [u.id for u in repo.find_all_order_by_posts()] == [7, 6]
+
+
+class RangeRepository(HippoRepository):
+    def find_all_by_posts_greater_than(self, posts: int) -> list[User]:
+        pass
+
+    def find_all_by_posts_between_order_by_name_desc(self, low_high: tuple) -> list[User]:
+        pass
+
+    def find_all_by_name_in(self, names: list) -> list[User]:
+        pass
+
+    def find_first_by_name_starting_with_order_by_posts(self, prefix: str) -> User:
+        pass
+
+    def find_top_2_order_by_posts_desc(self) -> list[User]:
+        pass
+
+    def find_all_by_name_order_by_posts_limit(self, name: str, limit: int) -> list[User]:
+        pass
+
+
+def make_range_repo() -> RangeRepository:
+    HippoRepositoryCreator().create_repo_impl(RangeRepository)
+    repo = RangeRepository()
+    users = (User(1, "Alice", 10), User(2, "Bob", 5), User(3, "Alicia", 7), User(4, "Alice", 3))
+    for user in users:
+        repo.save(user)
+    return repo
+
+
+def test_range_and_order_queries():
+    repo = make_range_repo()
+
+    assert set(repo._store.sorted) == {"posts", "name"}
+    assert [u.id for u in repo.find_all_by_posts_greater_than(5)] == [3, 1]
+    assert [u.id for u in repo.find_all_by_posts_between_order_by_name_desc((5, 10))] == [2, 3, 1]
+    assert [u.id for u in repo.find_all_by_name_in(["Bob", "Alicia"])] == [2, 3]
+    assert repo.find_first_by_name_starting_with_order_by_posts("Ali").id == 4
+    assert [u.id for u in repo.find_top_2_order_by_posts_desc()] == [1, 3]
+    assert [u.id for u in repo.find_all_by_name_order_by_posts_limit("Alice", 1)] == [4]
+
+
+class PagingRepository(HippoRepository):
+    def find_all_by_name(self, name: str, pageable: Pageable) -> Page[User]:
+        pass
+
+    def find_all_order_by_posts(self, pageable: Pageable) -> Page[User]:
+        pass
+
+    def stream_by_name(self, name: str) -> Iterator[User]:
+        pass
+
+    def find_by_posts_greater_than(self, posts: int) -> User:
+        pass
+
+    def count_by_name(self, name: str) -> int:
+        pass
+
+    def sum_posts_by_name(self, name: str) -> int:
+        pass
+
+    def avg_posts_by_name(self, name: str) -> float:
+        pass
+
+    def min_posts(self) -> int:
+        pass
+
+
+def make_paging_repo() -> PagingRepository:
+    HippoRepositoryCreator().create_repo_impl(PagingRepository)
+    repo = PagingRepository()
+    for i in range(1, 8):
+        repo.save(User(i, "Alice" if i % 2 else "Bob", 10 - i))
+    return repo
+
+
+def test_pages_count_all_matches():
+    repo = make_paging_repo()
+
+    page = repo.find_all_by_name("Alice", Pageable(page=1, size=3))
+    assert [u.id for u in page.content] == [7]
+    assert (page.page, page.size, page.total, page.total_pages) == (1, 3, 4, 2)
+
+    page = repo.find_all_order_by_posts(pageable=Pageable(0, 2))
+    assert [u.id for u in page.content] == [7, 6]
+    assert page.total == 7
+    assert repo.find_all_by_name("Carol", Pageable()).content == []
+
+
+def test_stream_is_lazy():
+    repo = make_paging_repo()
+
+    stream = repo.stream_by_name("Bob")
+    assert isinstance(stream, Iterator)
+    assert [u.id for u in stream] == [2, 4, 6]
+    assert list(repo.stream_by_name("Carol")) == []
+
+
+def test_first_match_stops_scanning():
+    repo = make_paging_repo()
+    checked = []
+
+    class CountingDict(dict):
+        def get(self, key, default=None):
+            checked.append(key)
+            return super().get(key, default)
+
+    repo._store.entities = CountingDict(repo._store.entities)
+    assert repo.find_by_posts_greater_than(5).id == 4
+    assert len(checked) == 1
+    assert repo.count_by_name("Carol") == 0
+
+
+def test_predicate_is_compiled_to_flat_function():
+    pred = RepoPredicate()
+    pred.build_tree([("name", "and"), ("posts", "or"), ("id", "")], ["starting_with", "between", "in"])
+    users = [User(1, "Alice", 10), User(2, "Alicia", None), User(3, "Bob", 3), User(4, None, 7)]
+
+    scan = pred.make_filter()
+    predicate = pred.make_predicate()
+
+    args = {0: "Ali", 1: (5, 10), 2: [3]}
+    assert [u.id for u in scan(users, args)] == [1, 3]
+    assert [u.id for u in users if predicate(u, args)] == [1, 3]
+    assert [u.id for u in scan(users, {0: "Z", 1: (0, 0), 2: [[1], 4]})] == [4]
+    assert "lambda" not in pred.source
+    assert pred.make_filter() is scan
+
+
+def test_predicate_reads_keyword_fields_with_attrgetter():
+    @dataclass
+    class Flight:
+        id: int
+        src: str
+
+    flight = Flight(1, "WAW")
+    setattr(flight, "from", "WAW")
+    pred = RepoPredicate()
+    pred.build_tree([("from", "")])
+
+    assert pred.make_predicate()(flight, {0: "WAW"})
+    assert "get0(entity)" in pred.source
+
+
+def test_aggregates():
+    repo = make_paging_repo()
+
+    assert repo.sum_posts_by_name("Bob") == 8 + 6 + 4
+    assert repo.avg_posts_by_name("Bob") == 6.0
+    assert repo.min_posts() == 3
+    assert repo.sum_posts_by_name("Carol") == 0
+    assert repo.avg_posts_by_name("Carol") is None
+
+
+class CountingRepository(HippoRepository):
+    def count_by_name(self, name: str) -> int:
+        pass
+
+    def count_by_posts_greater_than(self, posts: int) -> int:
+        pass
+
+    def count_by_name_and_posts(self, name: str, posts: int) -> int:
+        pass
+
+    def count(self) -> int:
+        pass
+
+    def find_distinct_name_by_posts_greater_than(self, posts: int) -> list[str]:
+        pass
+
+    def find_distinct_name_and_posts_order_by_posts_desc_limit_3(self) -> list[tuple]:
+        pass
+
+    def find_first_distinct_name_order_by_posts(self) -> str:
+        pass
+
+    def count_distinct_name(self) -> int:
+        pass
+
+
+def test_counts_read_index_sizes():
+    HippoRepositoryCreator().create_repo_impl(CountingRepository)
+    repo = CountingRepository()
+    repo.save_all(User(i, f"n{i % 3}", i % 5) for i in range(30))
+    checked = []
+
+    class CountingDict(dict):
+        def get(self, key, default=None):
+            checked.append(key)
+            return super().get(key, default)
+
+    repo._store.entities = CountingDict(repo._store.entities)
+
+    assert repo.count_by_name("n1") == 10
+    assert repo.count_by_posts_greater_than(2) == 12
+    assert repo.count() == 30
+    assert checked == []
+    assert repo.count_by_name_and_posts("n1", 4) == 2
+
+
+def test_distinct_projections():
+    HippoRepositoryCreator().create_repo_impl(CountingRepository)
+    repo = CountingRepository()
+    repo.save_all(User(i, f"n{i % 3}", i % 5) for i in range(30))
+
+    assert repo.find_distinct_name_by_posts_greater_than(3) == ["n1", "n0", "n2"]
+    assert sorted(repo.find_distinct_name_and_posts_order_by_posts_desc_limit_3()) == [("n0", 4), ("n1", 4), ("n2", 4)]
+    assert repo.find_first_distinct_name_order_by_posts() == "n0"
+    assert repo.count_distinct_name() == 3
+    assert list(unique([[0], (1, [2]), [0], None, (1, [2]), None])) == [[0], (1, [2]), None]
+
+
+class CompactRepository(HippoRepository[User, int]):
+    _compact = True
+
+    def find_all_by_name_order_by_posts_desc(self, name: str) -> list[User]:
+        pass
+
+    def find_all_by_posts_greater_than(self, posts: int, pageable: Pageable) -> Page[User]:
+        pass
+
+    def stream_by_name(self, name: str) -> Iterator[User]:
+        pass
+
+    def delete_by_name(self, name: str) -> User:
+        pass
+
+    def find_distinct_name(self) -> list[str]:
+        pass
+
+
+def test_compact_repository_stores_records():
+    HippoRepositoryCreator().create_repo_impl(CompactRepository)
+    repo = CompactRepository()
+    repo.save_all(User(i, f"n{i % 3}", i) for i in range(9))
+
+    stored = repo._store.entities[1]
+    assert not isinstance(stored, User) and not hasattr(stored, "__dict__")
+    assert repo.find_by_id(1) == User(1, "n1", 1)
+    assert [u.id for u in repo.find_all_by_name_order_by_posts_desc("n1")] == [7, 4, 1]
+    page = repo.find_all_by_posts_greater_than(2, Pageable(0, 2))
+    assert page.content == [User(3, "n0", 3), User(4, "n1", 4)] and page.total == 6
+    assert all(isinstance(u, User) for u in repo.stream_by_name("n2"))
+    assert repo.find_distinct_name() == ["n0", "n1", "n2"]
+    assert repo.delete_by_name("n0") == User(0, "n0", 0)
+
+    found = repo.find_by_id(2)
+    found.name = "changed"
+    assert repo.find_by_id(2).name == "n2"
+    assert repo._store[2] == User(2, "n2", 2)
+
+
+def test_records_rebuild_entities_without_init():
+    @dataclass(frozen=True, slots=True)
+    class Point:
+        id: int
+        x: float
+        label: str = field(default="", compare=False)
+
+        def __post_init__(self):
+            raise AssertionError("__init__ ran")
+
+    records = RecordType(Point)
+    point = object.__new__(Point)
+    for name, value in (("id", 1), ("x", 2.5), ("label", "a")):
+        object.__setattr__(point, name, value)
+
+    record = records.pack(point)
+    assert type(record).__slots__ == ("id", "x", "label")
+    assert records.unpack(record) == point
+    assert records.unpack(record).label == "a"
+
+
+class ConcurrentRepository(HippoRepository):
+    def find_all_by_name(self, name: str) -> list[User]:
+        pass
+
+    def find_all_by_posts_greater_than(self, posts: int) -> list[User]:
+        pass
+
+    def find_all_order_by_posts(self) -> list[User]:
+        pass
+
+    def delete_by_name(self, name: str) -> User:
+        pass
+
+
+def run_concurrently(*targets, seconds: float = 0.3) -> list:
+    errors = []
+    stop = threading.Event()
+
+    def loop(target):
+        try:
+            while not stop.is_set():
+                target()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=loop, args=(target,)) for target in targets]
+    try:
+        for thread in threads:
+            thread.start()
+        stop.wait(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return errors
+
+
+def test_readers_see_consistent_results_during_writes():
+    HippoRepositoryCreator().create_repo_impl(ConcurrentRepository)
+    repo = ConcurrentRepository()
+    for i in range(200):
+        repo.save(User(i, f"n{i % 5}", i))
+    rng = random.Random(1)
+
+    def write():
+        i = rng.randrange(300)
+        if rng.random() < 0.2:
+            repo.delete_by_id(i)
+        else:
+            repo.save(User(i, f"n{rng.randrange(5)}", rng.randrange(300)))
+
+    def read_by_name():
+        found = repo.find_all_by_name("n1")
+        assert all(u.name == "n1" for u in found)
+        assert len({u.id for u in found}) == len(found)
+
+    def read_ordered():
+        found = repo.find_all_order_by_posts()
+        assert len({u.id for u in found}) == len(found)
+        assert all(u.posts > 150 for u in repo.find_all_by_posts_greater_than(150))
+
+    def delete_one():
+        repo.delete_by_name("n4")
+
+    errors = run_concurrently(write, write, read_by_name, read_ordered, delete_one)
+
+    assert errors == []
+    store = repo._store
+    for name, index in store.indexes.items():
+        assert sum(len(ids) for ids in index.values()) == len(store)
+    assert sorted(store.sorted["posts"].ids) == sorted(store.entities)
+    assert store.sorted["posts"].keys == sorted(u.posts for u in store.values())
@@ -0,0 +1,105 @@
+import json
+import socket
+import pytest
+from hippopytamus.core.app import HippoApp, ServerOptions
+from hippopytamus.monitoring import tracing
+from hippopytamus.protocol.http import HttpProtocol10
+from hippopytamus.server.nonblocking import SelectTCPServer
+
+
+class Recorder(tracing.Tracer):
+    def __init__(self):
+        self.spans = []
+
+    def span_finished(self, span: tracing.Span) -> None:
+        self.spans.append(span)
+
+
+@pytest.fixture
+def recorder():
+    recorder = Recorder()
+    tracing.add_tracer(recorder)
+    yield recorder
+    tracing.remove_tracer(recorder)
+
+
+def request(uri: str, method: str = "GET", headers: dict = {}) -> dict:
+    return {"method": method, "uri": uri, "version": "HTTP/1.0", "headers": headers}
+
+
+def test_disabled_tracing_creates_no_spans():
+    assert not tracing.enabled()
+    assert tracing.start_span() is None
+    assert tracing.current_span() is None
+
+
+def test_span_durations_follow_marks():
+    span = tracing.Span(1.0)
+    span.phases = [("a", 1.5), ("b", 1.75)]
+
+    assert span.durations() == [("a", 0.5), ("b", 0.25)]
+    assert span.elapsed() == 0.75
+
+
+def test_container_marks_phases(recorder):
+    app = HippoApp("hippopytamus.example.example1", ServerOptions(port=0))
+
+    app.container.process_request(request("/api/test"))
+
+    [span] = recorder.spans
+    assert span.route == "/api/test"
+    assert [phase for phase, _ in span.phases] == [
+        "routing", "filters", "binding", "handler", "transform_response"
+    ]
+    assert tracing.current_span() is None
+
+
+def test_server_marks_protocol_phases(recorder):
+    app = HippoApp("hippopytamus.example.example1", ServerOptions(port=0))
+    server = SelectTCPServer(HttpProtocol10(), app.container)
+    conn, peer = socket.socketpair()
+    server.connections.append(conn)
+    state = {"context": {}, "data": b"", "read": False}
+    server.state.append(state)
+
+    peer.sendall(b"GET /api/test HTTP/1.0\r\nHost: test\r\n\r\n")
+    assert server.read(conn, state)
+    server.process(conn, state)
+    response = peer.recv(1024)
+    peer.close()
+
+    assert response.startswith(b"HTTP/1.0 200")
+    [span] = recorder.spans
+    assert [phase for phase, _ in span.phases] == [
+        "feed_parse", "parse_request", "routing", "filters", "binding",
+        "handler", "transform_response", "prepare_response", "sendall"
+    ]
+
+
+def test_phase_aggregator_endpoint():
+    opt = ServerOptions(port=0, tracing=True, admin_token="secret")
+    app = HippoApp("hippopytamus.example.example1", opt)
+    try:
+        app.container.process_request(request("/api/test"))
+        app.container.process_request(request("/api/test"))
+        resp = app.container.process_request(
+                request("/admin/tracing", headers={"X-Admin-Token": "secret"}))
+    finally:
+        tracing.remove_tracer(app.tracer)
+
+    breakdown = json.loads(resp["body"])
+    phases = breakdown["/api/test"]
+    assert phases["handler"]["count"] == 2
+    assert phases["total"]["count"] == 2
+    assert phases["total"]["max_ms"] >= phases["handler"]["max_ms"]
+
+
+def test_phase_aggregator_endpoint_requires_token():
+    app = HippoApp("hippopytamus.example.example1", ServerOptions(port=0, tracing=True))
+    try:
+        resp = app.container.process_request(
+                request("/admin/tracing", headers={"X-Admin-Token": ""}))
+    finally:
+        tracing.remove_tracer(app.tracer)
+
+    assert resp["code"] == 403
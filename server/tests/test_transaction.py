@@ -0,0 +1,244 @@
+import inspect
+import os
+import threading
+import time
+from dataclasses import dataclass
+import pytest
+from hippopytamus.core.annotation import get_method_decorators
+from hippopytamus.data.columnar import ColumnarStorage
+from hippopytamus.data.repository import HippoRepository
+from hippopytamus.data.repo_creator import HippoRepositoryCreator
+from hippopytamus.data.sqlite import SqliteStorage
+from hippopytamus.data.storage import LogStorage, StorageError
+from hippopytamus.data.transaction import Transactional, current_transaction
+
+
+@dataclass
+class User:
+    id: int
+    name: str
+    posts: int = 0
+
+
+def make_repo_cls(storage=None):
+    class UserRepository(HippoRepository[User, int]):
+        _storage = storage
+
+        def find_all_by_name(self, name: str) -> list[User]:
+            pass
+
+        def find_all_order_by_posts_desc(self) -> list[User]:
+            pass
+
+        def count_by_name(self, name: str) -> int:
+            pass
+
+        def delete_all_by_name(self, name: str) -> list[User]:
+            pass
+
+    HippoRepositoryCreator().create_repo_impl(UserRepository)
+    return UserRepository
+
+
+class UserService:
+    def __init__(self, repo) -> None:
+        self.repo = repo
+
+    @Transactional
+    def rename(self, old: str, new: str) -> list[User]:
+        users = self.repo.delete_all_by_name(old)
+        for user in users:
+            self.repo.save(User(user.id + 100, new, user.posts))
+        return users
+
+    @Transactional
+    def register(self, user: User, fail: bool = False) -> User:
+        self.repo.save(user)
+        if fail:
+            raise ValueError("rejected")
+        return user
+
+
+def test_writes_are_applied_when_call_returns():
+    repo = make_repo_cls()()
+    repo.save_all([User(1, "Alice", 3), User(2, "Alice", 5), User(3, "Bob", 4)])
+    seen = {}
+
+    @Transactional
+    def change():
+        repo.save(User(4, "Carol", 9))
+        repo.delete_by_id(3)
+        repo.save(User(1, "Alicia", 3))
+        seen["carol"] = repo.find_by_id(4)
+        seen["bob"] = repo.find_by_id(3)
+        seen["alices"] = repo.count_by_name("Alice")
+        seen["ordered"] = [user.id for user in repo.find_all_order_by_posts_desc()]
+        seen["stored"] = sorted(repo._store)
+
+    change()
+
+    assert seen == {
+        "carol": User(4, "Carol", 9),
+        "bob": None,
+        "alices": 1,
+        "ordered": [4, 2, 1],
+        "stored": [1, 2, 3],
+    }
+    assert sorted(repo._store) == [1, 2, 4]
+    assert repo.find_all_by_name("Alicia") == [User(1, "Alicia", 3)]
+    assert current_transaction() is None
+
+
+def test_exception_rolls_back():
+    repo = make_repo_cls()()
+    service = UserService(repo)
+    service.register(User(1, "Alice"))
+
+    with pytest.raises(ValueError):
+        service.register(User(2, "Bob"), fail=True)
+
+    assert repo.find_by_id(2) is None
+    assert current_transaction() is None
+    assert service.register(User(3, "Carol")) == repo.find_by_id(3)
+
+
+def test_nested_calls_join_the_outer_transaction():
+    repo = make_repo_cls()()
+    service = UserService(repo)
+    repo.save_all([User(1, "Alice"), User(2, "Alice")])
+
+    @Transactional
+    def rename_and_fail():
+        service.rename("Alice", "Alicia")
+        assert repo.count_by_name("Alicia") == 2
+        raise ValueError("rejected")
+
+    with pytest.raises(ValueError):
+        rename_and_fail()
+    assert sorted(repo._store) == [1, 2]
+
+    service.rename("Alice", "Alicia")
+    assert sorted(user.id for user in repo.find_all_by_name("Alicia")) == [101, 102]
+    assert repo.count_by_name("Alice") == 0
+
+
+def test_transaction_is_replayed_all_or_nothing(tmp_path):
+    path = str(tmp_path / "users.log")
+    repo_cls = make_repo_cls(LogStorage(path, fsync_interval=None))
+    repo = repo_cls()
+    repo.save_all([User(1, "Alice"), User(2, "Alice")])
+    UserService(repo).rename("Alice", "Alicia")
+    repo_cls._storage.close()
+    with open(path, "r+b") as log:
+        log.truncate(os.path.getsize(path) - 3)
+
+    repo = repo_cls()
+    assert sorted(repo._store) == [1, 2]
+    repo_cls._storage.close()
+
+
+def test_unstorable_write_fails_before_any_store_is_written(tmp_path):
+    users_cls = make_repo_cls(LogStorage(str(tmp_path / "users.log"), fsync_interval=None))
+    others_cls = make_repo_cls(LogStorage(str(tmp_path / "others.log"), fsync_interval=None))
+    users, others = users_cls(), others_cls()
+
+    @Transactional
+    def register_both():
+        users.save(User(1, "Alice"))
+        others.save(User(2, lambda: None))
+
+    with pytest.raises(Exception):
+        register_both()
+
+    assert users.find_by_id(1) is None and others.find_by_id(2) is None
+    for repo_cls in (users_cls, others_cls):
+        storage = repo_cls._storage
+        assert storage.appended == 0
+        storage.close()
+        assert len(repo_cls()._store) == 0
+        storage.close()
+
+
+def test_written_stores_are_published_when_a_later_write_fails(tmp_path, monkeypatch):
+    users = make_repo_cls(LogStorage(str(tmp_path / "users.log"), fsync_interval=None))()
+    others = make_repo_cls(LogStorage(str(tmp_path / "others.log"), fsync_interval=None))()
+    first, second = sorted((users, others), key=lambda repo: id(repo._store))
+
+    def full_disk(prepared):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(second._storage, "write", full_disk)
+
+    @Transactional
+    def register_both():
+        first.save(User(1, "Alice"))
+        second.save(User(2, "Bob"))
+
+    with pytest.raises(OSError):
+        register_both()
+
+    assert first.find_by_id(1) == User(1, "Alice")
+    assert second.find_by_id(2) is None
+    first._storage.close()
+    second._storage.close()
+
+
+def test_concurrent_commits_share_syncs(tmp_path, monkeypatch):
+    syncs = []
+    fsync = os.fsync
+
+    def slow_fsync(fd):
+        syncs.append(fd)
+        time.sleep(0.02)
+        fsync(fd)
+    monkeypatch.setattr(os, "fsync", slow_fsync)
+    repo_cls = make_repo_cls(LogStorage(str(tmp_path / "users.log"), fsync_interval=None))
+    service = UserService(repo_cls())
+    syncs.clear()
+    start = threading.Barrier(8)
+
+    def register(i):
+        start.wait()
+        service.register(User(i, f"user{i}"))
+    threads = [threading.Thread(target=register, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    storage = repo_cls._storage
+    storage.close()
+
+    assert len(syncs) < 8
+    assert storage.synced == storage.appended == 8
+    assert sorted(repo_cls()._store) == list(range(8))
+    storage.close()
+
+
+def test_sqlite_joins_the_transaction(tmp_path):
+    repo_cls = make_repo_cls(SqliteStorage(str(tmp_path / "app.db")))
+    repo = repo_cls()
+    service = UserService(repo)
+    repo.save_all([User(1, "Alice"), User(2, "Alice")])
+
+    with pytest.raises(ValueError):
+        service.register(User(3, "Bob"), fail=True)
+    service.rename("Alice", "Alicia")
+
+    assert repo.find_by_id(3) is None
+    assert sorted(user.id for user in repo.find_all_by_name("Alicia")) == [101, 102]
+    assert not repo._storage.connection().in_transaction
+    repo._storage.close()
+
+
+def test_columnar_writes_are_refused():
+    repo = make_repo_cls(ColumnarStorage())()
+
+    with pytest.raises(StorageError):
+        UserService(repo).register(User(1, "Alice"))
+    assert repo.find_by_id(1) is None
+
+
+def test_wrapper_keeps_signature_and_annotations():
+    assert list(inspect.signature(UserService.register).parameters) == ["self", "user", "fail"]
+    assert get_method_decorators(UserService.register) == [{"__decorator__": "Transactional"}]
+    with pytest.raises(Exception):
+        Transactional(UserService)
@@ -0,0 +1,76 @@
+import threading
+import time
+from hippopytamus.monitoring.watchdog import Watchdog
+
+
+class ListLogger:
+    def __init__(self):
+        self.messages = []
+
+    def warn(self, text, *args):
+        self.messages.append(text % args)
+
+
+def request(uri: str) -> dict:
+    return {"method": "GET", "uri": uri, "route": "/items/{id}", "headers": {}}
+
+
+def stuck_handler(watchdog: Watchdog, entered: threading.Event, release: threading.Event) -> None:
+    watchdog.request_started(request("/items/1"))
+    entered.set()
+    release.wait()
+    watchdog.request_finished(request("/items/1"), {"code": 200}, 0.0, 0)
+
+
+def make_watchdog() -> Watchdog:
+    watchdog = Watchdog(threshold=0.05, start=False)
+    watchdog.logger = ListLogger()  # type: ignore[assignment]
+    return watchdog
+
+
+def test_reports_stuck_request_once_with_stack():
+    watchdog = make_watchdog()
+    entered, release = threading.Event(), threading.Event()
+    worker = threading.Thread(target=stuck_handler, args=(watchdog, entered, release))
+    worker.start()
+    entered.wait()
+    try:
+        watchdog.check()
+        assert watchdog.logger.messages == []
+        time.sleep(0.06)
+        watchdog.check()
+        watchdog.check()
+    finally:
+        release.set()
+        worker.join()
+
+    [message] = watchdog.logger.messages
+    assert message.startswith("Request GET /items/{id} running for")
+    assert "in stuck_handler" in message
+    assert watchdog.inflight == {}
+
+
+def test_reports_event_loop_lag():
+    watchdog = make_watchdog()
+
+    watchdog.loop_woke(1)
+    time.sleep(0.06)
+    watchdog.check()
+    watchdog.check()
+    watchdog.loop_waiting()
+    watchdog.check()
+
+    [message] = watchdog.logger.messages
+    assert message.startswith("Event loop blocked for")
+    assert "test_reports_event_loop_lag" in message
+    assert watchdog.max_loop_lag >= 0.05
+
+
+def test_background_thread_checks():
+    watchdog = Watchdog(threshold=0.01, interval=0.005)
+    watchdog.logger = ListLogger()  # type: ignore[assignment]
+    watchdog.request_started(request("/items/1"))
+    time.sleep(0.1)
+    watchdog.close()
+
+    assert watchdog.reports == 1